@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+""" Bytes on the wire and CPU cost of permessage-deflate for ``get_block``
+
+    Fetches a range of blocks with and without compression through a TCP
+    proxy that counts the bytes in both directions. The CPU time is the
+    time spent by the client process (JSON decoding and decompression).
+
+    By default, a local node serves synthetic blocks. Use ``--node`` to
+    fetch real blocks from a node (``ws://`` only, because TLS cannot be
+    proxied transparently):
+
+    .. code-block:: sh
+
+        python3 benchmarks/websocket_compression.py --blocks 500
+        python3 benchmarks/websocket_compression.py \\
+            --node ws://10.0.0.16:8090 --start 1000000 --blocks 200
+"""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import threading
+import multiprocessing
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from grapheneapi.graphenewsrpc import GrapheneWebsocketRPC  # noqa: E402
+
+
+def synthetic_block(num, transactions=20):
+    """ A block that looks like a block of a busy chain
+    """
+    rnd = random.Random(num)
+
+    def hexstr(length):
+        return "%0*x" % (length, rnd.getrandbits(length * 4))
+
+    return {
+        "previous": "%08x" % (num - 1) + hexstr(32),
+        "timestamp": time.strftime(
+            "%Y-%m-%dT%H:%M:%S", time.gmtime(1500000000 + num * 3)),
+        "witness": "1.6.%d" % rnd.randint(1, 21),
+        "transaction_merkle_root": hexstr(40),
+        "extensions": [],
+        "witness_signature": hexstr(130),
+        "transactions": [{
+            "ref_block_num": (num - 1) & 0xffff,
+            "ref_block_prefix": rnd.getrandbits(32),
+            "expiration": time.strftime(
+                "%Y-%m-%dT%H:%M:%S", time.gmtime(1500000030 + num * 3)),
+            "operations": [[0, {
+                "fee": {"amount": 2000, "asset_id": "1.3.0"},
+                "from": "1.2.%d" % rnd.randint(100, 10000),
+                "to": "1.2.%d" % rnd.randint(100, 10000),
+                "amount": {
+                    "amount": rnd.randint(1, 10 ** 8),
+                    "asset_id": "1.3.%d" % rnd.randint(0, 5)},
+                "extensions": []
+            }]],
+            "extensions": [],
+            "signatures": [hexstr(130)],
+            "operation_results": [[0, {}]]
+        } for i in range(transactions)],
+        "block_id": "%08x" % num + hexstr(32),
+        "signing_key": "VIN" + hexstr(50),
+        "transaction_ids": [hexstr(40) for i in range(transactions)],
+    }
+
+
+def run_node(port, transactions):
+    """ Local node that serves synthetic blocks
+    """
+    from websockets.sync.server import serve
+
+    def handler(ws):
+        for message in ws:
+            payloads = json.loads(message)
+            replies = []
+            for payload in payloads if isinstance(payloads, list) else [
+                    payloads]:
+                name, args = payload["params"][1:]
+                result = None
+                if name == "get_block":
+                    result = synthetic_block(args[0], transactions)
+                replies.append({
+                    "id": payload["id"], "jsonrpc": "2.0", "result": result})
+            if not isinstance(payloads, list):
+                replies = replies[0]
+            ws.send(json.dumps(replies))
+
+    with serve(handler, "127.0.0.1", port) as server:
+        server.serve_forever()
+
+
+def run_proxy(listener, target, received, sent):
+    """ Forward connections to ``target`` and count the bytes
+    """
+    def pipe(src, dst, counter):
+        while True:
+            try:
+                data = src.recv(65536)
+            except OSError:
+                data = b""
+            if not data:
+                for s in (src, dst):
+                    try:
+                        s.shutdown(socket.SHUT_RDWR)
+                    except OSError:
+                        pass
+                return
+            with counter.get_lock():
+                counter.value += len(data)
+            dst.sendall(data)
+
+    while True:
+        client, _ = listener.accept()
+        upstream = socket.create_connection(target)
+        threading.Thread(
+            target=pipe, args=(upstream, client, received), daemon=True
+        ).start()
+        threading.Thread(
+            target=pipe, args=(client, upstream, sent), daemon=True
+        ).start()
+
+
+def free_port():
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+def measure(url, compression, blocks, batch, received, sent):
+    rpc = GrapheneWebsocketRPC(url, compression=compression, num_retries=0)
+    received.value = sent.value = 0
+    cpu, wall = time.process_time(), time.time()
+    if batch:
+        for start in range(0, len(blocks), batch):
+            with rpc.batch() as b:
+                for num in blocks[start:start + batch]:
+                    b.get_block(num)
+    else:
+        for num in blocks:
+            rpc.get_block(num)
+    cpu, wall = time.process_time() - cpu, time.time() - wall
+    rpc.close()
+    return received.value, sent.value, cpu, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--node", help="ws:// URL of a node")
+    parser.add_argument("--start", type=int, default=1, help="first block")
+    parser.add_argument("--blocks", type=int, default=200)
+    parser.add_argument(
+        "--batch", type=int, default=0,
+        help="fetch blocks in batches of this size")
+    parser.add_argument(
+        "--transactions", type=int, default=20,
+        help="transactions per synthetic block")
+    args = parser.parse_args()
+
+    if args.node:
+        url = urlparse(args.node)
+        if url.scheme != "ws":
+            parser.error("Only ws:// nodes can be measured")
+        target = (url.hostname, url.port or 80)
+        path = url.path or "/"
+    else:
+        target = ("127.0.0.1", free_port())
+        path = "/"
+        node = multiprocessing.Process(
+            target=run_node, args=(target[1], args.transactions),
+            daemon=True)
+        node.start()
+        time.sleep(0.5)
+
+    received = multiprocessing.Value("q", 0)
+    sent = multiprocessing.Value("q", 0)
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen()
+    proxy = multiprocessing.Process(
+        target=run_proxy, args=(listener, target, received, sent),
+        daemon=True)
+    proxy.start()
+    url = "ws://127.0.0.1:%d%s" % (listener.getsockname()[1], path)
+
+    blocks = list(range(args.start, args.start + args.blocks))
+    print("%d blocks from %s%s" % (
+        len(blocks), args.node or "a local node",
+        ", batches of %d" % args.batch if args.batch else ""))
+    print("%-12s %14s %12s %10s %10s" % (
+        "", "received", "sent", "cpu [s]", "wall [s]"))
+    results = {}
+    for compression in (False, True):
+        results[compression] = measure(
+            url, compression, blocks, args.batch, received, sent)
+        print("%-12s %14d %12d %10.3f %10.3f" % (
+            (("deflate" if compression else "plain"),) +
+            results[compression]))
+    print("Compression ratio: %.1fx, CPU overhead: %+.0f%%" % (
+        results[False][0] / max(1, results[True][0]),
+        100 * (results[True][2] / max(1e-9, results[False][2]) - 1)))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,5 +3,15 @@ __all__ = ['graphenewsprotocol',
            'grapheneapi',
            'grapheneclient',
            'graphenewsrpc',
-           'graphenehttprpc'
+           'graphenehttprpc',
+           'batch',
+           'grapheneasyncwsrpc',
+           'nodes',
+           'codec',
+           'retry',
+           'scheduler',
+           'compression',
+           'recorder',
+           'metrics',
+           'methods'
            ]
@@ -0,0 +1,129 @@
+import logging
+from .exceptions import RPCError
+log = logging.getLogger(__name__)
+
+#: Seconds to wait for the reply to the first batch sent to a node. Nodes
+#: that do not answer batches in time are sent the calls one by one.
+BATCH_PROBE_TIMEOUT = 5
+
+
+class BatchResult(object):
+    """ Placeholder for the outcome of a single call that has been
+        queued in a :class:`RPCBatch`. The actual result becomes
+        available once the batch has been executed.
+
+        :param str name: Name of the method that has been called
+        :param int id: JSON-RPC request id of the call
+    """
+    def __init__(self, name, id):
+        self.name = name
+        self.id = id
+        self.done = False
+        self._result = None
+        self._error = None
+
+    def set_result(self, result):
+        self._result = result
+        self.done = True
+
+    def set_error(self, error):
+        self._error = error
+        self.done = True
+
+    def failed(self):
+        """ Returns ``True`` if the call returned an error
+        """
+        return self.done and self._error is not None
+
+    def result(self):
+        """ Return the result of the call
+
+            :raises ValueError: if the batch has not been executed yet
+            :raises RPCError: if the server returned an error for this call
+        """
+        if not self.done:
+            raise ValueError("The batch has not been executed yet!")
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+    def __repr__(self):
+        return "<BatchResult %s id=%d>" % (self.name, self.id)
+
+
+class RPCBatch(object):
+    """ Collects many API calls and sends them to the node as a single
+        JSON-RPC array frame. Replies are matched back to the calls by
+        their request ``id``. An error returned for one call only marks
+        that call as failed, the remaining calls are unaffected.
+
+        :param rpc: Instance of
+            :class:`grapheneapi.graphenewsrpc.GrapheneWebsocketRPC` or
+            :class:`grapheneapi.graphenehttprpc.GrapheneHTTPRPC`
+        :param int chunk_size: Send at most ``chunk_size`` calls per
+            frame (defaults to all calls in one frame)
+
+        Instances are usually obtained through ``rpc.batch()``:
+
+        .. code-block:: python
+
+            with rpc.batch() as b:
+                blocks = [b.get_block(n) for n in range(1, 1001)]
+            for block in blocks:
+                print(block.result())
+    """
+    def __init__(self, rpc, chunk_size=None):
+        self.rpc = rpc
+        self.chunk_size = chunk_size
+        self.queries = []
+        self.calls = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.execute()
+
+    def __len__(self):
+        return len(self.calls)
+
+    def __iter__(self):
+        return iter(self.calls)
+
+    def execute(self):
+        """ Send all queued calls and distribute the replies
+
+            :returns: List of :class:`BatchResult` in the order the calls
+                have been queued
+        """
+        queries, calls = self.queries, self.calls
+        self.queries, self.calls = [], []
+        size = self.chunk_size or len(queries)
+        for i in range(0, len(queries), size or 1):
+            chunk = queries[i:i + size]
+            pending = dict((c.id, c) for c in calls[i:i + size])
+            for id, reply in self.rpc.rpcexec_batch(chunk).items():
+                call = pending.pop(id, None)
+                if call is None:
+                    log.warning("Received reply for unknown id %s" % id)
+                elif isinstance(reply, Exception):
+                    call.set_error(reply)
+                else:
+                    call.set_result(reply)
+            for call in pending.values():
+                call.set_error(RPCError(
+                    "No reply for request id %d" % call.id))
+        return calls
+
+    def __getattr__(self, name):
+        """ Queue all methods as RPC calls and return a
+            :class:`BatchResult` placeholder for each
+        """
+        def method(*args, **kwargs):
+            query = self.rpc.get_query(name, args, kwargs)
+            call = BatchResult(name, query["id"])
+            self.queries.append(query)
+            self.calls.append(call)
+            return call
+        return method
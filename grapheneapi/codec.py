@@ -0,0 +1,108 @@
+""" JSON codec used for the RPC traffic
+
+    The fastest installed JSON library is used (``orjson``, ``ujson``,
+    ``simplejson``, falling back to the standard library). ``orjson`` is
+    installed with the ``fast-json`` extra
+    (``pip install vinchainio[fast-json]``). Use :func:`use` to pick a
+    specific one:
+
+    .. code-block:: python
+
+        from grapheneapi import codec
+        codec.use("json")
+"""
+import json
+import logging
+log = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+try:
+    import simplejson
+except ImportError:
+    simplejson = None
+
+
+def _json_dumps(obj):
+    return json.dumps(obj, ensure_ascii=False).encode("utf8")
+
+
+def _json_loads(data):
+    if isinstance(data, (bytes, bytearray)):
+        data = data.decode("utf8")
+    return json.loads(data, strict=False)
+
+
+codecs = {"json": (_json_dumps, _json_loads)}
+
+if orjson:
+    codecs["orjson"] = (orjson.dumps, orjson.loads)
+
+if ujson:
+    codecs["ujson"] = (
+        lambda obj: ujson.dumps(obj, ensure_ascii=False).encode("utf8"),
+        ujson.loads
+    )
+
+if simplejson:
+    codecs["simplejson"] = (
+        lambda obj: simplejson.dumps(obj, ensure_ascii=False).encode("utf8"),
+        lambda data: simplejson.loads(data, strict=False)
+    )
+
+name = None
+_dumps = _loads = None
+
+
+def use(codec):
+    """ Select the JSON library by name
+
+        :param str codec: One of ``orjson``, ``ujson``, ``simplejson`` or
+            ``json``
+    """
+    global name, _dumps, _loads
+    if codec not in codecs:
+        raise ValueError("JSON codec %s is not available" % codec)
+    name = codec
+    _dumps, _loads = codecs[codec]
+
+
+for codec in ["orjson", "ujson", "simplejson", "json"]:
+    if codec in codecs:
+        use(codec)
+        break
+
+
+def dumps(obj):
+    """ Serialize ``obj`` to UTF-8 encoded JSON
+
+        :returns: bytes
+    """
+    try:
+        return _dumps(obj)
+    except (TypeError, OverflowError, ValueError):
+        # e.g. integers beyond 64 bit or non-string keys
+        return _json_dumps(obj)
+
+
+def loads(data):
+    """ Deserialize JSON from ``str`` or ``bytes``. Replies that the fast
+        library rejects (e.g. control characters in strings) are decoded
+        with the standard library in non-strict mode.
+
+        :raises ValueError: if ``data`` is not valid JSON
+    """
+    try:
+        return _loads(data)
+    except ValueError:
+        if _loads is _json_loads:
+            raise
+        return _json_loads(data)
@@ -0,0 +1,221 @@
+""" Websocket connections with permessage-deflate compression
+
+    ``websocket-client`` does not negotiate any websocket extensions. The
+    classes in this module offer the part of its interface that is used by
+    this library on top of the synchronous client of ``websockets``, which
+    negotiates permessage-deflate (RFC 7692) with the node:
+
+    * :class:`DeflateWebsocket` stands in for ``websocket.WebSocket``
+    * :class:`DeflateWebsocketApp` stands in for ``websocket.WebSocketApp``
+
+    Errors are raised as the corresponding ``websocket-client`` exceptions
+    so that callers can handle both kinds of connections alike. Nodes that
+    do not support the extension are talked to uncompressed.
+
+    Requires ``websockets>=13``, which is installed with the
+    ``compression`` extra (``pip install vinchainio[compression]``).
+"""
+import logging
+import websocket
+log = logging.getLogger(__name__)
+
+#: Oldest version of ``websockets`` that offers the synchronous client
+#: with ``recv(decode=False)`` and ``recv_streaming(decode=False)``
+WEBSOCKETS_MIN_VERSION = 13
+
+MISSING = (
+    "Missing dependency: websockets>=%d. Compression requires the "
+    "compression extra (pip install vinchainio[compression])"
+    % WEBSOCKETS_MIN_VERSION
+)
+
+try:
+    from websockets.version import version
+    from websockets.sync.client import connect
+    from websockets.exceptions import ConnectionClosed, InvalidURI
+    from websockets.protocol import State
+except ImportError:
+    raise ImportError(MISSING)
+
+if int(version.split(".")[0]) < WEBSOCKETS_MIN_VERSION:
+    raise ImportError(MISSING)
+
+
+class DeflateWebsocket(object):
+    """ Blocking websocket connection with permessage-deflate
+
+        .. code-block:: python
+
+            ws = DeflateWebsocket()
+            ws.connect("wss://node.vinchain.io", timeout=5)
+            ws.send('{"method": "call", ...}')
+            reply = ws.recv()
+    """
+    def __init__(self):
+        self.conn = None
+        self.timeout = None
+
+    @property
+    def connected(self):
+        return self.conn is not None and self.conn.state is State.OPEN
+
+    @property
+    def compressed(self):
+        """ ``True`` if the node agreed to compress the connection
+        """
+        return bool(self.conn and any(
+            e.name == "permessage-deflate"
+            for e in self.conn.protocol.extensions))
+
+    def connect(
+        self, url, timeout=None, ping_interval=None, ping_timeout=None
+    ):
+        """ Open the connection and negotiate compression
+
+            :param str url: Websocket URL of the node
+            :param float timeout: Seconds to wait for the connection and,
+                like ``websocket.WebSocket``, for every reply
+            :param float ping_interval: Send a ping frame every x seconds
+                (defaults to no pings)
+            :param float ping_timeout: Close the connection if a ping is
+                not answered within x seconds
+        """
+        try:
+            self.conn = connect(
+                url,
+                compression="deflate",
+                open_timeout=timeout,
+                ping_interval=ping_interval or None,
+                ping_timeout=ping_timeout,
+                # Message size is up to the caller
+                max_size=None,
+            )
+            # The connection outlives this method and is closed by
+            # :func:`close` instead of a ``with`` block
+            self.conn.__enter__()
+        except InvalidURI as e:
+            raise websocket.WebSocketAddressException(str(e))
+        except TimeoutError as e:
+            raise websocket.WebSocketTimeoutException(str(e))
+        self.timeout = timeout
+        if not self.compressed:
+            log.info("Node %s does not support compression" % url)
+
+    def settimeout(self, timeout):
+        self.timeout = timeout
+
+    def send(self, data):
+        """ Send ``data`` as text frame, like ``websocket.WebSocket``
+        """
+        if isinstance(data, str):
+            data = data.encode("utf8")
+        try:
+            self.conn.send(data, text=True)
+        except ConnectionClosed as e:
+            raise websocket.WebSocketConnectionClosedException(str(e))
+
+    def recv(self):
+        """ Receive a message. Text and binary frames are returned as
+            bytes.
+        """
+        try:
+            return self.conn.recv(timeout=self.timeout, decode=False)
+        except ConnectionClosed as e:
+            raise websocket.WebSocketConnectionClosedException(str(e))
+        except TimeoutError:
+            raise websocket.WebSocketTimeoutException(
+                "Connection timed out")
+
+    def recv_fragments(self):
+        """ Generator of the fragments of the next message
+        """
+        try:
+            for fragment in self.conn.recv_streaming(decode=False):
+                yield fragment
+        except ConnectionClosed as e:
+            raise websocket.WebSocketConnectionClosedException(str(e))
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+
+
+class DeflateWebsocketApp(object):
+    """ Event driven websocket connection with permessage-deflate that
+        calls the same callbacks as ``websocket.WebSocketApp``:
+
+        * ``on_open(ws)``
+        * ``on_message(ws, message)``
+        * ``on_error(ws, error)``
+        * ``on_close(ws, status_code, reason)``
+    """
+    def __init__(
+        self,
+        url,
+        on_open=None,
+        on_message=None,
+        on_error=None,
+        on_close=None
+    ):
+        self.url = url
+        self.on_open = on_open
+        self.on_message = on_message
+        self.on_error = on_error
+        self.on_close = on_close
+        self.keep_running = False
+        self.sock = DeflateWebsocket()
+
+    def callback(self, callback, *args):
+        if not callback:
+            return
+        try:
+            callback(self, *args)
+        except Exception as e:
+            log.error("Error in callback %s: %s" % (callback, str(e)))
+            if self.on_error and callback is not self.on_error:
+                self.callback(self.on_error, e)
+
+    def send(self, data):
+        self.sock.send(data)
+
+    def close(self):
+        self.keep_running = False
+        self.sock.close()
+
+    def run_forever(self, ping_interval=0, ping_timeout=None):
+        """ Connect and dispatch messages until the connection is closed.
+            Like ``websocket.WebSocketApp``, errors are reported to
+            ``on_error`` instead of being raised.
+
+            :param float ping_interval: Send a ping frame every x seconds,
+                ``0`` for no pings
+            :param float ping_timeout: Close the connection if a ping is
+                not answered within x seconds
+        """
+        self.keep_running = True
+        try:
+            self.sock.connect(
+                self.url, ping_interval=ping_interval,
+                ping_timeout=ping_timeout)
+        except Exception as e:
+            self.keep_running = False
+            self.callback(self.on_error, e)
+            return True
+        self.callback(self.on_open)
+        try:
+            while self.keep_running:
+                self.callback(self.on_message, self.sock.recv())
+        except websocket.WebSocketConnectionClosedException as e:
+            if self.keep_running:
+                self.callback(self.on_error, e)
+        except Exception as e:
+            self.callback(self.on_error, e)
+        finally:
+            self.keep_running = False
+            self.sock.close()
+            conn = self.sock.conn
+            self.callback(
+                self.on_close,
+                conn.close_code if conn else None,
+                conn.close_reason if conn else None)
+        return False
@@ -8,3 +8,20 @@ class NumRetriesReached(Exception):
 
 class RPCRequestError(Exception):
     pass
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+def decodeRPCReply(ret):
+    """ Helper function that returns the ``result`` of a decoded JSON-RPC
+        reply or raises :class:`RPCError` if the reply carries an error
+    """
+    if 'error' in ret:
+        if 'detail' in ret['error']:
+            raise RPCError(ret['error']['detail'])
+        else:
+            raise RPCError(ret['error']['message'])
+    else:
+        return ret["result"]
@@ -1,5 +1,5 @@
 import sys
-import json
+from . import codec
 import logging
 log = logging.getLogger(__name__)
 
@@ -33,6 +33,10 @@ class GrapheneAPI(object):
                              defaults to "")
         :param str password: Password for Authentication (if required,
                              defaults to "")
+        :param int pool_size: Number of keep-alive connections kept open
+                              (defaults to 10)
+        :param float timeout: Seconds to wait for a reply (defaults to no
+                              timeout)
 
         All RPC commands of the Graphene client are exposed as methods
         in the class ``grapheneapi``. Once an instance of GrapheneAPI is
@@ -66,13 +70,24 @@ class GrapheneAPI(object):
         and hence the calls available to the witness-rpc can be seen as read-only for
         the blockchain.
     """
-    def __init__(self, host, port, username="", password=""):
+    def __init__(self, host, port, username="", password="",
+                 pool_size=10, timeout=None):
         self.host = host
         self.port = port
         self.username = username
         self.password = password
+        self.timeout = timeout
         self.headers = {'content-type': 'application/json'}
 
+        # Keep the connections alive between calls
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.headers.update(self.headers)
+        self.session.auth = (self.username, self.password)
+        self.url = "http://{}:{}/rpc".format(self.host, self.port)
+
     def rpcexec(self, payload):
         """ Manual execute a command on API (internally used)
 
@@ -90,14 +105,13 @@ class GrapheneAPI(object):
                 info -> grapheneapi.info()
         """
         try:
-            response = requests.post("http://{}:{}/rpc".format(self.host,
-                                                               self.port),
-                                     data=json.dumps(payload, ensure_ascii=False).encode('utf8'),
-                                     headers=self.headers,
-                                     auth=(self.username, self.password))
+            response = self.session.post(
+                self.url,
+                data=codec.dumps(payload),
+                timeout=self.timeout)
             if response.status_code == 401:
                 raise UnauthorizedError
-            ret = json.loads(response.text)
+            ret = codec.loads(response.content)
             if 'error' in ret:
                 if 'detail' in ret['error']:
                     raise RPCError(ret['error']['detail'])
@@ -0,0 +1,295 @@
+import asyncio
+import logging
+from . import codec
+from .exceptions import (
+    RPCError,
+    NumRetriesReached,
+    DeadlineExceeded,
+    decodeRPCReply
+)
+from .nodes import NodeManager
+from .retry import RetryPolicy, Deadline
+log = logging.getLogger(__name__)
+
+try:
+    current_task = asyncio.current_task
+except AttributeError:
+    # Python < 3.7
+    current_task = asyncio.Task.current_task
+
+try:
+    import websockets
+except ImportError:
+    raise ImportError("Missing dependency: websockets")
+
+
+class AsyncGrapheneWebsocketRPC(object):
+    """ This class is the asyncio counterpart of
+        :class:`grapheneapi.graphenewsrpc.GrapheneWebsocketRPC`. All API
+        methods are coroutines and replies are dispatched by request id,
+        so many calls can be in flight on the same connection.
+
+        :param str urls: Either a single Websocket URL, or a list of URLs
+        :param str user: Username for Authentication
+        :param str password: Password for Authentication
+        :param int num_retries: Try x times to num_retries to a node on
+               disconnect, -1 for indefinitely
+        :param float timeout: Seconds to wait for a node to reply
+               (defaults to no timeout)
+        :param RetryPolicy retry_policy: Backoff between retries (see
+               :class:`grapheneapi.retry.RetryPolicy`)
+
+        Usage:
+
+        .. code-block:: python
+
+            async def main():
+                rpc = AsyncGrapheneWebsocketRPC("ws://10.0.0.16:8090")
+                await rpc.connect()
+                count, props = await asyncio.gather(
+                    rpc.get_account_count(),
+                    rpc.get_dynamic_global_properties()
+                )
+                await rpc.close()
+
+        If the connection is lost, the instance reconnects to the next
+        node in ``urls`` and sends the pending requests again.
+
+        A timeout (or an absolute ``deadline``) can be given per call and
+        raises :class:`grapheneapi.exceptions.DeadlineExceeded`:
+
+        .. code-block:: python
+
+            block = await rpc.get_block(1234, timeout=2)
+    """
+    def __init__(self, urls, user=None, password=None, **kwargs):
+        self.api_id = {}
+        self._request_id = 0
+        self.urls = NodeManager(urls)
+        self.user = user
+        self.password = password
+        self.num_retries = kwargs.get("num_retries", -1)
+        self.timeout = kwargs.get("timeout")
+        self.retry_policy = kwargs.get("retry_policy") or RetryPolicy()
+        self.url = None
+        self.ws = None
+        self.closed = False
+        self._pending = {}
+        self._reader = None
+        self._connected = None
+        self._connect_task = None
+
+    def get_request_id(self):
+        self._request_id += 1
+        return self._request_id
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def connect(self):
+        """ Connect to a node unless already connected. Concurrent callers
+            wait for the same connection attempt.
+        """
+        if self._connected is None:
+            self._connected = asyncio.Event()
+        if self._connected.is_set():
+            return
+        if self._connect_task is None:
+            self.closed = False
+            self._connect_task = asyncio.ensure_future(self.wsconnect())
+        await asyncio.shield(self._connect_task)
+
+    async def wsconnect(self):
+        """ Connect to the next reachable node, login, register to the
+            APIs and send pending requests again (internal use only)
+        """
+        try:
+            cnt = 0
+            while True:
+                cnt += 1
+                self.url = next(self.urls)
+                log.debug("Trying to connect to node %s" % self.url)
+                try:
+                    self.ws = await asyncio.wait_for(
+                        websockets.connect(self.url, max_size=None),
+                        self.timeout)
+                    break
+                except Exception as e:
+                    log.warning(str(e))
+                    self.urls.failure(self.url)
+                    if (self.num_retries > -1 and
+                            cnt > self.num_retries):
+                        raise NumRetriesReached()
+                    sleeptime = self.retry_policy.backoff(cnt)
+                    log.warning(
+                        "Lost connection to node during wsconnect(): %s (%d/%d) "
+                        % (self.url, cnt, self.num_retries) +
+                        "Retrying in %.1f seconds" % sleeptime
+                    )
+                    await asyncio.sleep(sleeptime)
+
+            self._reader = asyncio.ensure_future(self.read_replies(self.ws))
+            if self.user and self.password:
+                await self.login(self.user, self.password, api_id=1)
+            await self.register_apis()
+            await self.resend_pending()
+            self._connected.set()
+        except Exception as e:
+            self.fail_pending(e)
+            raise
+        finally:
+            self._connect_task = None
+
+    async def register_apis(self):
+        """ Register to APIs (see
+            :func:`grapheneapi.graphenewsrpc.GrapheneWebsocketRPC.register_apis`)
+        """
+        pass
+
+    async def close(self):
+        """ Close the connection and cancel pending requests
+        """
+        self.closed = True
+        if self._connected:
+            self._connected.clear()
+        if self.ws:
+            await self.ws.close()
+        if self._reader:
+            await self._reader
+        self.fail_pending(RPCError("Connection closed"))
+
+    async def read_replies(self, ws):
+        """ Reader task that resolves the futures of pending requests and
+            reconnects if the connection is lost
+        """
+        while True:
+            try:
+                reply = await ws.recv()
+            except Exception as e:
+                if not self.closed:
+                    log.warning(
+                        "Lost connection to node %s: %s" % (self.url, str(e)))
+                break
+
+            try:
+                ret = codec.loads(reply)
+            except ValueError:
+                log.error("Client returned invalid format. Expected JSON!")
+                continue
+
+            future = self._pending.pop(ret.get("id"), (None, None))[1]
+            if future is None or future.done():
+                continue
+            try:
+                future.set_result(decodeRPCReply(ret))
+            except Exception as e:
+                # Don't let the error reference the reader's frame
+                if isinstance(e, RPCError):
+                    e = self.decode_error(e)
+                future.set_exception(e.with_traceback(None))
+
+        if not self.closed and ws is self.ws:
+            self._connected.clear()
+            asyncio.ensure_future(self.reconnect())
+
+    async def reconnect(self):
+        try:
+            await self.connect()
+        except Exception as e:
+            log.error("Unable to reconnect: %s" % str(e))
+
+    async def resend_pending(self):
+        for payload, future in list(self._pending.values()):
+            await self.ws.send(codec.dumps(payload).decode("utf8"))
+
+    def fail_pending(self, e):
+        pending, self._pending = self._pending, {}
+        for payload, future in pending.values():
+            if not future.done():
+                future.set_exception(e)
+
+    """ RPC Calls
+    """
+    async def rpcexec(self, payload, deadline=None):
+        """ Execute a call by sending the payload
+
+            :param json payload: Payload data
+            :param Deadline deadline: Finish the call by then
+            :raises RPCError: if the server returns an error
+            :raises DeadlineExceeded: if the call did not finish in time
+        """
+        deadline = deadline or Deadline()
+        # While connecting, login and registration go out right away
+        if current_task() is not self._connect_task:
+            await self.wait_for(self.connect(), deadline)
+
+        future = asyncio.get_event_loop().create_future()
+        self._pending[payload["id"]] = (payload, future)
+        data = codec.dumps(payload).decode("utf8")
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(data)
+        try:
+            await self.ws.send(data)
+        except Exception as e:
+            # The reader task reconnects and sends pending requests again
+            log.warning(str(e))
+        try:
+            return await self.wait_for(future, deadline)
+        finally:
+            self._pending.pop(payload["id"], None)
+
+    async def wait_for(self, awaitable, deadline):
+        """ Wait for ``awaitable`` until the deadline passes, or for
+            ``timeout`` seconds of the instance (internal use only)
+
+            :raises DeadlineExceeded: if it is not done in time
+        """
+        try:
+            return await asyncio.wait_for(
+                awaitable, deadline.limit(self.timeout))
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded("Node %s did not reply in time" % self.url)
+
+    def decode_error(self, e):
+        """ Hook for subclasses that turn a generic :class:`RPCError` into a
+            more specific exception
+        """
+        return e
+
+    def get_query(self, name, args, kwargs):
+        """ Build the JSON-RPC payload for calling ``name`` with ``args``
+        """
+        # Sepcify the api to talk to
+        if "api_id" not in kwargs:
+            if ("api" in kwargs):
+                if (kwargs["api"] in self.api_id and
+                        self.api_id[kwargs["api"]]):
+                    api_id = self.api_id[kwargs["api"]]
+                else:
+                    api_id = kwargs["api"]
+            else:
+                api_id = 0
+        else:
+            api_id = kwargs["api_id"]
+
+        return {"method": "call",
+                "params": [api_id, name, list(args)],
+                "jsonrpc": "2.0",
+                "id": self.get_request_id()}
+
+    def __getattr__(self, name):
+        """ Map all methods to RPC calls and pass through the arguments.
+            Private and special names are not API methods.
+        """
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        async def method(*args, **kwargs):
+            query = self.get_query(name, args, kwargs)
+            deadline = Deadline(kwargs.get("timeout"), kwargs.get("deadline"))
+            return await self.rpcexec(query, deadline=deadline)
+        return method
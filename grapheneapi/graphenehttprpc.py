@@ -1,12 +1,21 @@
-import json
 import time
 import logging
+import threading
 import requests
-from itertools import cycle
+from requests.adapters import HTTPAdapter
 from .exceptions import (
     RPCError,
-    NumRetriesReached
+    NumRetriesReached,
+    DeadlineExceeded,
+    decodeRPCReply
 )
+from .batch import RPCBatch, BATCH_PROBE_TIMEOUT
+from . import codec
+from .nodes import NodeManager
+from .retry import RetryPolicy, Deadline
+from .recorder import Recorder
+from .metrics import Metrics
+from .methods import METHODS, Method
 log = logging.getLogger(__name__)
 
 
@@ -17,6 +26,22 @@ class GrapheneHTTPRPC(object):
         :param str urls: Either a single REST endpoint URL, or a list of URLs
         :param int num_retries: Try x times to num_retries to a node on
                disconnect, -1 for indefinitely
+        :param int pool_size: Number of keep-alive connections kept open
+               per node (defaults to 10)
+        :param float timeout: Seconds to wait for a node to reply
+               (defaults to no timeout)
+        :param RetryPolicy retry_policy: Backoff between retries (see
+               :class:`grapheneapi.retry.RetryPolicy`)
+        :param bool probe_nodes: Probe all nodes at startup and use the best
+               one (defaults to ``True`` if several URLs are given)
+        :param int probe_interval: Probe all nodes every x seconds and move
+               to a better node if the current one is behind or slow
+        :param Recorder recorder: Record all calls and their replies (see
+               :class:`grapheneapi.recorder.Recorder`, or the path of the
+               file to record to)
+        :param Metrics metrics: Collect latency histograms, byte counts,
+               retries and errors per method (see
+               :class:`grapheneapi.metrics.Metrics`, or ``True``)
 
         Usage:
 
@@ -25,104 +50,336 @@ class GrapheneHTTPRPC(object):
             ws = GrapheneHTTPRPC("https://api.node.com")
             print(ws.get_account_count())
 
+        The number of retries and a timeout (or an absolute ``deadline``)
+        can be given per call, e.g. ``ws.get_block(1234, timeout=2)``.
+
+        All requests go through a :class:`requests.Session` that keeps the
+        connections to the nodes alive, and the instance can be shared
+        between threads. Requests stick to the same node until it fails.
+
     """
+    #: Known API methods, see :attr:`grapheneapi.methods.METHODS`
+    methods = METHODS
+
     def __init__(self, urls, **kwargs):
         self.api_id = {}
+        # Whether nodes answer JSON-RPC batches, by URL
+        self.batch_support = {}
         self._request_id = 0
-        if isinstance(urls, list):
-            self.urls = cycle(urls)
-        else:
-            self.urls = cycle([urls])
+        self._lock = threading.Lock()
+        self.urls = NodeManager(urls)
         self.num_retries = kwargs.get("num_retries", -1)
+        self.timeout = kwargs.get("timeout", None)
+        self.retry_policy = kwargs.get("retry_policy") or RetryPolicy()
+        self.recorder = kwargs.get("recorder")
+        if isinstance(self.recorder, str):
+            self.recorder = Recorder(self.recorder)
+        self.metrics = kwargs.get("metrics")
+        if self.metrics is True:
+            self.metrics = Metrics()
+
+        pool_size = kwargs.get("pool_size", 10)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Content-Type"] = "application/json"
+
+        # Node selection
+        self.probe_timeout = kwargs.get("probe_timeout", 5)
+        if kwargs.get("probe_nodes", len(self.urls) > 1):
+            self.urls.probe(self.probe_node)
+        if kwargs.get("probe_interval"):
+            self.urls.start_probing(
+                self.probe_node, kwargs["probe_interval"])
+
+        self.url = next(self.urls)
 
     def get_request_id(self):
-        self._request_id += 1
-        return self._request_id
+        with self._lock:
+            self._request_id += 1
+            return self._request_id
 
     def next(self):
         self.url = next(self.urls)
 
+    def probe_node(self, url):
+        """ Measure the round trip time of a request to ``url``
+
+            :returns: latency and dynamic global properties of the node
+        """
+        start = time.time()
+        query = self.session.post(url, data=codec.dumps({
+            "method": "call",
+            "params": [0, "get_dynamic_global_properties", []],
+            "jsonrpc": "2.0",
+            "id": 1
+        }), timeout=self.probe_timeout)
+        return time.time() - start, decodeRPCReply(codec.loads(query.content))
+
+    def close(self):
+        """ Close all keep-alive connections
+        """
+        self.session.close()
+
     """ RPC Calls
     """
-    def rpcexec(self, payload):
+    def rpcexec(self, payload, **kwargs):
         """ Execute a call by sending the payload
 
             :param json payload: Payload data
+            :param int num_retries: Retries for this call
+            :param Deadline deadline: Finish the call by then
             :raises ValueError: if the server does not respond in proper JSON
                                 format
             :raises RPCError: if the server returns an error
+            :raises DeadlineExceeded: if the call did not finish in time
         """
-        log.debug(json.dumps(payload))
-        cnt = 0
-        while True:
-            cnt += 1
-            self.url = next(self.urls)
+        try:
+            return decodeRPCReply(self.send(payload, **kwargs))
+        except RPCError as e:
+            raise self.decode_error(e)
+
+    def decode_error(self, e):
+        """ Hook for subclasses that turn a generic :class:`RPCError` into a
+            more specific exception
+        """
+        return e
+
+    def rpcexec_batch(self, payloads):
+        """ Execute many calls by posting the payloads as a single
+            JSON-RPC array
+
+            :param list payloads: List of payload data
+            :returns: dictionary that maps each request id to either the
+                result or the :class:`RPCError` of the call
+            :raises ValueError: if the server does not respond in proper JSON
+                                format
+        """
+        url = self.url
+        if self.batch_support.get(url) is False:
+            ret = None
+        elif url in self.batch_support:
+            ret = self.send(payloads)
+        else:
+            ret = self.probe_batch(payloads)
+        if not isinstance(ret, list):
+            # The node does not understand batches, send them one by one
+            if self.batch_support.get(url) is not False:
+                log.warning("Node %s does not support batch calls" % url)
+                self.batch_support[url] = False
+            ret = [self.send(payload) for payload in payloads]
+        replies = {}
+        for reply in ret:
+            try:
+                replies[reply.get("id")] = decodeRPCReply(reply)
+            except RPCError as e:
+                replies[reply.get("id")] = self.decode_error(e)
+        return replies
+
+    def probe_batch(self, payloads):
+        """ Send the first batch to a node with a short timeout (see
+            :attr:`grapheneapi.batch.BATCH_PROBE_TIMEOUT`) to learn whether
+            it answers batches
+
+            :returns: the reply, or ``None`` if the node did not answer in
+                time or not in proper JSON
+        """
+        url = self.url
+        try:
+            ret = self.send(
+                payloads, num_retries=0,
+                deadline=Deadline(BATCH_PROBE_TIMEOUT))
+        except (NumRetriesReached, DeadlineExceeded, ValueError) as e:
+            log.warning("Node %s did not answer a batch: %s" % (url, str(e)))
+            return None
+        self.batch_support[url] = isinstance(ret, list)
+        return ret
 
+    def batch(self, chunk_size=None):
+        """ Returns a :class:`grapheneapi.batch.RPCBatch` that collects
+            calls and executes them in a single request
+
+            :param int chunk_size: Send at most ``chunk_size`` calls per
+                request
+        """
+        return RPCBatch(self, chunk_size=chunk_size)
+
+    def stream(self, name, *args, **kwargs):
+        """ Call the API method ``name`` and decode the items of the
+            result while the response is being downloaded, so that memory
+            usage does not depend on the size of the reply (requires
+            ``ijson``)
+
+            :param str name: Name of the API method
+            :param str prefix: Path of the items to yield (defaults to
+                ``result.item``, i.e. the elements of the result)
+            :returns: generator of the items
+            :raises RPCError: if the server returns an error
+        """
+        from .streaming import items
+        prefix = kwargs.pop("prefix", "result.item")
+        query = self.get_query(name, args, kwargs)
+        response = self.session.post(
+            self.url,
+            data=codec.dumps(query),
+            timeout=self.timeout,
+            stream=True
+        )
+        if response.status_code != 200:
+            response.close()
+            raise requests.exceptions.HTTPError(
+                "Node returned HTTP status %d" % response.status_code)
+        response.raw.decode_content = True
+
+        def generate():
             try:
-                query = requests.post(
-                    self.url,
-                    json=payload
-                )
-                if query.status_code != 200:
+                for item in items(response.raw, prefix):
+                    yield item
+            except RPCError as e:
+                raise self.decode_error(e)
+            finally:
+                # A completely read response has already handed its
+                # connection back to the pool
+                response.close()
+        return generate()
+
+    def send(self, payload, num_retries=None, deadline=None):
+        """ Post the payload to the node and return the decoded reply
+
+            :param json payload: Payload data
+            :param int num_retries: Retries for this call (defaults to
+                ``num_retries`` of the instance)
+            :param Deadline deadline: Finish the call by then. The remaining
+                time is used as timeout of the request.
+            :raises ValueError: if the server does not respond in proper JSON
+                                format
+            :raises DeadlineExceeded: if the call did not finish in time
+        """
+        if num_retries is None:
+            num_retries = self.num_retries
+        deadline = deadline or Deadline()
+        data = codec.dumps(payload)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(data)
+        if self.urls.should_switch(self.url):
+            log.info("Moving away from node %s" % self.url)
+            self.next()
+
+        cnt = 0
+        started = time.time()
+        try:
+            while True:
+                cnt += 1
+                url = self.url
+
+                try:
+                    start = time.time()
+                    query = self.session.post(
+                        url,
+                        data=data,
+                        timeout=deadline.limit(self.timeout)
+                    )
+                    if query.status_code != 200:
+                        raise requests.exceptions.HTTPError(
+                            "Node returned HTTP status %d" % query.status_code)
+                    self.urls.success(url, time.time() - start)
+                    break
+                except KeyboardInterrupt:
                     raise
-                break
-            except KeyboardInterrupt:
-                raise
-            except Exception as e:
-                log.warning(str(e))
-                if (self.num_retries > -1 and
-                        cnt > self.num_retries):
-                    raise NumRetriesReached()
-                sleeptime = (cnt - 1) * 2 if cnt < 10 else 10
-                if sleeptime:
+                except Exception as e:
+                    log.warning(str(e))
+                    # Move on to the next node unless another thread did
+                    # so already
+                    self.urls.failure(url)
+                    with self._lock:
+                        if self.url == url:
+                            self.next()
+                    if num_retries > -1 and cnt > num_retries:
+                        raise NumRetriesReached()
+                    sleeptime = self.retry_policy.backoff(cnt, deadline)
                     log.warning(
                         "Lost connection to node during rpcexec(): %s (%d/%d) "
-                        % (self.url, cnt, self.num_retries) +
-                        "Retrying in %d seconds" % sleeptime
+                        % (url, cnt, num_retries) +
+                        "Retrying in %.1f seconds" % sleeptime
                     )
                     time.sleep(sleeptime)
+        except Exception as e:
+            if self.metrics:
+                self.observe(
+                    url, payload, started, len(data), retries=cnt - 1,
+                    error=e)
+            raise
 
         ret = {}
         try:
-            ret = query.json()
+            ret = codec.loads(query.content)
         except ValueError:
             raise ValueError("Client returned invalid format. Expected JSON!")
 
-        log.debug(json.dumps(query.text))
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(query.content)
+        if self.recorder:
+            self.recorder.record(payload, ret)
+        if self.metrics:
+            self.observe(
+                url, payload, started, len(data), len(query.content),
+                cnt - 1, reply=ret)
+        return ret
 
-        if 'error' in ret:
-            if 'detail' in ret['error']:
-                raise RPCError(ret['error']['detail'])
-            else:
-                raise RPCError(ret['error']['message'])
-        else:
-            return ret["result"]
+    def observe(self, url, payload, started, request_size, response_size=0,
+                retries=0, reply=None, error=None):
+        """ Record a call in :attr:`metrics` (internal use only)
+        """
+        self.metrics.record(
+            payload, url, time.time() - started, request_size,
+            response_size, retries, reply, error, self.api_id)
 
-    def __getattr__(self, name):
-        """ Map all methods to RPC calls and pass through the arguments
+    def get_query(self, name, args, kwargs):
+        """ Build the JSON-RPC payload for calling ``name`` with ``args``
         """
-        def method(*args, **kwargs):
-
-            # Sepcify the api to talk to
-            if "api_id" not in kwargs:
-                if ("api" in kwargs):
-                    if (kwargs["api"] in self.api_id and
-                            self.api_id[kwargs["api"]]):
-                        api_id = self.api_id[kwargs["api"]]
-                    else:
-                        api_id = kwargs["api"]
+        # Sepcify the api to talk to
+        if "api_id" not in kwargs:
+            if ("api" in kwargs):
+                if (kwargs["api"] in self.api_id and
+                        self.api_id[kwargs["api"]]):
+                    api_id = self.api_id[kwargs["api"]]
                 else:
-                    api_id = 0
+                    api_id = kwargs["api"]
             else:
-                api_id = kwargs["api_id"]
+                api_id = 0
+        else:
+            api_id = kwargs["api_id"]
 
-            # let's be able to define the num_retries per query
-            self.num_retries = kwargs.get("num_retries", self.num_retries)
+        return {"method": "call",
+                "params": [api_id, name, list(args)],
+                "jsonrpc": "2.0",
+                "id": self.get_request_id()}
+
+    def call_options(self, kwargs):
+        """ Options of a single call that are passed on to
+            :func:`rpcexec`
+        """
+        # let's be able to define the num_retries and a timeout per query
+        return {
+            "num_retries": kwargs.get("num_retries"),
+            "deadline": Deadline(kwargs.get("timeout"), kwargs.get("deadline")),
+        }
 
-            query = {"method": "call",
-                     "params": [api_id, name, list(args)],
-                     "jsonrpc": "2.0",
-                     "id": self.get_request_id()}
-            r = self.rpcexec(query)
-            return r
+    def __getattr__(self, name):
+        """ Map all methods to RPC calls and pass through the arguments.
+            Known methods (see :attr:`methods`) are routed to their API
+            and check the number of arguments. Their method objects are
+            kept on the instance, so this is only called once per name.
+            Private and special names are not API methods.
+        """
+        if name.startswith("_"):
+            raise AttributeError(name)
+        method = Method(self, name, *self.methods.get(name, ()))
+        if name in self.methods:
+            self.__dict__[name] = method
         return method
+
+    def __dir__(self):
+        return sorted(set(super(GrapheneHTTPRPC, self).__dir__()) |
+                      set(self.methods))
@@ -1,13 +1,23 @@
 import websocket
 # import ssl
-import json
 import time
+import queue
 import logging
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 from .exceptions import (
     RPCError,
-    NumRetriesReached
+    NumRetriesReached,
+    DeadlineExceeded,
+    decodeRPCReply
 )
-from itertools import cycle
+from .batch import RPCBatch, BATCH_PROBE_TIMEOUT
+from . import codec
+from .nodes import NodeManager
+from .retry import RetryPolicy, Deadline
+from .recorder import Recorder
+from .metrics import Metrics
+from .methods import METHODS, Method
 log = logging.getLogger(__name__)
 
 
@@ -18,12 +28,40 @@ class GrapheneWebsocketRPC(object):
         * database
         * history
 
-        :param str urls: Either a single Websocket URL, or a list of URLs
+        :param str urls: Either a single Websocket URL, a list of URLs or a
+               :class:`grapheneapi.nodes.NodeManager`
         :param str user: Username for Authentication
         :param str password: Password for Authentication
         :param Array apis: List of APIs to register to
         :param int num_retries: Try x times to num_retries to a node on
                disconnect, -1 for indefinitely
+        :param float timeout: Seconds to wait for a node to reply
+               (defaults to no timeout)
+        :param RetryPolicy retry_policy: Backoff between retries (see
+               :class:`grapheneapi.retry.RetryPolicy`)
+        :param bool pipelined: Dispatch replies from a background reader
+               thread so that many requests can be in flight on the same
+               connection (defaults to ``False``)
+        :param bool race: Connect to all nodes at once at startup and keep
+               the connection that is established first (defaults to
+               ``True``)
+        :param bool probe_nodes: Probe all nodes at startup (defaults to
+               ``True`` if several URLs are given). When racing, the nodes
+               are probed in the background and the connection moves to a
+               better node if the first one turns out to be behind or slow.
+        :param int probe_interval: Probe all nodes every x seconds and move
+               to a better node if the current one is behind or slow
+        :param float probe_timeout: Seconds to wait for a node to answer a
+               probe (defaults to 5)
+        :param compression: Negotiate permessage-deflate with the node,
+               either a bool for all nodes or a dictionary that maps URLs
+               to bools (defaults to ``False``)
+        :param Recorder recorder: Record all calls and their replies (see
+               :class:`grapheneapi.recorder.Recorder`, or the path of the
+               file to record to)
+        :param Metrics metrics: Collect latency histograms, byte counts,
+               retries and errors per method (see
+               :class:`grapheneapi.metrics.Metrics`, or ``True``)
 
         Available APIs
 
@@ -39,28 +77,92 @@ class GrapheneWebsocketRPC(object):
             ws = GrapheneWebsocketRPC("ws://10.0.0.16:8090","","")
             print(ws.get_account_count())
 
+        The number of retries and a timeout (or an absolute ``deadline``)
+        can be given per call. Calls that do not finish in time raise
+        :class:`grapheneapi.exceptions.DeadlineExceeded`:
+
+        .. code-block:: python
+
+            ws.get_block(1234, timeout=2, num_retries=3)
+
+        In pipelined mode, the instance can be shared between threads and
+        calls can be issued without waiting for the reply:
+
+        .. code-block:: python
+
+            ws = GrapheneWebsocketRPC("ws://10.0.0.16:8090", pipelined=True)
+            futures = [ws.call_async("get_block", n) for n in range(1, 100)]
+            blocks = [f.result() for f in futures]
+
         .. note:: This class allows to call methods available via
                   websocket. If you want to use the notification
                   subsystem, please use ``GrapheneWebsocket`` instead.
 
     """
+    #: Known API methods, see :attr:`grapheneapi.methods.METHODS`
+    methods = METHODS
+
     def __init__(self, urls, user=None, password=None, **kwargs):
         self.api_id = {}
+        # Whether nodes answer JSON-RPC batches, by URL
+        self.batch_support = {}
         self._request_id = 0
-        if isinstance(urls, list):
-            self.urls = cycle(urls)
+        self._lock = threading.Lock()
+        # A NodeManager is shared so that several connections pool their
+        # knowledge about the nodes
+        if isinstance(urls, NodeManager):
+            self.urls = urls
         else:
-            self.urls = cycle([urls])
+            self.urls = NodeManager(urls)
         self.user = user
         self.password = password
         self.num_retries = kwargs.get("num_retries", -1)
+        self.timeout = kwargs.get("timeout")
+        self.retry_policy = kwargs.get("retry_policy") or RetryPolicy()
+        self.recorder = kwargs.get("recorder")
+        if isinstance(self.recorder, str):
+            self.recorder = Recorder(self.recorder)
+        self.metrics = kwargs.get("metrics")
+        if self.metrics is True:
+            self.metrics = Metrics()
+        self.compression = kwargs.get("compression", False)
+        self.race = kwargs.get("race", True)
+        self.ws = None
+
+        # Pipelining
+        self.pipelined = bool(kwargs.get("pipelined", False))
+        self.reader = None
+        self._pending = {}
+        self._send_lock = threading.RLock()
+
+        # Node selection
+        self.probe_timeout = kwargs.get("probe_timeout", 5)
+        if kwargs.get("probe_nodes", len(self.urls) > 1):
+            if self.race:
+                threading.Thread(
+                    target=self.urls.probe, args=(self.probe_node,),
+                    name="GrapheneWebsocketRPC probe", daemon=True
+                ).start()
+            else:
+                self.urls.probe(self.probe_node)
+        if kwargs.get("probe_interval"):
+            self.urls.start_probing(
+                self.probe_node, kwargs["probe_interval"])
 
         self.wsconnect()
+        if self.pipelined:
+            self.reader = threading.Thread(
+                target=self.read_replies,
+                name="GrapheneWebsocketRPC reader",
+                daemon=True
+            )
+            self.reader.start()
         self.register_apis()
 
     def get_request_id(self):
-        self._request_id += 1
-        return self._request_id
+        with self._lock:
+            self._request_id += 1
+            return self._request_id
 
     def next(self):
         if self.ws:
@@ -71,35 +173,127 @@ class GrapheneWebsocketRPC(object):
         self.wsconnect()
         self.register_apis()
 
-    def wsconnect(self):
+    def probe_node(self, url):
+        """ Measure the round trip time of a fresh connection to ``url``
+
+            :returns: latency and dynamic global properties of the node
+        """
+        ws = websocket.create_connection(url, timeout=self.probe_timeout)
+        try:
+            start = time.time()
+            ws.send(codec.dumps({
+                "method": "call",
+                "params": [0, "get_dynamic_global_properties", []],
+                "jsonrpc": "2.0",
+                "id": 1
+            }))
+            ret = codec.loads(ws.recv())
+            return time.time() - start, decodeRPCReply(ret)
+        finally:
+            ws.close()
+
+    def use_compression(self, url):
+        """ Returns ``True`` if the connection to ``url`` is to be
+            compressed
+        """
+        if isinstance(self.compression, dict):
+            return bool(self.compression.get(url, False))
+        return bool(self.compression)
+
+    def create_websocket(self, url):
+        """ Returns an unconnected websocket for the node ``url``
+        """
+        if self.use_compression(url):
+            from .compression import DeflateWebsocket
+            return DeflateWebsocket()
+        elif url[:3] == "wss":
+            sslopt_ca_certs = {}  # {'cert_reqs': ssl.CERT_NONE}
+            return websocket.WebSocket(sslopt=sslopt_ca_certs)
+        else:
+            return websocket.WebSocket()
+
+    def connect_race(self, deadline):
+        """ Connect to all nodes at once and keep the connection that is
+            established first. The other connections are closed.
+
+            :returns: URL and websocket of the node
+            :raises Exception: the error of the last node if no connection
+                could be established
+        """
+        urls = [
+            n.url for n in self.urls.nodes if not self.urls.is_open(n)
+        ] or self.urls.urls
+        results = queue.Queue()
+
+        def connect(url):
+            ws = self.create_websocket(url)
+            try:
+                ws.connect(url, timeout=deadline.limit(self.timeout))
+            except Exception as e:
+                log.warning("Unable to connect to %s: %s" % (url, str(e)))
+                self.urls.failure(url)
+                results.put((url, None, e))
+            else:
+                results.put((url, ws, None))
+
+        def close(remaining):
+            for i in range(remaining):
+                url, ws, error = results.get()
+                if ws:
+                    ws.close()
+
+        log.debug("Racing connections to %s" % urls)
+        for url in urls:
+            threading.Thread(
+                target=connect, args=(url,), daemon=True).start()
+        for i in range(len(urls)):
+            url, ws, error = results.get()
+            if ws:
+                threading.Thread(
+                    target=close, args=(len(urls) - i - 1,), daemon=True
+                ).start()
+                self.urls.success(url)
+                return url, ws
+        raise error
+
+    def wsconnect(self, num_retries=None, deadline=None):
+        if num_retries is None:
+            num_retries = self.num_retries
+        deadline = deadline or Deadline()
+        # Race the nodes when connecting for the first time
+        race = self.ws is None and self.race and len(self.urls) > 1
         cnt = 0
         while True:
             cnt += 1
-            self.url = next(self.urls)
-            log.debug("Trying to connect to node %s" % self.url)
-            if self.url[:3] == "wss":
-                sslopt_ca_certs = {}  # {'cert_reqs': ssl.CERT_NONE}
-                self.ws = websocket.WebSocket(sslopt=sslopt_ca_certs)
-            else:
-                self.ws = websocket.WebSocket()
             try:
-                self.ws.connect(self.url)
+                if race:
+                    self.url, self.ws = self.connect_race(deadline)
+                else:
+                    self.url = next(self.urls)
+                    log.debug("Trying to connect to node %s" % self.url)
+                    self.ws = self.create_websocket(self.url)
+                    self.ws.connect(
+                        self.url, timeout=deadline.limit(self.timeout))
                 break
             except KeyboardInterrupt:
                 raise
             except Exception as e:
-                log.warning(str(e))
-                if (self.num_retries > -1 and
-                        cnt > self.num_retries):
+                if race:
+                    # Failures have been recorded per node
+                    url = ", ".join(self.urls.urls)
+                else:
+                    url = self.url
+                    log.warning(str(e))
+                    self.urls.failure(url)
+                if num_retries > -1 and cnt > num_retries:
                     raise NumRetriesReached()
-                sleeptime = (cnt - 1) * 2 if cnt < 10 else 10
-                if sleeptime:
-                    log.warning(
-                        "Lost connection to node during rpcexec(): %s (%d/%d) "
-                        % (self.url, cnt, self.num_retries) +
-                        "Retrying in %d seconds" % sleeptime
-                    )
-                    time.sleep(sleeptime)
+                sleeptime = self.retry_policy.backoff(cnt, deadline)
+                log.warning(
+                    "Lost connection to node during wsconnect(): %s (%d/%d) "
+                    % (url, cnt, num_retries) +
+                    "Retrying in %.1f seconds" % sleeptime
+                )
+                time.sleep(sleeptime)
         if self.user and self.password:
             self.login(self.user, self.password, api_id=1)
 
@@ -115,101 +309,463 @@ class GrapheneWebsocketRPC(object):
 
     """ RPC Calls
     """
-    def rpcexec(self, payload):
+    def rpcexec(self, payload, **kwargs):
         """ Execute a call by sending the payload
 
             :param json payload: Payload data
+            :param int num_retries: Retries for this call
+            :param Deadline deadline: Finish the call by then
             :raises ValueError: if the server does not respond in proper JSON
             format
             :raises RPCError: if the server returns an error
+            :raises DeadlineExceeded: if the call did not finish in time
         """
-        log.debug(json.dumps(payload))
-        cnt = 0
-        while True:
-            cnt += 1
+        try:
+            return decodeRPCReply(self.send(payload, **kwargs))
+        except RPCError as e:
+            raise self.decode_error(e)
+
+    def decode_error(self, e):
+        """ Hook for subclasses that turn a generic :class:`RPCError` into a
+            more specific exception
+        """
+        return e
+
+    def rpcexec_batch(self, payloads):
+        """ Execute many calls by sending the payloads as a single
+            JSON-RPC array frame
 
+            :param list payloads: List of payload data
+            :returns: dictionary that maps each request id to either the
+                result or the :class:`RPCError` of the call
+            :raises ValueError: if the server does not respond in proper JSON
+            format
+        """
+        url = self.url
+        if self.batch_support.get(url) is False:
+            ret = None
+        elif url in self.batch_support:
+            ret = self.send(payloads)
+        else:
+            ret = self.probe_batch(payloads)
+        if not isinstance(ret, list):
+            # The node does not understand batches, send them one by one
+            if self.batch_support.get(url) is not False:
+                log.warning("Node %s does not support batch calls" % url)
+                self.batch_support[url] = False
+            ret = [self.send(payload) for payload in payloads]
+        replies = {}
+        for reply in ret:
+            try:
+                replies[reply.get("id")] = decodeRPCReply(reply)
+            except RPCError as e:
+                replies[reply.get("id")] = self.decode_error(e)
+        return replies
+
+    def probe_batch(self, payloads):
+        """ Send the first batch to a node with a short timeout (see
+            :attr:`grapheneapi.batch.BATCH_PROBE_TIMEOUT`) to learn whether
+            it answers batches
+
+            :returns: the reply, or ``None`` if the node did not answer in
+                time or not in proper JSON
+        """
+        url = self.url
+        try:
+            ret = self.send(
+                payloads, num_retries=0,
+                deadline=Deadline(BATCH_PROBE_TIMEOUT))
+        except (NumRetriesReached, DeadlineExceeded, ValueError) as e:
+            log.warning("Node %s did not answer a batch: %s" % (url, str(e)))
+            return None
+        self.batch_support[url] = isinstance(ret, list)
+        return ret
+
+    def batch(self, chunk_size=None):
+        """ Returns a :class:`grapheneapi.batch.RPCBatch` that collects
+            calls and executes them in a single round trip
+
+            :param int chunk_size: Send at most ``chunk_size`` calls per
+                frame
+        """
+        return RPCBatch(self, chunk_size=chunk_size)
+
+    def stream(self, name, *args, **kwargs):
+        """ Call the API method ``name`` and decode the items of the
+            result while the reply is being received, so that memory usage
+            does not depend on the size of the reply (requires ``ijson``)
+
+            :param str name: Name of the API method
+            :param str prefix: Path of the items to yield (defaults to
+                ``result.item``, i.e. the elements of the result)
+            :returns: generator of the items
+            :raises RPCError: if the server returns an error
+
+            .. code-block:: python
+
+                for tx in ws.stream("get_block", 1234,
+                                    prefix="result.transactions.item"):
+                    print(tx)
+
+            .. note:: The websocket delivers the reply in frames. Only the
+                      frame being decoded is kept in memory.
+        """
+        from .streaming import FrameReader, items
+        if self.is_pipelined():
+            raise ValueError("Streaming is not available in pipelined mode")
+        prefix = kwargs.pop("prefix", "result.item")
+        query = self.get_query(name, args, kwargs)
+        self.ws.send(codec.dumps(query))
+        reader = FrameReader(self.ws)
+
+        def generate():
+            try:
+                for item in items(reader, prefix):
+                    yield item
+            except RPCError as e:
+                reader.drain()
+                raise self.decode_error(e)
+            except GeneratorExit:
+                # Don't leave the rest of the reply on the connection
+                reader.drain()
+                raise
+        return generate()
+
+    def call_async(self, name, *args, **kwargs):
+        """ Call the API method ``name`` without waiting for the reply
+
+            :param str name: Name of the API method
+            :returns: :class:`concurrent.futures.Future` that resolves to
+                the result of the call
+        """
+        query = self.get_query(name, args, kwargs)
+        if not self.is_pipelined():
+            # Without a reader thread, the call is executed right away
+            future = Future()
+            try:
+                future.set_result(self.rpcexec(query))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        return self.send_async(query, decode=True)
+
+    def is_pipelined(self):
+        """ Returns ``True`` if replies are dispatched by the reader thread.
+            The reader thread itself talks to the node synchronously
+            (e.g. while reconnecting).
+        """
+        return (
+            self.reader is not None and
+            threading.current_thread() is not self.reader
+        )
+
+    def send_async(self, payload, decode=False):
+        """ Send the payload to the node and register a future for the
+            reply (pipelined mode only)
+
+            :param json payload: Payload data (or list of payloads)
+            :param bool decode: Resolve to the ``result`` of the reply
+                instead of the decoded reply itself
+            :returns: :class:`concurrent.futures.Future`
+        """
+        future = Future()
+        ids = [p["id"] for p in payload] if isinstance(payload, list) else [
+            payload["id"]]
+
+        def discard(f):
+            if f.cancelled():
+                for id in ids:
+                    self._pending.pop(id, None)
+        future.add_done_callback(discard)
+
+        with self._send_lock:
+            for id in ids:
+                self._pending[id] = (payload, future, decode)
+            data = codec.dumps(payload)
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug(data)
+            future.started = time.time()
+            future.request_size = len(data)
+            try:
+                self.ws.send(data)
+            except Exception as e:
+                # The reader thread reconnects and sends pending
+                # requests again
+                log.warning(str(e))
+        return future
+
+    def wait_for(self, future, deadline):
+        """ Wait for the result of ``future`` until the deadline passes,
+            then cancel it
+
+            :raises DeadlineExceeded: if the future is not done in time
+        """
+        try:
+            return future.result(timeout=deadline.limit(self.timeout))
+        except FutureTimeoutError:
+            future.cancel()
+            raise DeadlineExceeded("Node %s did not reply in time" % self.url)
+
+    def read_replies(self):
+        """ Reader thread of the pipelined mode. Receives replies and
+            resolves the futures of the corresponding requests.
+        """
+        while self.reader is not None:
             try:
-                self.ws.send(
-                    json.dumps(payload, ensure_ascii=False).encode('utf8')
-                )
                 reply = self.ws.recv()
-                break
-            except KeyboardInterrupt:
+            except Exception as e:
+                if self.reader is None:
+                    break
+                log.warning(
+                    "Lost connection to node %s: %s" % (self.url, str(e)))
+                try:
+                    with self._send_lock:
+                        self.next()
+                        self.resend_pending()
+                except Exception as e:
+                    self.fail_pending(e)
+                    self.reader = None
+                continue
+
+            try:
+                ret = codec.loads(reply)
+            except ValueError:
+                log.error("Client returned invalid format. Expected JSON!")
+                continue
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug(reply)
+
+            if isinstance(ret, list):
+                ids = [r.get("id") for r in ret]
+            else:
+                ids = [ret.get("id")]
+            pending = None
+            for id in ids:
+                pending = self._pending.pop(id, None) or pending
+            if not pending:
+                log.debug("Dropping reply for unknown request %s" % ids)
+                continue
+            payload, future, decode = pending
+            if isinstance(payload, list):
+                for p in payload:
+                    self._pending.pop(p["id"], None)
+            if self.recorder:
+                self.recorder.record(payload, ret)
+            if self.metrics:
+                self.observe(
+                    payload, future.started, future.request_size,
+                    len(reply), reply=ret)
+            self.resolve(future, ret, decode)
+
+    def resolve(self, future, ret, decode):
+        if not future.set_running_or_notify_cancel():
+            return
+        if not decode:
+            future.set_result(ret)
+            return
+        try:
+            future.set_result(decodeRPCReply(ret))
+        except Exception as e:
+            # Don't let the error reference the reader's frame
+            if isinstance(e, RPCError):
+                e = self.decode_error(e)
+            future.set_exception(e.with_traceback(None))
+
+    def resend_pending(self):
+        sent = set()
+        for payload, future, decode in list(self._pending.values()):
+            if id(future) in sent:
+                continue
+            sent.add(id(future))
+            self.ws.send(codec.dumps(payload))
+
+    def fail_pending(self, e):
+        pending, self._pending = self._pending, {}
+        for payload, future, decode in pending.values():
+            if not future.done():
+                future.set_exception(e)
+
+    def close(self):
+        """ Stop the reader thread and close the connection
+        """
+        reader, self.reader = self.reader, None
+        try:
+            self.ws.close()
+        except Exception:
+            pass
+        if reader and reader is not threading.current_thread():
+            reader.join()
+        self.fail_pending(RPCError("Connection closed"))
+
+    def send(self, payload, num_retries=None, deadline=None, priority=None):
+        """ Send the payload to the node and return the decoded reply
+
+            :param json payload: Payload data
+            :param int num_retries: Retries for this call (defaults to
+                ``num_retries`` of the instance)
+            :param Deadline deadline: Finish the call by then. The remaining
+                time is used as timeout of the socket.
+            :param str priority: Priority class of the call, passed on to
+                :func:`throttle`
+            :raises ValueError: if the server does not respond in proper JSON
+            format
+            :raises DeadlineExceeded: if the call did not finish in time
+        """
+        if num_retries is None:
+            num_retries = self.num_retries
+        deadline = deadline or Deadline()
+
+        if self.is_pipelined():
+            self.throttle(payload, priority)
+            future = self.send_async(payload)
+            try:
+                return self.wait_for(future, deadline)
+            except DeadlineExceeded as e:
+                if self.metrics:
+                    self.observe(
+                        payload, future.started, future.request_size,
+                        error=e)
                 raise
-            except Exception:
-                if (self.num_retries > -1 and
-                        cnt > self.num_retries):
-                    raise NumRetriesReached()
-                sleeptime = (cnt - 1) * 2 if cnt < 10 else 10
-                if sleeptime:
+
+        if not getattr(self.ws, "connected", True):
+            # The previous call gave up on the connection
+            self.wsconnect(num_retries, deadline)
+            self.register_apis()
+        elif self.urls.should_switch(self.url):
+            log.info("Moving away from node %s" % self.url)
+            self.next()
+
+        data = codec.dumps(payload)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(data)
+        cnt = 0
+        started = time.time()
+        try:
+            while True:
+                cnt += 1
+
+                try:
+                    # Every attempt counts against the node it goes to
+                    self.throttle(payload, priority)
+                    start = time.time()
+                    self.ws.settimeout(deadline.limit(self.timeout))
+                    self.ws.send(data)
+                    reply = self.ws.recv()
+                    self.urls.success(self.url, time.time() - start)
+                    break
+                except KeyboardInterrupt:
+                    raise
+                except Exception as e:
+                    log.warning(str(e))
+                    self.urls.failure(self.url)
+                    # A late reply must not be taken for the reply of the
+                    # next call
+                    try:
+                        self.ws.close()
+                    except Exception:
+                        pass
+                    if num_retries > -1 and cnt > num_retries:
+                        raise NumRetriesReached()
+                    sleeptime = self.retry_policy.backoff(cnt, deadline)
                     log.warning(
                         "Lost connection to node during rpcexec(): %s (%d/%d) "
-                        % (self.url, cnt, self.num_retries) +
-                        "Retrying in %d seconds" % sleeptime
+                        % (self.url, cnt, num_retries) +
+                        "Retrying in %.1f seconds" % sleeptime
                     )
                     time.sleep(sleeptime)
 
-                # retry
-                try:
-                    self.ws.close()
-                    time.sleep(sleeptime)
-                    self.wsconnect()
-                    self.register_apis()
-                except Exception:
-                    pass
+                    # retry
+                    try:
+                        self.wsconnect(num_retries, deadline)
+                        self.register_apis()
+                    except DeadlineExceeded:
+                        raise
+                    except Exception:
+                        pass
+        except Exception as e:
+            if self.metrics:
+                self.observe(
+                    payload, started, len(data), retries=cnt - 1, error=e)
+            raise
 
         ret = {}
         try:
-            ret = json.loads(reply, strict=False)
+            ret = codec.loads(reply)
         except ValueError:
             raise ValueError("Client returned invalid format. Expected JSON!")
 
-        log.debug(json.dumps(reply))
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(reply)
+        if self.recorder:
+            self.recorder.record(payload, ret)
+        if self.metrics:
+            self.observe(
+                payload, started, len(data), len(reply), cnt - 1, reply=ret)
+        return ret
 
-        if 'error' in ret:
-            if 'detail' in ret['error']:
-                raise RPCError(ret['error']['detail'])
+    def throttle(self, payload, priority=None):
+        """ Called right before ``payload`` is sent to :attr:`url`, e.g.
+            to wait for a rate limit
+        """
+        pass
+
+    def observe(self, payload, started, request_size, response_size=0,
+                retries=0, reply=None, error=None):
+        """ Record a call in :attr:`metrics` (internal use only)
+        """
+        self.metrics.record(
+            payload, self.url, time.time() - started, request_size,
+            response_size, retries, reply, error, self.api_id)
+
+    def get_query(self, name, args, kwargs):
+        """ Build the JSON-RPC payload for calling ``name`` with ``args``
+        """
+        # Sepcify the api to talk to
+        if "api_id" not in kwargs:
+            if ("api" in kwargs):
+                if (kwargs["api"] in self.api_id and
+                        self.api_id[kwargs["api"]]):
+                    api_id = self.api_id[kwargs["api"]]
+                else:
+                    # Try the query by providing the argument
+                    # right away
+                    api_id = kwargs["api"]
             else:
-                raise RPCError(ret['error']['message'])
+                api_id = 0
         else:
-            return ret["result"]
+            api_id = kwargs["api_id"]
+
+        return {"method": "call",
+                "params": [api_id, name, list(args)],
+                "jsonrpc": "2.0",
+                "id": self.get_request_id()}
+
+    def call_options(self, kwargs):
+        """ Options of a single call that are passed on to
+            :func:`rpcexec`
+        """
+        # let's be able to define the num_retries and a timeout per query
+        return {
+            "num_retries": kwargs.get("num_retries"),
+            "deadline": Deadline(kwargs.get("timeout"), kwargs.get("deadline")),
+        }
 
     # End of Deprecated methods
     ####################################################################
     def __getattr__(self, name):
-        """ Map all methods to RPC calls and pass through the arguments
-        """
-        def method(*args, **kwargs):
-
-            # Sepcify the api to talk to
-            if "api_id" not in kwargs:
-                if ("api" in kwargs):
-                    if (kwargs["api"] in self.api_id and
-                            self.api_id[kwargs["api"]]):
-                        api_id = self.api_id[kwargs["api"]]
-                    else:
-                        # Try the query by providing the argument
-                        # right away
-                        api_id = kwargs["api"]
-                        """
-                        raise ValueError(
-                            "Unknown API! "
-                            "Verify that you have registered to %s"
-                            % kwargs["api"]
-                        )
-                        """
-                else:
-                    api_id = 0
-            else:
-                api_id = kwargs["api_id"]
-
-            # let's be able to define the num_retries per query
-            self.num_retries = kwargs.get("num_retries", self.num_retries)
-
-            query = {"method": "call",
-                     "params": [api_id, name, list(args)],
-                     "jsonrpc": "2.0",
-                     "id": self.get_request_id()}
-            r = self.rpcexec(query)
-            return r
+        """ Map all methods to RPC calls and pass through the arguments.
+            Known methods (see :attr:`methods`) are routed to their API
+            and check the number of arguments. Their method objects are
+            kept on the instance, so this is only called once per name.
+            Private and special names are not API methods.
+        """
+        if name.startswith("_"):
+            raise AttributeError(name)
+        method = Method(self, name, *self.methods.get(name, ()))
+        if name in self.methods:
+            self.__dict__[name] = method
         return method
+
+    def __dir__(self):
+        return sorted(set(super(GrapheneWebsocketRPC, self).__dir__()) |
+                      set(self.methods))
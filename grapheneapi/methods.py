@@ -0,0 +1,172 @@
+""" Known API methods of a graphene node
+
+    :attr:`METHODS` maps the name of a method to the API it belongs to and
+    the number of arguments it takes. Connections use the table to route
+    calls to the right API and to reject calls with a wrong number of
+    arguments before anything is sent to the node:
+
+    .. code-block:: python
+
+        rpc.get_account_history("1.2.100", "1.11.0", 100, "1.11.0")
+        # is sent to the history API
+
+        rpc.get_block()
+        # TypeError: get_block() takes 1 argument (0 given)
+
+    Methods that are not listed are still available, but are sent to the
+    database API unchecked.
+"""
+
+#: Keyword arguments that route a call to its API. Calls to the database
+#: API are sent with api id 0, calls to the login API with api id 1.
+ROUTES = {
+    "database": {},
+    "login": {"api_id": 1},
+    "history": {"api": "history"},
+    "network_broadcast": {"api": "network_broadcast"},
+}
+
+#: API and number of arguments (or a ``(min, max)`` tuple) per method
+METHODS = {
+    # Login API
+    "login": ("login", 2),
+    "database": ("login", 0),
+    "history": ("login", 0),
+    "network_broadcast": ("login", 0),
+    "network_node": ("login", 0),
+    "crypto": ("login", 0),
+
+    # Database API: objects and subscriptions
+    "get_objects": ("database", 1),
+    "set_subscribe_callback": ("database", 2),
+    "set_pending_transaction_callback": ("database", 1),
+    "set_block_applied_callback": ("database", 1),
+    "cancel_all_subscriptions": ("database", 0),
+
+    # Database API: blocks and transactions
+    "get_block_header": ("database", 1),
+    "get_block": ("database", 1),
+    "get_transaction": ("database", 2),
+    "get_recent_transaction_by_id": ("database", 1),
+
+    # Database API: globals
+    "get_chain_properties": ("database", 0),
+    "get_global_properties": ("database", 0),
+    "get_config": ("database", 0),
+    "get_chain_id": ("database", 0),
+    "get_dynamic_global_properties": ("database", 0),
+
+    # Database API: keys and accounts
+    "get_key_references": ("database", 1),
+    "get_accounts": ("database", 1),
+    "get_full_accounts": ("database", 2),
+    "get_account_by_name": ("database", 1),
+    "get_account_references": ("database", 1),
+    "lookup_account_names": ("database", 1),
+    "lookup_accounts": ("database", 2),
+    "get_account_count": ("database", 0),
+
+    # Database API: balances
+    "get_account_balances": ("database", 2),
+    "get_named_account_balances": ("database", 2),
+    "get_balance_objects": ("database", 1),
+    "get_vested_balances": ("database", 1),
+    "get_vesting_balances": ("database", 1),
+
+    # Database API: assets
+    "get_assets": ("database", 1),
+    "list_assets": ("database", 2),
+    "lookup_asset_symbols": ("database", 1),
+
+    # Database API: markets
+    "get_order_book": ("database", 3),
+    "get_limit_orders": ("database", 3),
+    "get_call_orders": ("database", 2),
+    "get_settle_orders": ("database", 2),
+    "get_margin_positions": ("database", 1),
+    "subscribe_to_market": ("database", 3),
+    "unsubscribe_from_market": ("database", 2),
+    "get_ticker": ("database", 2),
+    "get_24_volume": ("database", 2),
+    "get_trade_history": ("database", 5),
+
+    # Database API: witnesses, committee members and workers
+    "get_witnesses": ("database", 1),
+    "get_witness_by_account": ("database", 1),
+    "lookup_witness_accounts": ("database", 2),
+    "get_witness_count": ("database", 0),
+    "get_committee_members": ("database", 1),
+    "get_committee_member_by_account": ("database", 1),
+    "lookup_committee_member_accounts": ("database", 2),
+    "get_workers_by_account": ("database", 1),
+    "lookup_vote_ids": ("database", 1),
+
+    # Database API: authority and validation
+    "get_transaction_hex": ("database", 1),
+    "get_required_signatures": ("database", 2),
+    "get_potential_signatures": ("database", 1),
+    "get_potential_address_signatures": ("database", 1),
+    "verify_authority": ("database", 1),
+    "verify_account_authority": ("database", 2),
+    "validate_transaction": ("database", 1),
+    "get_required_fees": ("database", 2),
+
+    # Database API: proposals and blinded balances
+    "get_proposed_transactions": ("database", 1),
+    "get_blinded_balances": ("database", 1),
+
+    # History API
+    "get_account_history": ("history", 4),
+    "get_relative_account_history": ("history", 4),
+    "get_fill_order_history": ("history", 3),
+    "get_market_history": ("history", 5),
+    "get_market_history_buckets": ("history", 0),
+
+    # Network broadcast API
+    "broadcast_transaction": ("network_broadcast", 1),
+    "broadcast_transaction_with_callback": ("network_broadcast", 2),
+    "broadcast_transaction_synchronous": ("network_broadcast", 1),
+    "broadcast_block": ("network_broadcast", 1),
+}
+
+
+class Method(object):
+    """ API method bound to a connection
+
+        :param rpc: Connection that executes the calls
+        :param str name: Name of the method
+        :param str api: API of the method (see :attr:`ROUTES`)
+        :param args: Number of arguments, or a ``(min, max)`` tuple, or
+            ``None`` to not check the arguments
+    """
+    __slots__ = ["rpc", "name", "api", "route", "min_args", "max_args"]
+
+    def __init__(self, rpc, name, api=None, args=None):
+        self.rpc = rpc
+        self.name = name
+        self.api = api
+        self.route = ROUTES.get(api)
+        if isinstance(args, (tuple, list)):
+            self.min_args, self.max_args = args
+        else:
+            self.min_args = self.max_args = args
+
+    def __repr__(self):
+        return "<Method %s of %s API>" % (self.name, self.api or "unknown")
+
+    def __call__(self, *args, **kwargs):
+        if (self.max_args is not None and
+                not self.min_args <= len(args) <= self.max_args):
+            if self.min_args == self.max_args:
+                expected = "%d argument%s" % (
+                    self.max_args, "" if self.max_args == 1 else "s")
+            else:
+                expected = "%d to %d arguments" % (
+                    self.min_args, self.max_args)
+            raise TypeError("%s() takes %s (%d given)" % (
+                self.name, expected, len(args)))
+        if self.route and "api" not in kwargs and "api_id" not in kwargs:
+            kwargs.update(self.route)
+        rpc = self.rpc
+        query = rpc.get_query(self.name, args, kwargs)
+        return rpc.rpcexec(query, **rpc.call_options(kwargs))
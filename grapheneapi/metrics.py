@@ -0,0 +1,285 @@
+""" Instrumentation of the RPC calls
+
+    Pass a :class:`Metrics` instance (or ``metrics=True``) to a connection
+    to record, for every call, the latency, the size of request and reply,
+    the number of retries and the class of the error, if any:
+
+    .. code-block:: python
+
+        from grapheneapi.metrics import Metrics
+        metrics = Metrics()
+        rpc = GrapheneWebsocketRPC("wss://node.vinchain.io", metrics=metrics)
+        rpc.get_block(1)
+        print(metrics.summary()["get_block"])
+        print(metrics.prometheus())
+
+    Latencies are counted in fixed buckets, so recording a call costs a
+    few dictionary lookups and no memory that grows with the number of
+    calls.
+"""
+import logging
+import threading
+from bisect import bisect_left
+log = logging.getLogger(__name__)
+
+#: Upper bounds of the latency buckets in seconds
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram(object):
+    """ Counts observations in buckets with fixed upper bounds
+
+        :param tuple buckets: Upper bounds in increasing order
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def merge(self, other):
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.count += other.count
+        self.sum += other.sum
+
+    def quantile(self, q):
+        """ Estimate the ``q`` quantile (``0 <= q <= 1``) by interpolating
+            within its bucket. Values in the last bucket are reported as
+            its lower bound.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (
+                    (rank - seen) / count)
+            seen += count
+        return self.buckets[-1]
+
+
+class CallStats(object):
+    """ Statistics of the calls of a method to a node
+    """
+    __slots__ = [
+        "latency", "calls", "request_bytes", "response_bytes",
+        "retries", "errors"
+    ]
+
+    def __init__(self, buckets):
+        self.latency = Histogram(buckets)
+        self.calls = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.retries = 0
+        self.errors = {}
+
+
+class Metrics(object):
+    """ Collects statistics of RPC calls per method, API and node
+
+        :param tuple buckets: Upper bounds of the latency buckets in
+            seconds (defaults to :attr:`DEFAULT_BUCKETS`)
+        :param fnt callback: Called with a dictionary for every recorded
+            call, with the keys ``method``, ``api``, ``node``, ``latency``,
+            ``request_bytes``, ``response_bytes``, ``retries`` and
+            ``error`` (the class name of the error or ``None``)
+
+        An instance can be shared between connections.
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS, callback=None):
+        self.buckets = tuple(buckets)
+        self.callback = callback
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def observe(
+        self,
+        method,
+        api,
+        node,
+        latency,
+        request_bytes=0,
+        response_bytes=0,
+        retries=0,
+        error=None
+    ):
+        """ Record a call
+
+            :param str method: Name of the API method
+            :param str api: Name (or id) of the API
+            :param str node: URL of the node
+            :param float latency: Seconds until the reply arrived, including
+                retries
+            :param int request_bytes: Size of the request
+            :param int response_bytes: Size of the reply
+            :param int retries: Number of retries
+            :param str error: Class name of the error, if the call failed
+        """
+        key = (method, api, node)
+        with self._lock:
+            stats = self.calls.get(key)
+            if stats is None:
+                stats = self.calls[key] = CallStats(self.buckets)
+            stats.calls += 1
+            stats.latency.observe(latency)
+            stats.request_bytes += request_bytes
+            stats.response_bytes += response_bytes
+            stats.retries += retries
+            if error:
+                stats.errors[error] = stats.errors.get(error, 0) + 1
+        if self.callback:
+            try:
+                self.callback({
+                    "method": method,
+                    "api": api,
+                    "node": node,
+                    "latency": latency,
+                    "request_bytes": request_bytes,
+                    "response_bytes": response_bytes,
+                    "retries": retries,
+                    "error": error,
+                })
+            except Exception as e:
+                log.warning("Error in metrics callback: %s" % str(e))
+
+    def record(
+        self,
+        payload,
+        node,
+        latency,
+        request_bytes=0,
+        response_bytes=0,
+        retries=0,
+        reply=None,
+        error=None,
+        api_ids=None
+    ):
+        """ Record a call from its JSON-RPC payload (internal use only)
+
+            :param payload: Payload (or list of payloads for a batch)
+            :param reply: Decoded reply, to tell whether the node returned
+                an error
+            :param Exception error: Error of the call
+            :param dict api_ids: Registered API ids by name, to label calls
+                with the name of the API
+        """
+        if isinstance(payload, list):
+            method, api = "batch", ""
+        else:
+            api, method = payload["params"][:2]
+            if api_ids:
+                for name, id in api_ids.items():
+                    if id == api:
+                        api = name
+                        break
+        if error is not None:
+            error = type(error).__name__
+        elif isinstance(reply, dict) and "error" in reply:
+            error = "RPCError"
+        self.observe(
+            method, str(api), node, latency, request_bytes, response_bytes,
+            retries, error)
+
+    def histogram(self, method=None, api=None, node=None):
+        """ Latency histogram of all calls that match the given method, API
+            and node
+        """
+        merged = Histogram(self.buckets)
+        with self._lock:
+            for (m, a, n), stats in self.calls.items():
+                if ((method is None or m == method) and
+                        (api is None or a == api) and
+                        (node is None or n == node)):
+                    merged.merge(stats.latency)
+        return merged
+
+    def summary(self):
+        """ Statistics per method
+
+            :returns: dictionary that maps the method names to dictionaries
+                with ``calls``, ``errors``, ``retries``, ``request_bytes``,
+                ``response_bytes``, the mean latency ``mean`` and the
+                estimated latency percentiles ``p50``, ``p95`` and ``p99``
+        """
+        with self._lock:
+            methods = {}
+            for (method, api, node), stats in self.calls.items():
+                m = methods.setdefault(method, {
+                    "calls": 0, "errors": 0, "retries": 0,
+                    "request_bytes": 0, "response_bytes": 0,
+                    "latency": Histogram(self.buckets)})
+                m["calls"] += stats.calls
+                m["errors"] += sum(stats.errors.values())
+                m["retries"] += stats.retries
+                m["request_bytes"] += stats.request_bytes
+                m["response_bytes"] += stats.response_bytes
+                m["latency"].merge(stats.latency)
+        for m in methods.values():
+            latency = m.pop("latency")
+            m["mean"] = latency.sum / latency.count if latency.count else None
+            m["p50"] = latency.quantile(0.5)
+            m["p95"] = latency.quantile(0.95)
+            m["p99"] = latency.quantile(0.99)
+        return methods
+
+    def prometheus(self, prefix="graphene_rpc"):
+        """ Returns all metrics in the Prometheus text exposition format
+        """
+        def labels(method, api, node, **extra):
+            pairs = [("method", method), ("api", api), ("node", node)]
+            pairs += sorted(extra.items())
+            return "{%s}" % ",".join(
+                '%s="%s"' % (k, str(v).replace("\\", "\\\\").replace(
+                    '"', '\\"')) for k, v in pairs)
+
+        with self._lock:
+            calls = sorted(self.calls.items())
+            lines = [
+                "# HELP %s_latency_seconds Latency of RPC calls" % prefix,
+                "# TYPE %s_latency_seconds histogram" % prefix,
+            ]
+            for key, stats in calls:
+                cumulative = 0
+                for bound, count in zip(
+                    self.buckets + ("+Inf",), stats.latency.counts
+                ):
+                    cumulative += count
+                    lines.append("%s_latency_seconds_bucket%s %d" % (
+                        prefix, labels(*key, le=bound), cumulative))
+                lines.append("%s_latency_seconds_sum%s %r" % (
+                    prefix, labels(*key), stats.latency.sum))
+                lines.append("%s_latency_seconds_count%s %d" % (
+                    prefix, labels(*key), stats.latency.count))
+            for name, attr, help in [
+                ("request_bytes", "request_bytes", "Bytes sent"),
+                ("response_bytes", "response_bytes", "Bytes received"),
+                ("retries", "retries", "Retries of RPC calls"),
+            ]:
+                lines.append("# HELP %s_%s_total %s" % (prefix, name, help))
+                lines.append("# TYPE %s_%s_total counter" % (prefix, name))
+                for key, stats in calls:
+                    lines.append("%s_%s_total%s %d" % (
+                        prefix, name, labels(*key), getattr(stats, attr)))
+            lines.append("# HELP %s_errors_total Failed RPC calls" % prefix)
+            lines.append("# TYPE %s_errors_total counter" % prefix)
+            for key, stats in calls:
+                for error, count in sorted(stats.errors.items()):
+                    lines.append("%s_errors_total%s %d" % (
+                        prefix, labels(*key, error=error), count))
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self.calls = {}
@@ -0,0 +1,249 @@
+import time
+import logging
+import threading
+from itertools import cycle
+log = logging.getLogger(__name__)
+
+
+class Node(object):
+    """ Health information of a single API node
+
+        :param str url: URL of the node
+    """
+    def __init__(self, url):
+        self.url = url
+        self.latency = None
+        self.error_rate = 0.0
+        self.head_block_number = None
+        self.lag = 0
+        self.failures = 0
+        self.last_failure = 0
+
+    def __repr__(self):
+        return "<Node %s latency=%s error_rate=%.2f lag=%d>" % (
+            self.url,
+            "%.3f" % self.latency if self.latency is not None else "?",
+            self.error_rate,
+            self.lag
+        )
+
+
+class NodeManager(object):
+    """ Keeps track of the health of a list of API nodes and always hands
+        out the best one. For every node, it tracks a moving average of the
+        latency and the error rate as well as the number of blocks it lags
+        behind the other nodes.
+
+        :param list urls: Either a single URL, or a list of URLs
+        :param float alpha: Weight of a new sample in the moving averages
+        :param int max_lag: Number of blocks a node may lag behind before
+            it is demoted
+        :param float slow_factor: A node is demoted if it is slower than
+            the fastest node by this factor
+        :param float failure_penalty: Seconds added to the score of a node
+            for every consecutive failure
+        :param int breaker_threshold: Number of consecutive failures after
+            which the circuit breaker of a node opens and the node is no
+            longer handed out
+        :param float breaker_timeout: Seconds after which a node with an
+            open circuit breaker is tried again. If that call fails, the
+            breaker opens again.
+
+        Instances are iterators, so they can be used wherever a
+        ``itertools.cycle`` of URLs used to be used:
+
+        .. code-block:: python
+
+            nodes = NodeManager(["wss://node1", "wss://node2"])
+            nodes.probe(probe_function)
+            url = next(nodes)
+
+        The probe function is called with a URL and needs to return the
+        latency in seconds and the dynamic global properties of the node.
+    """
+    def __init__(
+        self,
+        urls,
+        alpha=0.3,
+        max_lag=3,
+        slow_factor=3.0,
+        failure_penalty=10.0,
+        breaker_threshold=5,
+        breaker_timeout=30.0
+    ):
+        if isinstance(urls, NodeManager):
+            urls = urls.urls
+        elif isinstance(urls, cycle):
+            raise ValueError("Please provide a list of URLs")
+        elif not isinstance(urls, (list, tuple)):
+            urls = [urls]
+        self.nodes = [Node(url) for url in urls]
+        self.alpha = alpha
+        self.max_lag = max_lag
+        self.slow_factor = slow_factor
+        self.failure_penalty = failure_penalty
+        self.breaker_threshold = breaker_threshold
+        self.breaker_timeout = breaker_timeout
+        self._lock = threading.Lock()
+        self._prober = None
+
+    @property
+    def urls(self):
+        return [node.url for node in self.nodes]
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.best().url
+
+    def node(self, url):
+        for node in self.nodes:
+            if node.url == url:
+                return node
+        raise ValueError("Unknown node %s" % url)
+
+    def score(self, node):
+        """ Score of a node, lower is better
+        """
+        latency = node.latency if node.latency is not None else 1.0
+        return (
+            latency +
+            node.error_rate +
+            node.failures * self.failure_penalty +
+            max(0, node.lag - self.max_lag) * self.failure_penalty
+        )
+
+    def is_open(self, node):
+        """ Returns ``True`` if the circuit breaker of ``node`` is open,
+            i.e. the node failed too often and too recently to be used
+        """
+        return (
+            node.failures >= self.breaker_threshold and
+            time.time() - node.last_failure < self.breaker_timeout
+        )
+
+    def best(self, exclude=None):
+        """ Returns the best :class:`Node`. Nodes with an open circuit
+            breaker are only returned if there is no other node. Ties are
+            resolved in favor of the node that failed longest ago and then
+            in the configured order.
+
+            :param str exclude: Do not return the node with this URL
+                unless it is the only one
+        """
+        with self._lock:
+            nodes = [n for n in self.nodes if n.url != exclude] or self.nodes
+            nodes = [n for n in nodes if not self.is_open(n)] or nodes
+            return min(
+                nodes,
+                key=lambda node: (self.score(node), node.last_failure)
+            )
+
+    def is_demoted(self, url):
+        """ Returns ``True`` if the node is behind, slow or failing
+        """
+        node = self.node(url)
+        with self._lock:
+            latencies = [
+                n.latency for n in self.nodes if n.latency is not None]
+            return bool(
+                node.failures or
+                node.lag > self.max_lag or
+                node.error_rate > 0.5 or
+                (node.latency is not None and latencies and
+                 node.latency > min(latencies) * self.slow_factor)
+            )
+
+    def should_switch(self, url):
+        """ Returns ``True`` if the node ``url`` has been demoted and a
+            better node is available
+        """
+        return self.is_demoted(url) and self.best().url != url
+
+    def success(self, url, latency=None, head_block_number=None):
+        """ Record a successful call to a node
+
+            :param str url: URL of the node
+            :param float latency: Round trip time in seconds
+            :param int head_block_number: Head block as reported by the node
+        """
+        node = self.node(url)
+        with self._lock:
+            node.failures = 0
+            node.error_rate *= (1 - self.alpha)
+            if latency is not None:
+                if node.latency is None:
+                    node.latency = latency
+                else:
+                    node.latency = (
+                        self.alpha * latency + (1 - self.alpha) * node.latency)
+            if head_block_number is not None:
+                node.head_block_number = head_block_number
+                self._update_lag()
+
+    def failure(self, url):
+        """ Record a failed call or connection attempt to a node
+        """
+        node = self.node(url)
+        with self._lock:
+            node.failures += 1
+            node.last_failure = time.time()
+            node.error_rate = self.alpha + (1 - self.alpha) * node.error_rate
+            if node.failures == self.breaker_threshold:
+                log.warning("Circuit breaker of node %s opened" % url)
+
+    def _update_lag(self):
+        heads = [
+            n.head_block_number for n in self.nodes
+            if n.head_block_number is not None]
+        for node in self.nodes:
+            if node.head_block_number is not None:
+                node.lag = max(heads) - node.head_block_number
+
+    def probe(self, probe):
+        """ Probe all nodes in parallel
+
+            :param fnt probe: Function that takes a URL and returns the
+                latency and the dynamic global properties of the node
+        """
+        def run(url):
+            try:
+                latency, props = probe(url)
+            except Exception as e:
+                log.warning("Probing node %s failed: %s" % (url, str(e)))
+                self.failure(url)
+            else:
+                self.success(
+                    url, latency, props.get("head_block_number"))
+
+        threads = [
+            threading.Thread(target=run, args=(url,), daemon=True)
+            for url in self.urls
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        log.debug("Probed nodes: %s" % self.nodes)
+
+    def start_probing(self, probe, interval):
+        """ Probe all nodes every ``interval`` seconds in a background
+            thread
+        """
+        if self._prober:
+            return
+
+        def run():
+            while self._prober is not None:
+                time.sleep(interval)
+                self.probe(probe)
+
+        self._prober = threading.Thread(target=run, daemon=True)
+        self._prober.start()
+
+    def stop_probing(self):
+        self._prober = None
@@ -0,0 +1,107 @@
+""" Record the RPC traffic with a node and replay it later
+
+    Pass a :class:`Recorder` to a connection to capture every call and its
+    reply:
+
+    .. code-block:: python
+
+        from grapheneapi.recorder import Recorder
+        rpc = GrapheneWebsocketRPC(
+            "wss://node.vinchain.io", recorder=Recorder("calls.jsonl"))
+
+    The file holds one JSON object per line with the ``api``, ``method``
+    and ``params`` of a call as well as the ``result`` or ``error`` of the
+    reply. A :class:`Recording` looks up the replies again, e.g. to serve
+    them from the ``LocalNode`` of the test suite (``tests/localnode.py``).
+"""
+import json
+import logging
+import threading
+from . import codec
+log = logging.getLogger(__name__)
+
+
+def call_key(name, args):
+    """ Key of a call for lookups, independent of the request id and the
+        api id that the node assigned in that session
+    """
+    return json.dumps([name, args], sort_keys=True)
+
+
+class Recorder(object):
+    """ Appends calls and their replies to a file
+
+        :param str path: File to write to (or a file-like object)
+    """
+    def __init__(self, path):
+        if isinstance(path, str):
+            self.file = open(path, "a")
+        else:
+            self.file = path
+        self._lock = threading.Lock()
+
+    def record(self, payload, reply):
+        """ Record a call (or a batch of calls) and the decoded reply
+        """
+        if isinstance(payload, list):
+            if not isinstance(reply, list):
+                return
+            replies = {r.get("id"): r for r in reply}
+            for p in payload:
+                if p["id"] in replies:
+                    self.record(p, replies[p["id"]])
+            return
+        api, name, args = payload["params"]
+        entry = {"api": api, "method": name, "params": args}
+        if "error" in reply:
+            entry["error"] = reply["error"]
+        else:
+            entry["result"] = reply.get("result")
+        line = codec.dumps(entry).decode("utf8")
+        with self._lock:
+            self.file.write(line + "\n")
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class Recording(object):
+    """ Replies of a recorded session
+
+        :param str path: File written by :class:`Recorder`
+
+        Calls that were recorded several times are answered with the
+        replies in the recorded order, the last one is repeated.
+    """
+    def __init__(self, path):
+        self.replies = {}
+        self.calls = {}
+        self._lock = threading.Lock()
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = codec.loads(line)
+                reply = {k: entry[k] for k in ("result", "error") if k in entry}
+                self.replies.setdefault(
+                    call_key(entry["method"], entry["params"]), []).append(reply)
+
+    def __len__(self):
+        return sum(len(r) for r in self.replies.values())
+
+    def __contains__(self, call):
+        return call_key(*call) in self.replies
+
+    def lookup(self, name, args):
+        """ Returns the recorded reply (a dictionary with either ``result``
+            or ``error``) of the call
+
+            :raises KeyError: if the call has not been recorded
+        """
+        key = call_key(name, args)
+        replies = self.replies[key]
+        with self._lock:
+            n = self.calls.get(key, 0)
+            self.calls[key] = n + 1
+        return replies[min(n, len(replies) - 1)]
@@ -0,0 +1,70 @@
+import time
+import random
+from .exceptions import DeadlineExceeded
+
+
+class RetryPolicy(object):
+    """ Exponential backoff with full jitter between retries
+
+        :param float base: Upper bound of the first backoff in seconds
+        :param float cap: Upper bound of any backoff in seconds
+
+        The n-th retry waits a random time between 0 and
+        ``min(cap, base * 2 ** n)`` seconds, so that many clients that
+        lost the same node do not retry in lockstep.
+    """
+    def __init__(self, base=0.5, cap=10.0):
+        self.base = base
+        self.cap = cap
+
+    def backoff(self, attempt, deadline=None):
+        """ Seconds to wait before retry number ``attempt`` (starting at 1)
+
+            :param Deadline deadline: Deadline of the call
+            :raises DeadlineExceeded: if the deadline would pass before the
+                retry
+        """
+        sleeptime = random.uniform(
+            0, min(self.cap, self.base * 2 ** (attempt - 1)))
+        if deadline is not None:
+            remaining = deadline.remaining()
+            if remaining is not None and remaining <= sleeptime:
+                raise DeadlineExceeded(
+                    "Call did not finish before the deadline "
+                    "(%d attempts)" % attempt)
+        return sleeptime
+
+
+class Deadline(object):
+    """ Point in time a call needs to be finished by
+
+        :param float timeout: Seconds from now
+        :param float deadline: Absolute time (as in ``time.time()``),
+            takes precedence over ``timeout``
+
+        Without both, there is no deadline.
+    """
+    def __init__(self, timeout=None, deadline=None):
+        if deadline is None and timeout is not None:
+            deadline = time.time() + timeout
+        self.deadline = deadline
+
+    def remaining(self):
+        """ Seconds left, or ``None`` if there is no deadline
+        """
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.time())
+
+    def expired(self):
+        return self.deadline is not None and time.time() >= self.deadline
+
+    def limit(self, seconds):
+        """ Shorten ``seconds`` so that they end before the deadline
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return seconds
+        if seconds is None:
+            return remaining
+        return min(seconds, remaining)
@@ -0,0 +1,102 @@
+import time
+import heapq
+import itertools
+import threading
+
+#: Priority classes, lower values are served first
+PRIORITIES = {
+    "broadcast": 0,
+    "interactive": 1,
+    "bulk": 2,
+}
+
+
+class TokenBucket(object):
+    """ Allows ``rate`` calls per second on average and bursts of up to
+        ``burst`` calls
+    """
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or max(1, rate))
+        self.tokens = self.burst
+        self.updated = time.time()
+
+    def take(self):
+        """ Take a token if there is one
+
+            :returns: ``0`` if a token has been taken, otherwise the seconds
+                until the next token is available
+        """
+        now = time.time()
+        self.tokens = min(
+            self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class Scheduler(object):
+    """ Limits the rate of calls per node and serves waiting calls by
+        priority class (see :attr:`PRIORITIES`) and then in order of
+        arrival
+
+        :param float rate: Calls per second and node, ``None`` for no limit
+        :param int burst: Number of calls that may be made at once
+            (defaults to ``rate``)
+
+        The time calls spend waiting is recorded per priority class in
+        :attr:`stats`.
+
+        .. code-block:: python
+
+            scheduler = Scheduler(rate=10)
+            scheduler.acquire("wss://node.vinchain.io", "bulk")
+    """
+    def __init__(self, rate=None, burst=None):
+        self.rate = rate
+        self.burst = burst
+        self.stats = {
+            priority: {"calls": 0, "wait": 0.0, "max_wait": 0.0}
+            for priority in PRIORITIES
+        }
+        self._buckets = {}
+        self._queues = {}
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+
+    def acquire(self, url, priority="interactive"):
+        """ Block until a call to ``url`` may be made
+
+            :param str url: URL of the node
+            :param str priority: Priority class of the call
+            :returns: Seconds the call had to wait
+        """
+        if priority not in PRIORITIES:
+            raise ValueError("Unknown priority %s" % priority)
+        start = time.time()
+        if self.rate:
+            with self._cond:
+                bucket = self._buckets.setdefault(
+                    url, TokenBucket(self.rate, self.burst))
+                queue = self._queues.setdefault(url, [])
+                entry = (PRIORITIES[priority], next(self._counter))
+                heapq.heappush(queue, entry)
+                while True:
+                    if queue[0] == entry:
+                        delay = bucket.take()
+                        if not delay:
+                            heapq.heappop(queue)
+                            self._cond.notify_all()
+                            break
+                        self._cond.wait(delay)
+                    else:
+                        self._cond.wait()
+        wait = time.time() - start
+        with self._cond:
+            stats = self.stats[priority]
+            stats["calls"] += 1
+            stats["wait"] += wait
+            stats["max_wait"] = max(stats["max_wait"], wait)
+        return wait
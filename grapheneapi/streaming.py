@@ -0,0 +1,99 @@
+""" Incremental parsing of large RPC replies
+
+    Instead of reading and decoding a reply as a whole, the items of the
+    ``result`` are decoded one after another while the reply is read
+    from the connection. Requires ``ijson``, which is installed with the
+    ``streaming`` extra (``pip install vinchainio[streaming]``).
+"""
+import logging
+from .exceptions import decodeRPCReply
+log = logging.getLogger(__name__)
+
+try:
+    import ijson
+except ImportError:
+    raise ImportError(
+        "Missing dependency: ijson. Streaming requires the streaming extra "
+        "(pip install vinchainio[streaming])")
+
+try:
+    from websocket import ABNF
+except ImportError:
+    ABNF = None
+
+
+class FrameReader(object):
+    """ File-like object that reads a single websocket message frame by
+        frame
+
+        :param websocket.WebSocket ws: Connected websocket (or
+            :class:`grapheneapi.compression.DeflateWebsocket`)
+    """
+    def __init__(self, ws):
+        self.ws = ws
+        self.finished = False
+        self.buffer = b""
+        self.fragments = None
+        if hasattr(ws, "recv_fragments"):
+            # Compressed connections are decompressed per fragment
+            self.fragments = ws.recv_fragments()
+
+    def next_frame(self):
+        if self.fragments is not None:
+            try:
+                return next(self.fragments)
+            except StopIteration:
+                self.finished = True
+                return b""
+        while True:
+            frame = self.ws.recv_frame()
+            if frame.opcode == ABNF.OPCODE_PING:
+                self.ws.pong(frame.data)
+            elif frame.opcode == ABNF.OPCODE_CLOSE:
+                raise ConnectionError("Connection closed by node")
+            elif frame.opcode in (
+                ABNF.OPCODE_TEXT, ABNF.OPCODE_BINARY, ABNF.OPCODE_CONT
+            ):
+                self.finished = bool(frame.fin)
+                return frame.data
+
+    def read(self, size=-1):
+        while not self.finished and (size < 0 or len(self.buffer) < size):
+            self.buffer += self.next_frame()
+        if size < 0:
+            data, self.buffer = self.buffer, b""
+        else:
+            data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    def drain(self):
+        """ Discard the rest of the message
+        """
+        self.buffer = b""
+        while not self.finished:
+            self.next_frame()
+
+
+def items(fileobj, prefix="result.item"):
+    """ Generator that decodes the objects found at ``prefix`` (in
+        ``ijson`` notation) of the reply read from ``fileobj``
+
+        :param fileobj: File-like object that returns bytes
+        :param str prefix: Path of the items to yield, e.g.
+            ``result.transactions.item`` for the transactions of a block
+        :raises RPCError: if the node returns an error
+    """
+    events = ijson.parse(fileobj, use_float=True)
+    for path, event, value in events:
+        if path != prefix and path != "error":
+            continue
+        if event in ("start_map", "start_array"):
+            builder = ijson.ObjectBuilder()
+            end = (path, event.replace("start", "end"))
+            while (path, event) != end:
+                builder.event(event, value)
+                path, event, value = next(events)
+            value = builder.value
+        if path == "error":
+            decodeRPCReply({"error": value})
+        yield value
@@ -20,7 +20,13 @@ def getBlockParams(ws):
         ``ref_block_prefix``. Requires a websocket connection to a
         witness node!
     """
-    dynBCParams = ws.get_dynamic_global_properties()
+    return getBlockParamsFromProperties(ws.get_dynamic_global_properties())
+
+
+def getBlockParamsFromProperties(dynBCParams):
+    """ Auxiliary method to obtain ``ref_block_num`` and
+        ``ref_block_prefix`` from the dynamic global properties
+    """
     ref_block_num = dynBCParams["head_block_number"] & 0xFFFF
     ref_block_prefix = struct.unpack_from("<I", unhexlify(dynBCParams["head_block_id"]), 4)[0]
     return ref_block_num, ref_block_prefix
@@ -51,6 +51,14 @@ setup(
         "websocket-client",
         "websockets",
     ],
+    extras_require={
+        # Faster JSON encoding and decoding of the RPC traffic
+        "fast-json": ["orjson"],
+        # Decoding large replies item by item with stream()
+        "streaming": ["ijson"],
+        # permessage-deflate with compression=True
+        "compression": ["websockets>=13"],
+    },
     setup_requires=['pytest-runner'],
     tests_require=['pytest'],
     include_package_data=True,
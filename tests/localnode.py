@@ -0,0 +1,629 @@
+""" A local stand-in for a VinChain node
+
+    :class:`LocalNode` speaks the websocket and HTTP JSON-RPC protocol of a
+    VinChain node and answers from an in-memory :class:`ChainState`, or
+    replays a :class:`grapheneapi.recorder.Recording`. Latency, errors and
+    disconnects can be injected, so that the client can be tested and
+    benchmarked without a live node:
+
+    .. code-block:: python
+
+        from vinchainio import VinChain
+        from vinchainio.blockchain import Blockchain
+        from tests.localnode import LocalNode, ChainState
+
+        with LocalNode(ChainState(head_block_number=100), latency=0.01) as node:
+            vinchain = VinChain(
+                node.url, known_chains={"LOCAL": node.state.chain_params})
+            blockchain = Blockchain(vinchain_instance=vinchain)
+            for block in blockchain.blocks(start=1, stop=100):
+                ...
+"""
+import json
+import time
+import random
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from grapheneapi import codec
+log = logging.getLogger(__name__)
+
+try:
+    from websockets.sync.server import serve
+    from websockets.exceptions import ConnectionClosed
+except ImportError:
+    raise ImportError("Missing dependency: websockets")
+
+timeformat = "%Y-%m-%dT%H:%M:%S"
+
+#: API ids handed out when registering to an API
+API_IDS = {
+    "database": 2,
+    "history": 3,
+    "network_broadcast": 4,
+}
+
+
+#: Calls answered by :class:`ChainState`
+METHODS = frozenset([
+    "get_block",
+    "get_block_header",
+    "get_dynamic_global_properties",
+    "get_global_properties",
+    "get_chain_properties",
+    "get_chain_id",
+    "get_config",
+    "get_objects",
+    "get_required_fees",
+    "verify_authority",
+    "broadcast_transaction",
+    "broadcast_transaction_synchronous",
+])
+
+
+class LocalNodeError(Exception):
+    """ Error that is returned to the client as JSON-RPC error
+    """
+    pass
+
+
+def digest(obj, length=40):
+    return hashlib.sha256(
+        json.dumps(obj, sort_keys=True).encode("utf8")).hexdigest()[:length]
+
+
+class ChainState(object):
+    """ In-memory state of a chain that produces blocks on request
+
+        :param str chain_id: Chain id (defaults to a made-up one)
+        :param str core_symbol: Symbol of the core asset
+        :param str prefix: Prefix of public keys
+        :param int head_block_number: Number of blocks to produce initially
+        :param int transactions_per_block: Number of synthetic transfers
+            in each of the initial blocks
+        :param int block_interval: Seconds between blocks
+        :param int irreversible_lag: Number of blocks between the head
+            block and the last irreversible block
+        :param dict fees: Fee in satoshis of the core asset per operation
+            id (operations not listed cost ``default_fee``)
+        :param int default_fee: Fee of operations not listed in ``fees``
+        :param dict objects: Additional objects by id, e.g. accounts
+
+        Blocks are produced with :func:`produce_block`, or periodically by
+        :class:`LocalNode` if it is given a ``block_interval``.
+    """
+    def __init__(
+        self,
+        chain_id=None,
+        core_symbol="VIN",
+        prefix="VIN",
+        head_block_number=0,
+        transactions_per_block=0,
+        block_interval=3,
+        irreversible_lag=15,
+        fees=None,
+        default_fee=100,
+        objects=None,
+        genesis_time=None
+    ):
+        self.chain_id = chain_id or digest("local", 64)
+        self.core_symbol = core_symbol
+        self.prefix = prefix
+        self.block_interval = block_interval
+        self.irreversible_lag = irreversible_lag
+        self.fees = fees or {}
+        self.default_fee = default_fee
+        self.genesis_time = genesis_time or datetime(2018, 1, 1)
+        self.blocks = {}
+        self.transactions = {}
+        self.pending = []
+        self.lock = threading.RLock()
+        self.listeners = []
+
+        self.objects = {
+            "2.0.0": {
+                "id": "2.0.0",
+                "parameters": {
+                    "block_interval": block_interval,
+                    "maintenance_interval": 86400,
+                    "maximum_transaction_size": 2048,
+                    "current_fees": {"parameters": [], "scale": 10000},
+                },
+                "active_witnesses": ["1.6.1"],
+            },
+            "2.1.0": {
+                "id": "2.1.0",
+                "head_block_number": 0,
+                "head_block_id": "0" * 40,
+                "time": self.genesis_time.strftime(timeformat),
+                "current_witness": "1.6.1",
+                "last_irreversible_block_num": 0,
+                "recent_slots_filled": "3" * 39,
+            },
+            "1.3.0": {
+                "id": "1.3.0",
+                "symbol": core_symbol,
+                "precision": 5,
+                "issuer": "1.2.3",
+                "dynamic_asset_data_id": "2.3.0",
+                "options": {"max_supply": "1000000000000000"},
+            },
+            "2.3.0": {
+                "id": "2.3.0",
+                "current_supply": "100000000000000",
+                "accumulated_fees": 0,
+                "fee_pool": 0,
+            },
+        }
+        self.objects.update(objects or {})
+
+        rnd = random.Random(self.chain_id)
+        for num in range(1, head_block_number + 1):
+            for i in range(transactions_per_block):
+                self.pending.append(self.synthetic_transfer(rnd))
+            self.produce_block()
+
+    @property
+    def chain_params(self):
+        """ Network parameters as in ``vinchainiobase.chains.known_chains``
+        """
+        return {
+            "chain_id": self.chain_id,
+            "core_symbol": self.core_symbol,
+            "prefix": self.prefix,
+        }
+
+    @property
+    def head_block_number(self):
+        return self.objects["2.1.0"]["head_block_number"]
+
+    def synthetic_transfer(self, rnd):
+        return {
+            "ref_block_num": self.head_block_number & 0xffff,
+            "ref_block_prefix": rnd.getrandbits(32),
+            "expiration": self.objects["2.1.0"]["time"],
+            "operations": [[0, {
+                "fee": {"amount": self.fee(0), "asset_id": "1.3.0"},
+                "from": "1.2.%d" % rnd.randint(100, 10000),
+                "to": "1.2.%d" % rnd.randint(100, 10000),
+                "amount": {"amount": rnd.randint(1, 10 ** 8), "asset_id": "1.3.0"},
+                "extensions": []
+            }]],
+            "extensions": [],
+            "signatures": ["%0130x" % rnd.getrandbits(520)],
+        }
+
+    def fee(self, op_id):
+        return self.fees.get(op_id, self.default_fee)
+
+    def produce_block(self):
+        """ Produce a block with the pending transactions and notify the
+            listeners
+
+            :returns: the new block
+        """
+        with self.lock:
+            dgp = self.objects["2.1.0"]
+            num = dgp["head_block_number"] + 1
+            timestamp = self.genesis_time + timedelta(
+                seconds=num * self.block_interval)
+            transactions, self.pending = self.pending, []
+            ids = [digest(tx) for tx in transactions]
+            for tx in transactions:
+                tx.setdefault("operation_results", [
+                    [0, {}] for op in tx.get("operations", [])])
+            block = {
+                "previous": dgp["head_block_id"],
+                "timestamp": timestamp.strftime(timeformat),
+                "witness": "1.6.1",
+                "transaction_merkle_root": digest(transactions),
+                "extensions": [],
+                "witness_signature": digest([num, transactions], 130),
+                "transactions": transactions,
+            }
+            block_id = "%08x" % num + digest(block, 32)
+            block["block_id"] = block_id
+            block["transaction_ids"] = ids
+            self.blocks[num] = block
+            for i, id in enumerate(ids):
+                self.transactions[id] = (num, i)
+
+            dgp.update({
+                "head_block_number": num,
+                "head_block_id": block_id,
+                "time": block["timestamp"],
+                "last_irreversible_block_num": max(
+                    0, num - self.irreversible_lag),
+            })
+            listeners = list(self.listeners)
+        for listener in listeners:
+            listener(block)
+        return block
+
+    def push_transaction(self, tx):
+        """ Add a transaction to the next block
+
+            :returns: the transaction id
+        """
+        with self.lock:
+            tx = dict(tx)
+            self.pending.append(tx)
+            return digest(tx)
+
+    def get_block(self, num):
+        return self.blocks.get(int(num))
+
+    def get_block_header(self, num):
+        block = self.blocks.get(int(num))
+        if block:
+            return {
+                k: v for k, v in block.items()
+                if k not in ("transactions", "block_id", "transaction_ids",
+                             "witness_signature")}
+
+    def get_dynamic_global_properties(self):
+        return self.objects["2.1.0"]
+
+    def get_global_properties(self):
+        return self.objects["2.0.0"]
+
+    def get_chain_properties(self):
+        return {"id": "2.11.0", "chain_id": self.chain_id}
+
+    def get_chain_id(self):
+        return self.chain_id
+
+    def get_config(self):
+        return {
+            "GRAPHENE_SYMBOL": self.core_symbol,
+            "GRAPHENE_ADDRESS_PREFIX": self.prefix,
+            "GRAPHENE_DEFAULT_BLOCK_INTERVAL": self.block_interval,
+        }
+
+    def get_objects(self, ids):
+        return [self.objects.get(id) for id in ids]
+
+    def get_required_fees(self, ops, asset_id):
+        if asset_id != "1.3.0":
+            raise LocalNodeError("fees can only be paid in the core asset")
+        return [
+            {"amount": self.fee(op[0]), "asset_id": asset_id} for op in ops]
+
+    def verify_authority(self, tx):
+        return True
+
+    def broadcast_transaction(self, tx):
+        self.push_transaction(tx)
+
+    def broadcast_transaction_synchronous(self, tx):
+        id = self.push_transaction(tx)
+        block = self.produce_block()
+        num, trx_num = self.transactions[id]
+        return {
+            "id": id,
+            "block_num": num,
+            "trx_num": trx_num,
+            "expired": False,
+            "trx": block["transactions"][trx_num],
+        }
+
+    def call(self, name, args):
+        """ Execute the API call ``name``
+
+            :raises LocalNodeError: if the call fails
+        """
+        if name not in METHODS:
+            raise LocalNodeError("no method with name '%s'" % name)
+        try:
+            return getattr(self, name)(*args)
+        except TypeError as e:
+            raise LocalNodeError("Bad Cast: %s" % str(e))
+
+
+class LocalNode(object):
+    """ Websocket (and optionally HTTP) JSON-RPC server that stands in for
+        a VinChain node
+
+        :param ChainState state: State to answer calls from (defaults to an
+            empty chain)
+        :param Recording recording: Answer recorded calls from this
+            :class:`grapheneapi.recorder.Recording` first
+        :param float latency: Seconds to wait before answering a call,
+            either a number, a ``(min, max)`` tuple, or a function that
+            returns the number of seconds. Websocket requests wait on
+            their own threads, so the replies of pipelined requests can
+            overtake each other.
+        :param float error_rate: Fraction of calls that fail with an error
+        :param float disconnect_rate: Fraction of calls after which the
+            websocket connection is dropped without a reply
+        :param float block_interval: Produce a block every x seconds
+        :param int port: Websocket port (defaults to a free port)
+        :param int http_port: HTTP port (``0`` for a free port, defaults to
+            no HTTP server)
+        :param int seed: Seed of the random injection of latencies and
+            errors
+        :param bool batches: Answer JSON-RPC batches (defaults to
+            ``True``). Otherwise, like fc-based nodes, batches get no
+            reply over websocket and a body that is not JSON over HTTP.
+
+        Connections can subscribe to notices with
+        ``set_subscribe_callback``, ``set_block_applied_callback`` and
+        ``set_pending_transaction_callback``. Changed objects are sent to
+        every subscriber after a block has been produced.
+
+        The number of calls per method is counted in ``stats``.
+    """
+    def __init__(
+        self,
+        state=None,
+        recording=None,
+        latency=0,
+        error_rate=0,
+        disconnect_rate=0,
+        block_interval=None,
+        host="127.0.0.1",
+        port=0,
+        http_port=None,
+        seed=None,
+        batches=True
+    ):
+        self.state = state or ChainState()
+        self.recording = recording
+        self.latency = latency
+        self.error_rate = error_rate
+        self.disconnect_rate = disconnect_rate
+        self.block_interval = block_interval
+        self.host = host
+        self.port = port
+        self.http_port = http_port
+        self.random = random.Random(seed)
+        self.batches = batches
+        self.stats = {}
+        self.connections = set()
+        self.server = None
+        self.http_server = None
+        self._producer = None
+        self._lock = threading.Lock()
+        self.state.listeners.append(self.on_block)
+
+    @property
+    def url(self):
+        return "ws://%s:%d" % (self.host, self.port)
+
+    @property
+    def http_url(self):
+        return "http://%s:%d" % (self.host, self.http_port)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        """ Start serving in background threads
+
+            :returns: the node itself
+        """
+        self.server = serve(self.handle_connection, self.host, self.port)
+        self.port = self.server.socket.getsockname()[1]
+        threading.Thread(
+            target=self.server.serve_forever, name="LocalNode", daemon=True
+        ).start()
+
+        if self.http_port is not None:
+            node = self
+
+            class Handler(BaseHTTPRequestHandler):
+                protocol_version = "HTTP/1.1"
+
+                def do_POST(self):
+                    length = int(self.headers.get("Content-Length", 0))
+                    reply = node.handle(self.rfile.read(length))
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(reply)))
+                    self.end_headers()
+                    self.wfile.write(reply)
+
+                def log_message(self, *args):
+                    pass
+
+            self.http_server = ThreadingHTTPServer(
+                (self.host, self.http_port), Handler)
+            self.http_server.daemon_threads = True
+            self.http_port = self.http_server.server_address[1]
+            threading.Thread(
+                target=self.http_server.serve_forever,
+                name="LocalNode HTTP", daemon=True
+            ).start()
+
+        if self.block_interval:
+            self._producer = threading.Event()
+            threading.Thread(
+                target=self.produce_blocks, args=(self._producer,),
+                name="LocalNode producer", daemon=True
+            ).start()
+        log.debug("Local node listening on %s" % self.url)
+        return self
+
+    def stop(self):
+        """ Stop serving and close all connections
+        """
+        if self._producer:
+            self._producer.set()
+            self._producer = None
+        if self.server:
+            for connection in list(self.connections):
+                connection.close()
+            self.server.shutdown()
+            self.server = None
+        if self.http_server:
+            self.http_server.shutdown()
+            self.http_server.server_close()
+            self.http_server = None
+
+    def produce_blocks(self, stopped):
+        while not stopped.wait(self.block_interval):
+            self.state.produce_block()
+
+    def delay(self):
+        if callable(self.latency):
+            return self.latency()
+        if isinstance(self.latency, (tuple, list)):
+            return self.random.uniform(*self.latency)
+        return self.latency
+
+    def count(self, name):
+        with self._lock:
+            self.stats[name] = self.stats.get(name, 0) + 1
+
+    def call(self, payload, subscriptions=None):
+        """ Answer a single JSON-RPC call
+
+            :returns: the reply
+        """
+        id = payload.get("id")
+        try:
+            api, name, args = payload["params"]
+        except (KeyError, TypeError, ValueError):
+            return {"id": id, "jsonrpc": "2.0", "error": {
+                "code": -32600, "message": "Invalid request"}}
+        self.count(name)
+        with self._lock:
+            failed = self.random.random() < self.error_rate
+        if failed:
+            return {"id": id, "jsonrpc": "2.0", "error": {
+                "code": 1, "message": "Injected error in %s" % name}}
+
+        try:
+            if self.recording and (name, args) in self.recording:
+                reply = dict(self.recording.lookup(name, args))
+                reply.update({"id": id, "jsonrpc": "2.0"})
+                return reply
+            if name == "login":
+                result = True
+            elif name in API_IDS:
+                result = API_IDS[name]
+            elif subscriptions is not None and name in (
+                "set_subscribe_callback",
+                "set_block_applied_callback",
+                "set_pending_transaction_callback",
+                "cancel_all_subscriptions",
+            ):
+                if name == "cancel_all_subscriptions":
+                    subscriptions.clear()
+                else:
+                    subscriptions[name] = args[0]
+                result = None
+            else:
+                result = self.state.call(name, args)
+                if name.startswith("broadcast_transaction"):
+                    self.notify(
+                        "set_pending_transaction_callback", [args[0]])
+        except LocalNodeError as e:
+            # Formatted like the assertions of a node
+            return {"id": id, "jsonrpc": "2.0", "error": {
+                "code": 1,
+                "message": "10 assert_exception: Assert Exception\n"
+                           "local node: %s\n" % str(e),
+                "data": {"code": 10, "name": "assert_exception"}
+            }}
+        return {"id": id, "jsonrpc": "2.0", "result": result}
+
+    def answer(self, message, subscriptions=None):
+        """ Execute a JSON-RPC request (or batch of requests) right away
+
+            :param bytes message: Encoded request
+            :returns: encoded reply, ``None`` for batches if :attr:`batches`
+                is not set
+        """
+        try:
+            payload = codec.loads(message)
+        except ValueError:
+            return codec.dumps({"id": None, "jsonrpc": "2.0", "error": {
+                "code": -32700, "message": "Parse error"}})
+        if isinstance(payload, list):
+            if not self.batches:
+                return None
+            return codec.dumps(
+                [self.call(p, subscriptions) for p in payload])
+        return codec.dumps(self.call(payload, subscriptions))
+
+    def handle(self, message, subscriptions=None):
+        """ Answer a JSON-RPC request (or batch of requests) after the
+            latency
+
+            :param bytes message: Encoded request
+            :returns: encoded reply
+        """
+        reply = self.answer(message, subscriptions)
+        time.sleep(self.delay())
+        if reply is None:
+            return b"Invalid request"
+        return reply
+
+    def send_later(self, connection, reply, delay):
+        """ Send a reply after ``delay`` seconds (runs on its own thread)
+        """
+        time.sleep(delay)
+        try:
+            connection.send(reply, text=True)
+        except ConnectionClosed:
+            pass
+
+    def handle_connection(self, connection):
+        connection.subscriptions = {}
+        with self._lock:
+            self.connections.add(connection)
+        try:
+            for message in connection:
+                with self._lock:
+                    disconnect = self.random.random() < self.disconnect_rate
+                if disconnect:
+                    break
+                # Requests take effect in the order they arrive, their
+                # replies are delayed independently of each other
+                reply = self.answer(message, connection.subscriptions)
+                if reply is None:
+                    continue
+                delay = self.delay()
+                if delay:
+                    threading.Thread(
+                        target=self.send_later,
+                        args=(connection, reply, delay),
+                        name="LocalNode reply", daemon=True
+                    ).start()
+                else:
+                    connection.send(reply, text=True)
+        except ConnectionClosed:
+            pass
+        finally:
+            with self._lock:
+                self.connections.discard(connection)
+            connection.close()
+
+    def notify(self, subscription, params):
+        """ Send a notice to all connections with the subscription
+        """
+        with self._lock:
+            connections = list(self.connections)
+        for connection in connections:
+            callback = connection.subscriptions.get(subscription)
+            if callback is None:
+                continue
+            try:
+                connection.send(codec.dumps({
+                    "method": "notice",
+                    "params": [callback, params]
+                }), text=True)
+            except ConnectionClosed:
+                pass
+
+    def on_block(self, block):
+        self.notify(
+            "set_subscribe_callback",
+            [[self.state.objects["2.1.0"]]])
+        self.notify("set_block_applied_callback", [block["block_id"]])
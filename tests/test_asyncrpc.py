@@ -0,0 +1,81 @@
+import asyncio
+import json
+import unittest
+import websockets
+from grapheneapi.grapheneasyncwsrpc import AsyncGrapheneWebsocketRPC
+from grapheneapi.exceptions import RPCError, DeadlineExceeded
+
+
+def run(coroutine):
+    # asyncio.run() needs Python 3.7
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class Testcases(unittest.TestCase):
+
+    async def serve(self, ws, *args):
+        async for message in ws:
+            payload = json.loads(message)
+            name, args = payload["params"][1:]
+            if name == "drop":
+                # Disconnect before answering, the client has to resend
+                self.dropped += 1
+                if self.dropped == 1:
+                    await ws.close()
+                    return
+            if name == "fail":
+                reply = {"id": payload["id"], "error": {"message": "failed"}}
+            else:
+                reply = {"id": payload["id"], "result": [name] + args}
+            if name == "slow":
+                await asyncio.sleep(0.1)
+            await ws.send(json.dumps(reply))
+
+    async def run_client(self, test):
+        self.dropped = 0
+        server = await websockets.serve(self.serve, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        rpc = AsyncGrapheneWebsocketRPC("ws://127.0.0.1:%d" % port)
+        try:
+            async with rpc:
+                await test(rpc)
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    def test_gather(self):
+        async def test(rpc):
+            slow, fast = await asyncio.gather(rpc.slow(1), rpc.get_block(2))
+            self.assertEqual(slow, ["slow", 1])
+            self.assertEqual(fast, ["get_block", 2])
+        run(self.run_client(test))
+
+    def test_error(self):
+        async def test(rpc):
+            with self.assertRaises(RPCError):
+                await rpc.fail()
+        run(self.run_client(test))
+
+    def test_private_names(self):
+        rpc = AsyncGrapheneWebsocketRPC("ws://127.0.0.1:8090")
+        self.assertFalse(hasattr(rpc, "__await__"))
+        with self.assertRaises(AttributeError):
+            rpc._private
+
+    def test_reconnect(self):
+        async def test(rpc):
+            self.assertEqual(await rpc.drop(1), ["drop", 1])
+            self.assertEqual(self.dropped, 2)
+        run(self.run_client(test))
+
+    def test_timeout(self):
+        async def test(rpc):
+            with self.assertRaises(DeadlineExceeded):
+                await rpc.slow(1, timeout=0.01)
+            # The connection is still usable
+            self.assertEqual(await rpc.get_block(2), ["get_block", 2])
+        run(self.run_client(test))
@@ -0,0 +1,81 @@
+import asyncio
+import unittest
+import mock
+from vinchainio.asyncvinchain import AsyncVinChain
+from vinchainiobase.account import PrivateKey
+from vinchainiobase.signedtransactions import Signed_Transaction
+from .localnode import LocalNode, ChainState
+
+
+def run(coroutine):
+    # asyncio.run() needs Python 3.7
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def account(id, name, key):
+    authority = {
+        "weight_threshold": 1, "account_auths": [], "key_auths": [[key, 1]],
+        "address_auths": []}
+    return {
+        "id": id, "name": name, "owner": authority, "active": authority,
+        "options": {"memo_key": key}}
+
+
+class Testcases(unittest.TestCase):
+
+    def setUp(self):
+        self.key = PrivateKey()
+        pub = format(self.key.pubkey, "VIN")
+        other = format(PrivateKey().pubkey, "VIN")
+        self.state = ChainState(head_block_number=3, objects={
+            "1.2.100": account("1.2.100", "alice", pub),
+            "1.2.101": account("1.2.101", "bob", other),
+        })
+        self.node = LocalNode(self.state).start()
+        self.addCleanup(self.node.stop)
+        patch = mock.patch.dict(
+            "vinchainiobase.chains.known_chains",
+            {"LOCAL": self.state.chain_params})
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_transfer(self):
+        async def transfer():
+            async with AsyncVinChain(
+                self.node.url, keys=[str(self.key)], blocking=True
+            ) as vinchain:
+                return await vinchain.transfer(
+                    "1.2.101", 1.5, "1.3.0", account="1.2.100")
+        ret = run(transfer())
+        self.assertEqual(ret["block_num"], 4)
+
+        tx = self.state.get_block(4)["transactions"][0]
+        op = tx["operations"][0]
+        self.assertEqual(op[0], 0)
+        self.assertEqual(op[1]["from"], "1.2.100")
+        self.assertEqual(op[1]["to"], "1.2.101")
+        self.assertEqual(
+            op[1]["amount"], {"amount": 150000, "asset_id": "1.3.0"})
+        self.assertEqual(
+            op[1]["fee"], {"amount": 100, "asset_id": "1.3.0"})
+        # Signed by the active key of the sender for the chain of the node
+        self.assertEqual(len(tx["signatures"]), 1)
+        signed = Signed_Transaction(**{
+            k: v for k, v in tx.items() if k != "operation_results"})
+        signed.verify([self.key.pubkey], chain=self.state.chain_params)
+
+    def test_nobroadcast(self):
+        async def transfer():
+            async with AsyncVinChain(
+                self.node.url, keys=[str(self.key)], nobroadcast=True
+            ) as vinchain:
+                return await vinchain.transfer(
+                    "1.2.101", 1, "1.3.0", account="1.2.100")
+        tx = run(transfer())
+        self.assertEqual(len(tx["signatures"]), 1)
+        self.assertNotIn("broadcast_transaction", self.node.stats)
+        self.assertEqual(self.state.pending, [])
@@ -0,0 +1,92 @@
+import mock
+import unittest
+from grapheneapi.graphenewsrpc import GrapheneWebsocketRPC
+from grapheneapi.graphenehttprpc import GrapheneHTTPRPC
+from grapheneapi.exceptions import RPCError
+from vinchainioapi.vinchainnoderpc import VinChainNodeRPC
+from .localnode import LocalNode, ChainState
+
+
+class Testcases(unittest.TestCase):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        with mock.patch.object(GrapheneWebsocketRPC, "wsconnect"):
+            self.rpc = GrapheneWebsocketRPC("ws://localhost:8090")
+        self.rpc.url = "ws://localhost:8090"
+
+    def reply(self, payloads, **kwargs):
+        ret = []
+        for payload in reversed(payloads):
+            name, args = payload["params"][1:]
+            if name == "get_block" and args[0] < 0:
+                ret.append({"id": payload["id"], "error": {"message": "bad"}})
+            else:
+                ret.append({"id": payload["id"], "result": [name] + args})
+        return ret
+
+    def test_batch(self):
+        with mock.patch.object(self.rpc, "send", side_effect=self.reply) as send:
+            with self.rpc.batch() as b:
+                one = b.get_block(1)
+                bad = b.get_block(-1)
+                two = b.get_objects(["2.1.0"])
+            self.assertEqual(send.call_count, 1)
+        self.assertEqual(one.result(), ["get_block", 1])
+        self.assertEqual(two.result(), ["get_objects", ["2.1.0"]])
+        self.assertTrue(bad.failed())
+        with self.assertRaises(RPCError):
+            bad.result()
+
+    def test_chunks(self):
+        with mock.patch.object(self.rpc, "send", side_effect=self.reply) as send:
+            with self.rpc.batch(chunk_size=2) as b:
+                blocks = [b.get_block(n) for n in range(5)]
+            self.assertEqual(send.call_count, 3)
+        self.assertEqual([x.result()[1] for x in blocks], list(range(5)))
+
+    def test_not_executed(self):
+        b = self.rpc.batch()
+        call = b.get_block(1)
+        with self.assertRaises(ValueError):
+            call.result()
+
+    def test_unsupported(self):
+        def send(payload, **kwargs):
+            if isinstance(payload, list):
+                return {"id": None, "error": {"message": "batch"}}
+            return {"id": payload["id"], "result": payload["params"][2]}
+        with mock.patch.object(self.rpc, "send", side_effect=send):
+            with self.rpc.batch() as b:
+                call = b.get_block(7)
+        self.assertEqual(call.result(), [7])
+
+    def test_unsupported_node(self):
+        node = LocalNode(ChainState(), http_port=0, batches=False).start()
+        self.addCleanup(node.stop)
+        patches = [
+            mock.patch("grapheneapi.graphenewsrpc.BATCH_PROBE_TIMEOUT", 0.2),
+            mock.patch("grapheneapi.graphenehttprpc.BATCH_PROBE_TIMEOUT", 0.2),
+            mock.patch.dict(
+                "vinchainiobase.chains.known_chains",
+                {"LOCAL": node.state.chain_params}),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        # Registering to the APIs falls back to single calls
+        ws = VinChainNodeRPC(node.url, node_cache=False)
+        self.addCleanup(ws.close)
+        self.assertEqual(ws.api_id["history"], 3)
+        http = GrapheneHTTPRPC(node.http_url)
+        self.addCleanup(http.close)
+
+        for rpc in [ws, http]:
+            for i in range(2):
+                with rpc.batch() as b:
+                    calls = [b.get_objects(["2.1.0"]) for n in range(3)]
+                self.assertEqual(
+                    [c.result()[0]["id"] for c in calls], ["2.1.0"] * 3)
+            # The node has been probed once
+            self.assertEqual(rpc.batch_support, {rpc.url: False})
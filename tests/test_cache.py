@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+from vinchainioapi.cache import ResponseCache
+
+
+class Testcases(unittest.TestCase):
+
+    def test_irreversible_blocks(self):
+        cache = ResponseCache()
+        cache.set("get_block", [10], {"witness": "1.6.1"})
+        self.assertEqual(cache.get("get_block", [10]), (False, None))
+        self.assertTrue(cache.needs_irreversible_block("get_block", [10]))
+
+        cache.observe({"head_block_number": 12, "last_irreversible_block_num": 10})
+        self.assertFalse(cache.needs_irreversible_block("get_block", [10]))
+        cache.set("get_block", [10], {"witness": "1.6.1"})
+        cache.set("get_block", [11], {"witness": "1.6.2"})
+        self.assertEqual(cache.get("get_block", [10]), (True, {"witness": "1.6.1"}))
+        self.assertEqual(cache.get("get_block", [11]), (False, None))
+
+    def test_ttl(self):
+        cache = ResponseCache(ttl={"get_config": 60, "lookup_asset_symbols": -1})
+        cache.set("get_config", [], {"A": 1})
+        cache.set("lookup_asset_symbols", [["VIN"]], [{"id": "1.3.0"}])
+        cache.set("get_dynamic_global_properties", [], {"head_block_number": 1})
+        self.assertEqual(cache.get("get_config", []), (True, {"A": 1}))
+        self.assertFalse(cache.get("lookup_asset_symbols", [["VIN"]])[0])
+        self.assertFalse(cache.get("get_dynamic_global_properties", [])[0])
+
+    def test_lru(self):
+        cache = ResponseCache(max_size=2)
+        cache.observe({"last_irreversible_block_num": 100})
+        for n in range(3):
+            cache.set("get_block", [n], {"n": n})
+            cache.get("get_block", [0])
+        self.assertEqual(len(cache), 2)
+        self.assertTrue(cache.get("get_block", [0])[0])
+        self.assertFalse(cache.get("get_block", [1])[0])
+        self.assertEqual(cache.stats["evictions"], 1)
+
+    def test_disk(self):
+        path = os.path.join(tempfile.mkdtemp(), "cache.sqlite")
+        cache = ResponseCache(path=path)
+        cache.observe({"last_irreversible_block_num": 100})
+        cache.set("get_block", [1], {"n": 1})
+
+        cache = ResponseCache(path=path)
+        self.assertEqual(cache.get("get_block", [1]), (True, {"n": 1}))
+        self.assertEqual(cache.stats["disk_hits"], 1)
+        self.assertEqual(cache.get("get_block", [1]), (True, {"n": 1}))
+        self.assertEqual(cache.stats["hits"], 1)
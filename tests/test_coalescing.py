@@ -0,0 +1,63 @@
+import mock
+import threading
+import time
+import unittest
+from grapheneapi.graphenewsrpc import GrapheneWebsocketRPC
+from vinchainioapi.vinchainnoderpc import VinChainNodeRPC
+from .test_hedging import FakeNode
+
+
+class Testcases(unittest.TestCase):
+
+    def setUp(self):
+        self.node = FakeNode("ws://a", slow=True)
+
+        def wsconnect(rpc):
+            rpc.url = next(rpc.urls)
+            rpc.ws = self.node
+        patches = [
+            mock.patch.object(GrapheneWebsocketRPC, "wsconnect", wsconnect),
+            mock.patch.dict(
+                "vinchainioapi.vinchainnoderpc.known_chains",
+                {"VIN": {"chain_id": "00" * 32, "prefix": "VIN"}}),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.rpc = VinChainNodeRPC(
+            "ws://a", pipelined=True, node_cache=False)
+        self.addCleanup(self.rpc.close)
+
+    def call_concurrently(self, calls):
+        results = []
+        threads = [
+            threading.Thread(target=lambda c=c: results.append(c()))
+            for c in calls
+        ]
+        for thread in threads:
+            thread.start()
+        while len(self.node.held) < 2 and self.rpc.coalesce_stats["hits"] < 2:
+            time.sleep(0.01)
+        self.node.release()
+        for thread in threads:
+            thread.join(5)
+        return results
+
+    def test_coalesce(self):
+        results = self.call_concurrently([
+            lambda: self.rpc.get_objects(["2.1.0"]) for i in range(3)
+        ])
+        self.assertEqual(results, ["ws://a"] * 3)
+        self.assertEqual(
+            [c[1] for c in self.node.calls].count("get_objects"), 1)
+        self.assertEqual(self.rpc.coalesce_stats["hits"], 2)
+        self.assertEqual(self.rpc.coalesce_stats["deduplicated"], 1)
+
+    def test_different_params(self):
+        self.call_concurrently([
+            lambda: self.rpc.get_objects(["2.1.0"]),
+            lambda: self.rpc.get_objects(["2.0.0"]),
+        ])
+        self.assertEqual(
+            [c[1] for c in self.node.calls].count("get_objects"), 2)
+        self.assertEqual(self.rpc.coalesce_stats["hits"], 0)
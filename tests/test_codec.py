@@ -0,0 +1,31 @@
+import unittest
+from grapheneapi import codec
+
+
+class Testcases(unittest.TestCase):
+
+    def tearDown(self):
+        codec.use(self.default)
+
+    def setUp(self):
+        self.default = codec.name
+
+    def test_codecs(self):
+        payload = {"id": 1, "params": [0, "get_account_by_name", ["ünï"]]}
+        for name in codec.codecs:
+            codec.use(name)
+            data = codec.dumps(payload)
+            self.assertIsInstance(data, bytes)
+            self.assertEqual(codec.loads(data), payload)
+            self.assertEqual(codec.loads(data.decode("utf8")), payload)
+
+    def test_fallback(self):
+        # Control characters and integers beyond 64 bit
+        self.assertEqual(codec.loads('{"memo": "a\tb"}'), {"memo": "a\tb"})
+        self.assertEqual(codec.loads(codec.dumps([2 ** 70])), [2 ** 70])
+        with self.assertRaises(ValueError):
+            codec.loads("{")
+
+    def test_unknown(self):
+        with self.assertRaises(ValueError):
+            codec.use("yaml")
@@ -0,0 +1,74 @@
+import json
+import sys
+import mock
+import threading
+import unittest
+import websocket
+from websockets.sync.server import serve
+from grapheneapi.compression import DeflateWebsocket
+from grapheneapi.graphenewsrpc import GrapheneWebsocketRPC
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+
+def handler(websocket):
+    for message in websocket:
+        payload = json.loads(message)
+        name, args = payload["params"][1:]
+        block = {
+            "previous": "%08x" % (args[0] - 1) + "0" * 32,
+            "transactions": [{"ref_block_num": i} for i in range(100)],
+        }
+        websocket.send(json.dumps({"id": payload["id"], "result": block}))
+
+
+class Testcases(unittest.TestCase):
+
+    def serve(self, compression="deflate"):
+        server = serve(handler, "127.0.0.1", 0, compression=compression)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.shutdown)
+        return "ws://127.0.0.1:%d" % server.socket.getsockname()[1]
+
+    def connect(self, url, **kwargs):
+        rpc = GrapheneWebsocketRPC(url, **kwargs)
+        self.addCleanup(rpc.close)
+        return rpc
+
+    def test_compression(self):
+        url = self.serve()
+        rpc = self.connect(url, compression=True)
+        self.assertIsInstance(rpc.ws, DeflateWebsocket)
+        self.assertTrue(rpc.ws.compressed)
+        block = rpc.get_block(10)
+        self.assertEqual(len(block["transactions"]), 100)
+
+        # Per node configuration
+        rpc = self.connect(url, compression={"ws://other": True})
+        self.assertIsInstance(rpc.ws, websocket.WebSocket)
+        self.assertEqual(rpc.get_block(10), block)
+
+    def test_not_supported(self):
+        rpc = self.connect(self.serve(compression=None), compression=True)
+        self.assertFalse(rpc.ws.compressed)
+        self.assertEqual(rpc.get_block(10)["previous"][:8], "00000009")
+
+    @unittest.skipIf(ijson is None, "requires ijson")
+    def test_stream(self):
+        rpc = self.connect(self.serve(), compression=True)
+        txs = list(rpc.stream(
+            "get_block", 10, prefix="result.transactions.item"))
+        self.assertEqual(txs[-1], {"ref_block_num": 99})
+        # The connection can be used for the next call
+        self.assertEqual(len(rpc.get_block(11)["transactions"]), 100)
+
+    def test_old_websockets(self):
+        with mock.patch.dict(sys.modules):
+            del sys.modules["grapheneapi.compression"]
+            with mock.patch("websockets.version.version", "12.0"):
+                with self.assertRaisesRegex(ImportError, "compression extra"):
+                    import grapheneapi.compression
+
@@ -0,0 +1,81 @@
+import os
+import socket
+import tempfile
+import time
+import unittest
+import mock
+from vinchainioapi.cache import ChainParamsCache
+from .localnode import LocalNode, ChainState
+from vinchainioapi.vinchainnoderpc import VinChainNodeRPC
+
+
+class Testcases(unittest.TestCase):
+
+    def setUp(self):
+        self.node = LocalNode(ChainState()).start()
+        self.addCleanup(self.node.stop)
+        patch = mock.patch.dict(
+            "vinchainiobase.chains.known_chains",
+            {"LOCAL": self.node.state.chain_params})
+        patch.start()
+        self.addCleanup(patch.stop)
+
+        # A node that accepts connections but never answers
+        self.stalled = socket.socket()
+        self.stalled.bind(("127.0.0.1", 0))
+        self.stalled.listen()
+        self.addCleanup(self.stalled.close)
+
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        os.remove(path)
+        self.addCleanup(lambda: os.path.exists(path) and os.remove(path))
+        self.cache = ChainParamsCache(path)
+
+    def connect(self):
+        rpc = VinChainNodeRPC(
+            ["ws://127.0.0.1:%d" % self.stalled.getsockname()[1],
+             self.node.url],
+            probe_nodes=False, timeout=5, node_cache=self.cache)
+        self.addCleanup(rpc.close)
+        return rpc
+
+    def test_race(self):
+        start = time.time()
+        rpc = self.connect()
+        self.assertLess(time.time() - start, 1)
+        self.assertEqual(rpc.url, self.node.url)
+        self.assertEqual(rpc.api_id["history"], 3)
+        self.assertEqual(
+            rpc.chain_params["chain_id"], self.node.state.chain_id)
+        self.assertEqual(self.node.stats["get_chain_properties"], 1)
+
+    def test_chain_params_cache(self):
+        self.connect()
+        self.assertEqual(
+            self.cache.get(self.node.url), self.node.state.chain_params)
+        rpc = self.connect()
+        # The cached parameters are taken without asking the node
+        self.assertEqual(self.node.stats["get_chain_properties"], 1)
+        self.assertEqual(self.node.stats["database"], 2)
+        # and checked when they are used
+        self.assertEqual(rpc.chain_params, self.node.state.chain_params)
+        self.assertEqual(rpc.chain_params, self.node.state.chain_params)
+        self.assertEqual(self.node.stats["get_chain_properties"], 2)
+
+    def test_chain_params_cache_default(self):
+        with mock.patch(
+                "vinchainioapi.vinchainnoderpc.ChainParamsCache") as cache:
+            rpc = VinChainNodeRPC(self.node.url, timeout=5)
+        self.addCleanup(rpc.close)
+        self.assertIsNone(rpc.node_cache)
+        self.assertFalse(cache.called)
+
+    def test_chain_params_cache_mismatch(self):
+        # The node has been moved to another chain since
+        self.cache.set(self.node.url, {
+            "chain_id": "11" * 32, "core_symbol": "OLD", "prefix": "OLD"})
+        rpc = self.connect()
+        self.assertEqual(rpc.chain_params, self.node.state.chain_params)
+        self.assertEqual(
+            self.cache.get(self.node.url), self.node.state.chain_params)
@@ -0,0 +1,113 @@
+import json
+import threading
+import time
+import unittest
+from vinchainioapi.dispatcher import NoticeDispatcher, Coalescer
+from vinchainioapi.websocket import VinChainWebsocket
+
+
+class Testcases(unittest.TestCase):
+
+    def dispatcher(self, **kwargs):
+        dispatcher = NoticeDispatcher(**kwargs)
+        self.addCleanup(dispatcher.stop)
+        return dispatcher
+
+    def test_order(self):
+        dispatcher = self.dispatcher(workers=4)
+        seen = {}
+        for i in range(200):
+            key = "1.2.%d" % (i % 10)
+            dispatcher.dispatch(key, seen.setdefault(key, []).append, i)
+        self.assertTrue(dispatcher.join(5))
+        for key, values in seen.items():
+            self.assertEqual(values, sorted(values))
+            self.assertEqual(len(values), 20)
+        self.assertEqual(dispatcher.stats["processed"], 200)
+        self.assertEqual(dispatcher.depth, 0)
+
+    def test_policies(self):
+        release, started = threading.Event(), threading.Event()
+        for policy, depth, expected in [
+            ("drop_oldest", 2, [0, 8, 9]),
+            ("coalesce", 1, [0, 9]),
+        ]:
+            release.clear()
+            started.clear()
+            dispatcher = self.dispatcher(maxsize=2, policy=policy)
+            seen = []
+
+            def slot(value):
+                started.set()
+                release.wait()
+                seen.append(value)
+
+            dispatcher.dispatch("2.1.0", slot, 0)
+            started.wait(5)
+            # The worker is busy with the first notice
+            for i in range(1, 10):
+                dispatcher.dispatch("2.1.0", slot, i, coalesce=True)
+            self.assertEqual(dispatcher.depth, depth)
+            release.set()
+            self.assertTrue(dispatcher.join(5))
+            self.assertEqual(seen, expected)
+        self.assertEqual(dispatcher.stats["coalesced"], 8)
+
+    def test_websocket(self):
+        ws = VinChainWebsocket(
+            "ws://127.0.0.1:1", objects=["2.1.0"], max_queue=2)
+        self.addCleanup(ws.dispatcher.stop)
+        release = threading.Event()
+        seen = []
+
+        def on_object(notice):
+            release.wait()
+            seen.append(notice)
+
+        ws.on_object += on_object
+
+        # The slot is stuck, but the socket thread is not
+        for i in range(3):
+            ws.on_message(None, json.dumps({
+                "method": "notice",
+                "params": [1, [[{"id": "2.1.0", "head_block_number": i}]]]}))
+        self.assertEqual(ws.dispatcher.depth, 2)
+        release.set()
+        self.assertTrue(ws.dispatcher.join(5))
+        self.assertEqual(
+            [n["head_block_number"] for n in seen], [0, 1, 2])
+
+    def test_coalescer(self):
+        dispatcher = self.dispatcher()
+        release, started = threading.Event(), threading.Event()
+        seen = []
+
+        def slot(notice):
+            started.set()
+            release.wait()
+            seen.append(notice)
+
+        coalescer = Coalescer(dispatcher, slot)
+        self.addCleanup(coalescer.stop)
+        coalescer.put("2.1.0", 0)
+        started.wait(5)
+        # The newest notice waits until the slot is ready
+        for i in range(1, 10):
+            coalescer.put("2.1.0", i)
+        coalescer.put("2.6.1", 0)
+        release.set()
+        self.assertTrue(dispatcher.join(5))
+        self.assertEqual(seen, [0, 9, 0])
+        self.assertEqual(coalescer.stats["coalesced"], 8)
+
+        # With an interval, the notices are passed on only every interval
+        seen.clear()
+        coalescer = Coalescer(dispatcher, seen.append, interval=0.2)
+        self.addCleanup(coalescer.stop)
+        for i in range(5):
+            coalescer.put("2.1.0", i)
+            time.sleep(0.01)
+        self.assertEqual(seen, [])
+        time.sleep(0.3)
+        dispatcher.join(5)
+        self.assertEqual(seen, [4])
@@ -0,0 +1,118 @@
+import json
+import mock
+import queue
+import threading
+import time
+import unittest
+from grapheneapi.graphenewsrpc import GrapheneWebsocketRPC
+from vinchainioapi.vinchainnoderpc import VinChainNodeRPC
+
+
+class FakeNode(object):
+    """ Answers calls with its own URL. A ``slow`` node holds back the
+        replies until :func:`release` is called.
+    """
+    apis = {"database": 2, "history": 3, "network_broadcast": 4}
+
+    def __init__(self, url, slow=False):
+        self.url = url
+        self.slow = slow
+        self.calls = []
+        self.replies = queue.Queue()
+        self.held = []
+
+    def send(self, data):
+        payload = json.loads(data.decode("utf8"))
+        if isinstance(payload, list):
+            # Batches are answered call by call
+            for p in payload:
+                self.send(json.dumps(p).encode("utf8"))
+            replies = [json.loads(self.replies.get()) for p in payload]
+            self.replies.put(json.dumps(replies))
+            return
+        name = payload["params"][1]
+        self.calls.append(payload["params"])
+        if name in self.apis:
+            result = self.apis[name]
+        elif name == "get_chain_properties":
+            result = {"chain_id": "00" * 32}
+        else:
+            result = self.url
+        reply = json.dumps({"id": payload["id"], "result": result})
+        if self.slow and name not in self.apis and name != "get_chain_properties":
+            self.held.append(reply)
+        else:
+            self.replies.put(reply)
+
+    def release(self):
+        held, self.held = self.held, []
+        for reply in held:
+            self.replies.put(reply)
+
+    def settimeout(self, timeout):
+        pass
+
+    def recv(self):
+        reply = self.replies.get()
+        if reply is None:
+            raise ConnectionError()
+        return reply
+
+    def close(self):
+        self.replies.put(None)
+
+
+class Testcases(unittest.TestCase):
+
+    def setUp(self):
+        self.nodes = {
+            "ws://a": FakeNode("ws://a", slow=True),
+            "ws://b": FakeNode("ws://b"),
+        }
+
+        def wsconnect(rpc):
+            rpc.url = next(rpc.urls)
+            rpc.ws = self.nodes[rpc.url]
+        patches = [
+            mock.patch.object(GrapheneWebsocketRPC, "wsconnect", wsconnect),
+            mock.patch.dict(
+                "vinchainioapi.vinchainnoderpc.known_chains",
+                {"VIN": {"chain_id": "00" * 32, "prefix": "VIN"}}),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.rpc = VinChainNodeRPC(
+            ["ws://a", "ws://b"],
+            hedge=True,
+            hedge_delay=0.05,
+            probe_nodes=False,
+            node_cache=False
+        )
+        self.addCleanup(self.rpc.close)
+        for i in range(100):
+            if self.rpc.hedge_rpc:
+                break
+            time.sleep(0.01)
+
+    def test_hedge(self):
+        self.assertEqual(self.rpc.get_objects(["2.1.0"]), "ws://b")
+        self.assertEqual(self.rpc.hedge_stats["won"], 1)
+        # The lost request has been cancelled
+        self.assertEqual(self.rpc._pending, {})
+        self.assertEqual(
+            self.nodes["ws://b"].calls[-1], [0, "get_objects", [["2.1.0"]]])
+
+    def test_no_hedge_for_broadcasts(self):
+        def broadcast():
+            with self.assertRaises(Exception):
+                # Fails as soon as the connection is closed
+                self.rpc.broadcast_transaction({}, api="network_broadcast")
+        thread = threading.Thread(target=broadcast, daemon=True)
+        thread.start()
+        thread.join(0.2)
+        self.assertTrue(thread.is_alive())
+        self.assertEqual(self.rpc.hedge_stats["hedged"], 0)
+        self.assertNotIn(
+            "broadcast_transaction",
+            [c[1] for c in self.nodes["ws://b"].calls])
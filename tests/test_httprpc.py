@@ -0,0 +1,86 @@
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from grapheneapi.graphenehttprpc import GrapheneHTTPRPC
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests += 1
+        if self.server.broken:
+            self.send_response(502)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if payload["params"][1] == "get_dynamic_global_properties":
+            result = {"head_block_number": self.server.head}
+        else:
+            result = self.server.server_port
+        body = json.dumps({
+            "id": payload["id"],
+            "result": result
+        }).encode("utf8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Testcases(unittest.TestCase):
+
+    def setUp(self):
+        self.servers = []
+        for broken in [False, False]:
+            server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+            server.connections = 0
+            server.requests = 0
+            server.broken = broken
+            server.head = 100
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            self.servers.append(server)
+        self.urls = [
+            "http://127.0.0.1:%d" % s.server_port for s in self.servers]
+
+    def tearDown(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+
+    def test_keepalive(self):
+        rpc = GrapheneHTTPRPC(self.urls, timeout=5, probe_nodes=False)
+        for _ in range(10):
+            self.assertEqual(rpc.get_block(1), self.servers[0].server_port)
+        rpc.close()
+        # All calls went to the first node over one connection
+        self.assertEqual(self.servers[0].requests, 10)
+        self.assertEqual(self.servers[0].connections, 1)
+        self.assertEqual(self.servers[1].requests, 0)
+
+    def test_failover(self):
+        self.servers[0].broken = True
+        rpc = GrapheneHTTPRPC(self.urls, timeout=5, probe_nodes=False)
+        self.assertEqual(rpc.get_block(1), self.servers[1].server_port)
+        self.assertEqual(rpc.get_block(2), self.servers[1].server_port)
+        self.assertEqual(self.servers[0].requests, 1)
+        rpc.close()
+
+    def test_probe(self):
+        # The first node lags behind and should not be used
+        self.servers[0].head = 90
+        rpc = GrapheneHTTPRPC(self.urls, timeout=5)
+        self.assertEqual(rpc.urls.node(self.urls[0]).lag, 10)
+        self.assertTrue(rpc.urls.is_demoted(self.urls[0]))
+        self.assertEqual(rpc.get_block(1), self.servers[1].server_port)
+        rpc.close()
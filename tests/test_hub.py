@@ -0,0 +1,84 @@
+import time
+import unittest
+from vinchainioapi.hub import SubscriptionHub, Subscription
+from .localnode import LocalNode, ChainState
+
+
+class Testcases(unittest.TestCase):
+
+    def wait(self, condition, timeout=5):
+        deadline = time.time() + timeout
+        while not condition() and time.time() < deadline:
+            time.sleep(0.02)
+        return condition()
+
+    def test_hub(self):
+        node = LocalNode(ChainState(), block_interval=0.05).start()
+        self.addCleanup(node.stop)
+        hub = SubscriptionHub.shared(node.url)
+        self.addCleanup(hub.close)
+        self.assertIs(SubscriptionHub.shared([node.url]), hub)
+
+        blocks, objects, accounts = [], [], []
+        a = hub.subscribe(
+            objects=["2.1.0"], on_block=blocks.append,
+            on_object=objects.append)
+        b = hub.subscribe(
+            objects=["2.1.0", "1.3.x"], accounts=["1.2.100"],
+            on_account=accounts.append)
+        self.assertTrue(self.wait(lambda: len(blocks) >= 3))
+        self.assertTrue(self.wait(lambda: len(objects) >= 3))
+        self.assertEqual(len(node.connections), 1)
+        self.assertEqual(node.stats["login"], 1)
+        self.assertEqual(hub.counts["objects"], {"2.1.0": 2, "1.3.x": 1})
+
+        # Interests change without reconnecting
+        a.remove_objects(["2.1.0"])
+        b.add_objects(["1.2.x"])
+        self.assertEqual(hub.counts["objects"], {
+            "2.1.0": 1, "1.3.x": 1, "1.2.x": 1})
+        self.assertIn("2.1.0", hub.websocket.subscriptions)
+        received = len(objects)
+        time.sleep(0.2)
+        self.assertEqual(len(objects), received)
+
+        # Account notices go to the consumers of the owner
+        hub.fan_account({"id": "2.6.100", "owner": "1.2.100"})
+        hub.fan_account({"id": "2.6.101", "owner": "1.2.101"})
+        self.assertEqual([n["owner"] for n in accounts], ["1.2.100"])
+
+        a.close()
+        b.close()
+        self.assertTrue(hub.closed)
+        other = SubscriptionHub.shared(node.url)
+        self.addCleanup(other.close)
+        self.assertIsNot(other, hub)
+        self.assertEqual(node.stats["login"], 1)
+
+    def test_fan_market(self):
+        hub = SubscriptionHub("ws://localhost:8090")
+        self.addCleanup(hub.websocket.close)
+        received = {}
+        markets = [("a", ("1.3.0", "1.3.1")), ("b", ("1.3.2", "1.3.1"))]
+        for name, market in markets:
+            received[name] = []
+            consumer = Subscription(hub, on_market=received[name].append)
+            consumer.markets.add(market)
+            hub.consumers.append(consumer)
+
+        def fill(pays, receives):
+            return {
+                "pays": {"amount": 1, "asset_id": pays},
+                "receives": {"amount": 1, "asset_id": receives},
+                "fee": {"amount": 1, "asset_id": "1.3.0"}}
+        # The fee does not tell the market
+        hub.fan_market([[4, fill("1.3.1", "1.3.2")]])
+        hub.fan_market([[4, fill("1.3.1", "1.3.0")]])
+        hub.fan_market({"id": "1.7.1", "sell_price": {
+            "base": {"amount": 1, "asset_id": "1.3.2"},
+            "quote": {"amount": 1, "asset_id": "1.3.1"}}})
+        # Order ids do not tell the market
+        hub.fan_market("1.7.2")
+        self.assertEqual(len(received["a"]), 2)
+        self.assertEqual(len(received["b"]), 3)
+        self.assertEqual(received["a"][-1], "1.7.2")
@@ -0,0 +1,100 @@
+import io
+import os
+import tempfile
+import unittest
+import mock
+from grapheneapi.graphenehttprpc import GrapheneHTTPRPC
+from grapheneapi.graphenewsrpc import GrapheneWebsocketRPC
+from grapheneapi.recorder import Recorder, Recording
+from vinchainioapi.exceptions import NoMethodWithName, UnhandledRPCError
+from .localnode import LocalNode, ChainState
+from vinchainioapi.vinchainnoderpc import VinChainNodeRPC
+
+
+class Testcases(unittest.TestCase):
+
+    def start(self, *args, **kwargs):
+        node = LocalNode(*args, **kwargs).start()
+        self.addCleanup(node.stop)
+        return node
+
+    def test_chain_state(self):
+        state = ChainState(head_block_number=20, transactions_per_block=2)
+        node = self.start(state, http_port=0)
+        with mock.patch.dict(
+            "vinchainiobase.chains.known_chains", {"LOCAL": state.chain_params}
+        ):
+            rpc = VinChainNodeRPC(node.url, node_cache=False)
+        self.addCleanup(rpc.close)
+        self.assertEqual(rpc.chain_params["chain_id"], state.chain_id)
+
+        props = rpc.get_dynamic_global_properties()
+        self.assertEqual(props["head_block_number"], 20)
+        self.assertEqual(props["last_irreversible_block_num"], 5)
+        block = rpc.get_block(20)
+        self.assertEqual(block["previous"], rpc.get_block(19)["block_id"])
+        self.assertEqual(len(block["transactions"]), 2)
+
+        self.assertEqual(
+            rpc.get_required_fees([[0, {}]], "1.3.0"),
+            [{"amount": 100, "asset_id": "1.3.0"}])
+        tx = rpc.broadcast_transaction_synchronous(
+            {"operations": [[0, {}]]}, api="network_broadcast")
+        self.assertEqual(tx["block_num"], 21)
+        with self.assertRaises(NoMethodWithName):
+            rpc.get_unknown_object()
+
+        # The same state is served over HTTP
+        http = GrapheneHTTPRPC(node.http_url)
+        self.addCleanup(http.close)
+        self.assertEqual(http.get_block(21)["block_id"], rpc.get_block(21)["block_id"])
+
+    def test_injection(self):
+        node = self.start(latency=(0.01, 0.02))
+        rpc = VinChainNodeRPC(
+            node.url, chain_params=node.state.chain_params, coalesce=False)
+        self.addCleanup(rpc.close)
+        node.error_rate = 1
+        with self.assertRaises(UnhandledRPCError):
+            rpc.get_block(1)
+        self.assertEqual(node.stats["get_block"], 1)
+
+    def test_concurrent_replies(self):
+        node = self.start(ChainState(head_block_number=3))
+        rpc = GrapheneWebsocketRPC(node.url, pipelined=True)
+        self.addCleanup(rpc.close)
+        # The first request takes longer than the second one
+        delays = [0.3, 0.01]
+        node.latency = lambda: delays.pop(0)
+        order = []
+        slow = rpc.call_async("get_block", 1)
+        slow.add_done_callback(lambda f: order.append("slow"))
+        fast = rpc.call_async("get_block", 2)
+        fast.add_done_callback(lambda f: order.append("fast"))
+        self.assertEqual(fast.result(timeout=5)["previous"],
+                         slow.result(timeout=5)["block_id"])
+        # The reply of the second request overtook the first one
+        self.assertEqual(order, ["fast", "slow"])
+
+    def test_record_replay(self):
+        node = self.start(ChainState(head_block_number=3))
+        recording = io.StringIO()
+        rpc = GrapheneWebsocketRPC(node.url, recorder=Recorder(recording))
+        self.addCleanup(rpc.close)
+        block = rpc.get_block(3)
+        rpc.get_block(4)
+
+        fd, path = tempfile.mkstemp()
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, "w") as f:
+            f.write(recording.getvalue())
+        recording = Recording(path)
+        self.assertEqual(len(recording), 2)
+
+        # An empty chain that answers with the recorded replies
+        node = self.start(recording=recording)
+        rpc = GrapheneWebsocketRPC(node.url)
+        self.addCleanup(rpc.close)
+        self.assertEqual(rpc.get_block(3), block)
+        self.assertIsNone(rpc.get_block(4))
+        self.assertIsNone(rpc.get_block(2))
@@ -0,0 +1,39 @@
+import unittest
+from grapheneapi.exceptions import RPCError
+from grapheneapi.graphenewsrpc import GrapheneWebsocketRPC
+from grapheneapi.methods import Method
+from .localnode import LocalNode, ChainState
+
+
+class Testcases(unittest.TestCase):
+
+    def setUp(self):
+        self.node = LocalNode(ChainState(head_block_number=5)).start()
+        self.addCleanup(self.node.stop)
+        self.rpc = GrapheneWebsocketRPC(self.node.url)
+        self.addCleanup(self.rpc.close)
+
+    def test_argument_count(self):
+        with self.assertRaisesRegex(
+            TypeError, r"get_block\(\) takes 1 argument \(0 given\)"
+        ):
+            self.rpc.get_block()
+        self.assertNotIn("get_block", self.node.stats)
+        self.assertEqual(self.rpc.get_block(5)["previous"][:8], "00000004")
+
+    def test_cached(self):
+        method = self.rpc.get_dynamic_global_properties
+        self.assertIsInstance(method, Method)
+        self.assertIs(self.rpc.get_dynamic_global_properties, method)
+        self.assertIn("get_account_history", dir(self.rpc))
+        # Unknown methods are still sent unchecked to the database API
+        self.assertIsNone(self.rpc.get_objekts.max_args)
+        with self.assertRaises(RPCError):
+            self.rpc.get_objekts(["2.0.0"], 1)
+        self.assertEqual(self.node.stats["get_objekts"], 1)
+        self.assertNotIn("get_objekts", vars(self.rpc))
+
+    def test_private_names(self):
+        self.assertFalse(hasattr(self.rpc, "_foo"))
+        self.assertFalse(hasattr(self.rpc, "__deepcopy__"))
+        self.assertNotIn("_foo", vars(self.rpc))
@@ -0,0 +1,63 @@
+import unittest
+from grapheneapi.exceptions import RPCError
+from grapheneapi.graphenehttprpc import GrapheneHTTPRPC
+from grapheneapi.graphenewsrpc import GrapheneWebsocketRPC
+from grapheneapi.metrics import Histogram, Metrics
+from .localnode import LocalNode, ChainState
+
+
+class Testcases(unittest.TestCase):
+
+    def setUp(self):
+        self.node = LocalNode(ChainState(head_block_number=5), http_port=0)
+        self.node.start()
+        self.addCleanup(self.node.stop)
+
+    def test_histogram(self):
+        h = Histogram([1, 2, 4])
+        for value in [0.5, 1.5, 1.5, 3, 10]:
+            h.observe(value)
+        self.assertEqual(h.counts, [1, 2, 1, 1])
+        self.assertEqual(h.sum, 16.5)
+        self.assertEqual(h.quantile(0.2), 1)
+        self.assertEqual(h.quantile(0.4), 1.5)
+        self.assertEqual(h.quantile(1), 4)
+
+    def test_websocket(self):
+        events = []
+        metrics = Metrics(callback=events.append)
+        for pipelined in [False, True]:
+            rpc = GrapheneWebsocketRPC(
+                self.node.url, metrics=metrics, pipelined=pipelined)
+            self.addCleanup(rpc.close)
+            rpc.get_block(5)
+            with self.assertRaises(RPCError):
+                rpc.get_acount("init0")
+
+        summary = metrics.summary()
+        self.assertEqual(summary["get_block"]["calls"], 2)
+        self.assertEqual(summary["get_block"]["errors"], 0)
+        self.assertGreater(summary["get_block"]["response_bytes"], 500)
+        self.assertEqual(summary["get_acount"]["errors"], 2)
+        self.assertEqual(events[0]["method"], "get_block")
+        self.assertEqual(events[0]["node"], self.node.url)
+        self.assertEqual(events[-1]["error"], "RPCError")
+        self.assertEqual(metrics.histogram("get_block").count, 2)
+
+        text = metrics.prometheus()
+        labels = '{method="get_block",api="0",node="%s"' % self.node.url
+        self.assertIn(
+            'graphene_rpc_latency_seconds_bucket%s,le="+Inf"} 2' % labels,
+            text)
+        self.assertIn(
+            'graphene_rpc_errors_total{method="get_acount",api="0",'
+            'node="%s",error="RPCError"} 2' % self.node.url, text)
+
+    def test_http(self):
+        rpc = GrapheneHTTPRPC(self.node.http_url, metrics=True)
+        self.addCleanup(rpc.close)
+        rpc.get_dynamic_global_properties()
+        stats = rpc.metrics.summary()["get_dynamic_global_properties"]
+        self.assertEqual(stats["calls"], 1)
+        self.assertEqual(stats["retries"], 0)
+        self.assertGreater(stats["request_bytes"], 0)
@@ -0,0 +1,35 @@
+import unittest
+from grapheneapi.nodes import NodeManager
+
+
+class Testcases(unittest.TestCase):
+
+    def test_failover(self):
+        nodes = NodeManager(["ws://a", "ws://b", "ws://c"])
+        self.assertEqual(next(nodes), "ws://a")
+        nodes.failure("ws://a")
+        self.assertEqual(next(nodes), "ws://b")
+        nodes.failure("ws://b")
+        self.assertEqual(next(nodes), "ws://c")
+        nodes.failure("ws://c")
+        # All nodes failed once, go back to the one that failed first
+        self.assertEqual(next(nodes), "ws://a")
+        nodes.success("ws://b", 0.1)
+        self.assertEqual(next(nodes), "ws://b")
+
+    def test_latency(self):
+        nodes = NodeManager(["ws://a", "ws://b"])
+        nodes.success("ws://a", 0.9)
+        nodes.success("ws://b", 0.1)
+        self.assertEqual(next(nodes), "ws://b")
+        self.assertTrue(nodes.should_switch("ws://a"))
+        self.assertFalse(nodes.should_switch("ws://b"))
+
+    def test_lag(self):
+        nodes = NodeManager(["ws://a", "ws://b"])
+        nodes.probe(lambda url: (
+            0.1 if url == "ws://a" else 0.2,
+            {"head_block_number": 10 if url == "ws://a" else 20}
+        ))
+        self.assertEqual(nodes.node("ws://a").lag, 10)
+        self.assertEqual(next(nodes), "ws://b")
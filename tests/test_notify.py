@@ -0,0 +1,57 @@
+import unittest
+import mock
+from grapheneapi.graphenewsrpc import GrapheneWebsocketRPC
+from vinchainio.notify import Notify
+from .localnode import LocalNode, ChainState
+
+
+class Testcases(unittest.TestCase):
+
+    def setUp(self):
+        self.node = LocalNode(ChainState(head_block_number=20)).start()
+        self.addCleanup(self.node.stop)
+        rpc = GrapheneWebsocketRPC(self.node.url)
+        self.addCleanup(rpc.close)
+        self.vinchain = mock.Mock(rpc=rpc)
+
+    def block_id(self, num):
+        return self.node.state.get_block(num)["block_id"]
+
+    def test_backfill(self):
+        blocks = []
+        notify = Notify(
+            on_block=blocks.append, last_block=10,
+            vinchain_instance=self.vinchain)
+        self.addCleanup(notify.websocket.close)
+        with mock.patch("vinchainio.notify.BACKFILL_CHUNK_SIZE", 2):
+            notify.process_block(self.block_id(15))
+        notify.process_block(self.block_id(14))
+        notify.process_block(self.block_id(16))
+        self.assertEqual(blocks, [self.block_id(n) for n in range(11, 17)])
+        self.assertEqual(notify.last_block, 16)
+        self.assertEqual(self.node.stats["get_block"], 4)
+
+    def test_dedupe_objects(self):
+        objects = []
+        notify = Notify(
+            on_object=objects.append, dedupe_objects=True,
+            vinchain_instance=self.vinchain)
+        self.addCleanup(notify.websocket.close)
+        for head in [1, 1, 2]:
+            notify.process_object({"id": "2.1.0", "head_block_number": head})
+        self.assertEqual(
+            [o["head_block_number"] for o in objects], [1, 2])
+
+    def test_dedupe_objects_size(self):
+        objects = []
+        notify = Notify(
+            on_object=objects.append, dedupe_objects=2,
+            vinchain_instance=self.vinchain)
+        self.addCleanup(notify.websocket.close)
+        for id in ["1.3.0", "1.3.1", "1.3.0", "1.3.2", "1.3.1"]:
+            notify.process_object({"id": id})
+        # 1.3.1 has been forgotten when 1.3.2 came in
+        self.assertEqual(
+            [o["id"] for o in objects], ["1.3.0", "1.3.1", "1.3.2", "1.3.1"])
+        self.assertEqual(list(notify.objects), ["1.3.2", "1.3.1"])
+
@@ -0,0 +1,88 @@
+import json
+import mock
+import queue
+import unittest
+from concurrent.futures import CancelledError
+from grapheneapi.graphenewsrpc import GrapheneWebsocketRPC
+from grapheneapi.exceptions import RPCError
+
+
+class FakeWebsocket(object):
+    """ Holds back the reply to ``hold`` until the next request has been
+        answered to make sure replies are matched by id and not by order
+    """
+    def __init__(self):
+        self.replies = queue.Queue()
+        self.held = None
+
+    def answer(self, payload):
+        name, args = payload["params"][1:]
+        return {"id": payload["id"], "result": [name] + args}
+
+    def send(self, data):
+        payload = json.loads(data.decode("utf8"))
+        if isinstance(payload, list):
+            self.replies.put(json.dumps([self.answer(p) for p in payload]))
+            return
+        name, args = payload["params"][1:]
+        if name == "fail":
+            reply = {"id": payload["id"], "error": {"message": "failed"}}
+        else:
+            reply = self.answer(payload)
+        if name == "hold":
+            self.held = reply
+            return
+        self.replies.put(json.dumps(reply))
+        if self.held:
+            self.replies.put(json.dumps(self.held))
+            self.held = None
+
+    def recv(self):
+        reply = self.replies.get()
+        if reply is None:
+            raise ConnectionError()
+        return reply
+
+    def close(self):
+        self.replies.put(None)
+
+
+class Testcases(unittest.TestCase):
+
+    def setUp(self):
+        self.ws = FakeWebsocket()
+
+        def wsconnect(rpc):
+            rpc.url = "ws://localhost:8090"
+            rpc.ws = self.ws
+        with mock.patch.object(GrapheneWebsocketRPC, "wsconnect", wsconnect):
+            self.rpc = GrapheneWebsocketRPC(
+                "ws://localhost:8090", pipelined=True)
+
+    def tearDown(self):
+        self.rpc.close()
+
+    def test_out_of_order(self):
+        held = self.rpc.call_async("hold", 1)
+        other = self.rpc.call_async("get_block", 2)
+        self.assertEqual(held.result(timeout=5), ["hold", 1])
+        self.assertEqual(other.result(timeout=5), ["get_block", 2])
+        self.assertEqual(self.rpc.get_objects(["2.1.0"]), ["get_objects", ["2.1.0"]])
+
+    def test_error(self):
+        future = self.rpc.call_async("fail")
+        with self.assertRaises(RPCError):
+            future.result(timeout=5)
+
+    def test_cancel(self):
+        held = self.rpc.call_async("hold")
+        held.cancel()
+        self.assertEqual(self.rpc._pending, {})
+        with self.assertRaises(CancelledError):
+            held.result()
+        self.assertEqual(self.rpc.get_block(3), ["get_block", 3])
+
+    def test_batch(self):
+        with self.rpc.batch() as b:
+            calls = [b.get_block(n) for n in range(3)]
+        self.assertEqual([c.result()[1] for c in calls], [0, 1, 2])
@@ -0,0 +1,107 @@
+import mock
+import threading
+import unittest
+from grapheneapi.graphenewsrpc import GrapheneWebsocketRPC
+from vinchainioapi.exceptions import PoolTimeout
+from vinchainioapi.pool import VinChainNodeRPCPool
+from .test_hedging import FakeNode
+
+
+class Testcases(unittest.TestCase):
+
+    def setUp(self):
+        self.sockets = []
+
+        def wsconnect(rpc, *args, **kwargs):
+            rpc.url = next(rpc.urls)
+            rpc.ws = FakeNode(rpc.url)
+            self.sockets.append(rpc.ws)
+        patches = [
+            mock.patch.object(GrapheneWebsocketRPC, "wsconnect", wsconnect),
+            mock.patch.dict(
+                "vinchainioapi.vinchainnoderpc.known_chains",
+                {"VIN": {"chain_id": "00" * 32, "prefix": "VIN"}}),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.pool = VinChainNodeRPCPool(
+            "ws://a", size=2, checkout_timeout=0.1, node_cache=False)
+        self.addCleanup(self.pool.close)
+
+    def test_checkout(self):
+        self.assertEqual(self.pool.chain_params["prefix"], "VIN")
+        self.assertEqual(self.pool.get_objects(["2.1.0"]), "ws://a")
+        a = self.pool.checkout()
+        b = self.pool.checkout()
+        self.assertIsNot(a, b)
+        with self.assertRaises(PoolTimeout):
+            self.pool.checkout()
+        self.pool.checkin(a)
+        self.assertIs(self.pool.checkout(), a)
+        # Only the first connection identifies the network
+        calls = [[c[1] for c in s.calls] for s in self.sockets]
+        self.assertEqual(calls[0].count("get_chain_properties"), 1)
+        self.assertEqual(calls[1].count("get_chain_properties"), 0)
+
+    def test_threads(self):
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(self.pool.get_block(1)))
+            for i in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ["ws://a"] * 8)
+        self.assertLessEqual(self.pool.size, 2)
+
+    def test_batch_threads(self):
+        barrier = threading.Barrier(2)
+        batches = []
+
+        def build():
+            calls = []
+            with self.pool.batch() as b:
+                for n in range(5):
+                    # Both batches queue their calls at the same time
+                    barrier.wait()
+                    calls.append(b.get_block(n))
+            batches.append(calls)
+        threads = [threading.Thread(target=build) for i in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(batches), 2)
+        for calls in batches:
+            self.assertEqual([c.result() for c in calls], ["ws://a"] * 5)
+        # The calls of each batch went out on a connection of its own
+        self.assertEqual(len(self.sockets), 2)
+        for socket in self.sockets:
+            blocks = [c[2] for c in socket.calls if c[1] == "get_block"]
+            self.assertEqual(blocks, [[n] for n in range(5)])
+        # ... and the connections are back in the pool
+        self.assertEqual(len(self.pool._idle), 2)
+
+    def test_eviction(self):
+        a = self.pool.checkout()
+        b = self.pool.checkout()
+        self.pool.checkin(a)
+        self.pool.checkin(b)
+        self.pool.idle_timeout = 0
+        self.pool.health_check_interval = 0
+        c = self.pool.checkout()
+        # One connection has been evicted, the other passed the check
+        self.assertEqual(self.pool.size, 1)
+        self.assertIs(c, b)
+
+    def test_broken(self):
+        with self.assertRaises(ConnectionError):
+            with self.pool.connection():
+                raise ConnectionError()
+        self.assertEqual(self.pool.size, 0)
+        self.assertEqual(self.pool.get_block(1), "ws://a")
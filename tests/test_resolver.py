@@ -0,0 +1,125 @@
+import threading
+import time
+import unittest
+import mock
+from grapheneapi.graphenewsrpc import GrapheneWebsocketRPC
+from vinchainio.blockchainobject import BlockchainObject
+from vinchainio.notify import Notify
+from vinchainio.price import Order, FilledOrder
+from vinchainio.resolver import Resolver
+from .localnode import LocalNode, ChainState
+
+
+def asset(id, symbol, precision):
+    return {"id": id, "symbol": symbol, "precision": precision}
+
+
+class Testcases(unittest.TestCase):
+
+    def setUp(self):
+        BlockchainObject.clear_cache()
+        self.addCleanup(BlockchainObject.clear_cache)
+        state = ChainState()
+        state.objects.update({
+            "1.3.0": asset("1.3.0", "VIN", 5),
+            "1.3.1": asset("1.3.1", "USD", 4),
+            "1.7.1": {
+                "id": "1.7.1",
+                "seller": "1.2.100",
+                "for_sale": 1000,
+                "sell_price": {
+                    "base": {"amount": 1000, "asset_id": "1.3.1"},
+                    "quote": {"amount": 200000, "asset_id": "1.3.0"}}},
+            "1.2.100": {"id": "1.2.100", "name": "alice"},
+            "1.2.101": {"id": "1.2.101", "name": "bob"},
+        })
+        self.node = LocalNode(state).start()
+        self.addCleanup(self.node.stop)
+        rpc = GrapheneWebsocketRPC(self.node.url)
+        self.addCleanup(rpc.close)
+        self.vinchain = mock.Mock(rpc=rpc)
+
+    def test_asset_ids(self):
+        self.assertEqual(Resolver.asset_ids([
+            "1.7.1",
+            [{"pays": {"amount": 1, "asset_id": "1.3.1"},
+              "fee": {"amount": 1, "asset_id": "1.3.0"}}],
+        ]), {"1.3.0", "1.3.1"})
+
+    def test_process_market(self):
+        orders = []
+        notify = Notify(
+            on_market=orders.append, vinchain_instance=self.vinchain)
+        self.addCleanup(notify.websocket.close)
+        fill = {
+            "order_id": "1.7.2",
+            "pays": {"amount": 5000, "asset_id": "1.3.1"},
+            "receives": {"amount": 100000, "asset_id": "1.3.0"},
+            "fee": {"amount": 100, "asset_id": "1.3.0"},
+        }
+        notice = ["1.7.1", "1.7.3", [[fill, fill]]]
+        notify.process_market(notice)
+        self.assertTrue(notify.resolver.join(timeout=5))
+        # One call for the orders and all assets
+        self.assertEqual(self.node.stats["get_objects"], 1)
+
+        self.assertIsInstance(orders[0], Order)
+        self.assertEqual(orders[0]["seller"], "1.2.100")
+        self.assertEqual(orders[0]["base"]["symbol"], "USD")
+        self.assertTrue(orders[1]["deleted"])
+        self.assertIsInstance(orders[2], FilledOrder)
+        self.assertEqual(orders[2]["quote"]["amount"], 0.5)
+        self.assertEqual(len(orders), 4)
+
+        # The assets are known now, even after the object cache expired
+        BlockchainObject.clear_cache()
+        notify.process_market([[fill]])
+        self.assertEqual(self.node.stats["get_objects"], 1)
+        self.assertEqual(len(orders), 5)
+
+    def test_process_market_deferred(self):
+        orders, threads = [], set()
+
+        def on_market(order):
+            orders.append(order)
+            threads.add(threading.current_thread().name)
+        notify = Notify(on_market=on_market, vinchain_instance=self.vinchain)
+        self.addCleanup(notify.websocket.close)
+        self.node.latency = 0.5
+        notify.process_market(["1.7.1"])
+        # The other notices come in while the first one is being resolved
+        deadline = time.time() + 5
+        while (not self.node.stats.get("get_objects") and
+               time.time() < deadline):
+            time.sleep(0.01)
+        for id in ["1.7.3", "1.7.1"]:
+            notify.process_market([id])
+        # The notices wait for the orders instead of the dispatcher
+        self.assertEqual(orders, [])
+        self.assertTrue(notify.resolver.join(timeout=5))
+        self.assertEqual(
+            [o.get("deleted", False) for o in orders], [False, True, False])
+        # The order and then its assets for the first notice, one call for
+        # the two notices that came in meanwhile
+        self.assertEqual(self.node.stats["get_objects"], 3)
+        # The orders are passed on by the workers of the websocket
+        self.assertEqual(threads, {"notice-dispatcher-0"})
+
+    def test_process_account(self):
+        updates = []
+        notify = Notify(
+            accounts=["1.2.100"], on_account=updates.append,
+            vinchain_instance=self.vinchain)
+        self.addCleanup(notify.websocket.close)
+        self.assertEqual(self.node.stats["get_objects"], 1)
+        for id in ["1.2.100", "1.2.100", "1.2.101"]:
+            notify.process_account({"id": "2.6.%s" % id[4:], "owner": id})
+        self.assertTrue(notify.resolver.join(timeout=5))
+        self.assertEqual(self.node.stats["get_objects"], 2)
+        self.assertIs(updates[0].shared_account, updates[1].shared_account)
+        self.assertEqual(updates[2].shared_account["name"], "bob")
+        # The account of an update is still refreshed when accessed
+        account = updates[0].account
+        self.assertIsNot(account, updates[0].shared_account)
+        self.assertEqual(account["name"], "alice")
+        self.assertEqual(self.node.stats["get_objects"], 3)
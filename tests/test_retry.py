@@ -0,0 +1,59 @@
+import json
+import threading
+import time
+import unittest
+from websockets.sync.server import serve
+from grapheneapi.exceptions import DeadlineExceeded
+from grapheneapi.graphenewsrpc import GrapheneWebsocketRPC
+from grapheneapi.nodes import NodeManager
+from grapheneapi.retry import RetryPolicy, Deadline
+
+
+def handler(websocket):
+    for message in websocket:
+        payload = json.loads(message)
+        name, args = payload["params"][1:]
+        if name == "stall":
+            continue
+        websocket.send(json.dumps({"id": payload["id"], "result": args}))
+
+
+class Testcases(unittest.TestCase):
+
+    def test_backoff(self):
+        policy = RetryPolicy(base=1, cap=4)
+        for attempt in range(1, 10):
+            self.assertLessEqual(policy.backoff(attempt), min(4, 2 ** (attempt - 1)))
+        with self.assertRaises(DeadlineExceeded):
+            policy.backoff(1, Deadline(deadline=time.time()))
+
+    def test_circuit_breaker(self):
+        nodes = NodeManager(
+            ["ws://a", "ws://b"], failure_penalty=0, breaker_threshold=2)
+        nodes.success("ws://a", 0.1)
+        nodes.success("ws://b", 5)
+        nodes.failure("ws://a")
+        self.assertEqual(next(nodes), "ws://a")
+        nodes.failure("ws://a")
+        self.assertEqual(next(nodes), "ws://b")
+        nodes.failure("ws://b")
+        nodes.failure("ws://b")
+        # All breakers are open, use the one that failed first
+        self.assertEqual(next(nodes), "ws://a")
+
+    def test_deadline(self):
+        server = serve(handler, "127.0.0.1", 0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.shutdown)
+        rpc = GrapheneWebsocketRPC(
+            "ws://127.0.0.1:%d" % server.socket.getsockname()[1])
+        self.addCleanup(rpc.close)
+
+        start = time.time()
+        with self.assertRaises(DeadlineExceeded):
+            rpc.stall(timeout=0.3)
+        self.assertLess(time.time() - start, 1)
+
+        # Per call settings do not leak into the instance
+        self.assertEqual(rpc.get_block(1, num_retries=0), [1])
+        self.assertEqual(rpc.num_retries, -1)
@@ -0,0 +1,77 @@
+import mock
+import threading
+import time
+import unittest
+from grapheneapi.graphenewsrpc import GrapheneWebsocketRPC
+from grapheneapi.scheduler import Scheduler, TokenBucket
+from vinchainioapi.vinchainnoderpc import VinChainNodeRPC
+from .test_hedging import FakeNode
+
+
+class Testcases(unittest.TestCase):
+
+    def test_token_bucket(self):
+        bucket = TokenBucket(rate=10, burst=2)
+        self.assertEqual(bucket.take(), 0)
+        self.assertEqual(bucket.take(), 0)
+        self.assertAlmostEqual(bucket.take(), 0.1, places=2)
+
+    def test_priority(self):
+        scheduler = Scheduler(rate=20, burst=1)
+        scheduler.acquire("ws://a")
+        order = []
+
+        def call(priority):
+            scheduler.acquire("ws://a", priority)
+            order.append(priority)
+        threads = []
+        for priority in ["bulk", "bulk", "interactive", "broadcast"]:
+            threads.append(threading.Thread(target=call, args=(priority,)))
+            threads[-1].start()
+            time.sleep(0.005)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(order, ["broadcast", "interactive", "bulk", "bulk"])
+        self.assertEqual(scheduler.stats["bulk"]["calls"], 2)
+        self.assertGreater(
+            scheduler.stats["bulk"]["max_wait"],
+            scheduler.stats["broadcast"]["max_wait"])
+
+    def test_nodes(self):
+        scheduler = Scheduler(rate=1, burst=1)
+        scheduler.acquire("ws://a")
+        # Every node has its own bucket
+        self.assertLess(scheduler.acquire("ws://b"), 0.1)
+
+    def test_node_switch(self):
+        nodes = {url: FakeNode(url) for url in ["ws://a", "ws://b"]}
+
+        def wsconnect(rpc, *args, **kwargs):
+            rpc.url = "ws://b" if rpc.url == "ws://a" else "ws://a"
+            rpc.ws = nodes[rpc.url]
+        patches = [
+            mock.patch.object(GrapheneWebsocketRPC, "wsconnect", wsconnect),
+            mock.patch.dict(
+                "vinchainioapi.vinchainnoderpc.known_chains",
+                {"VIN": {"chain_id": "00" * 32, "prefix": "VIN"}}),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        scheduler = mock.Mock()
+        rpc = VinChainNodeRPC(
+            ["ws://a", "ws://b"], probe_nodes=False, node_cache=False,
+            scheduler=scheduler)
+        self.assertEqual(rpc.url, "ws://a")
+
+        scheduler.reset_mock()
+        with mock.patch.object(
+                rpc.urls, "should_switch", lambda url: url == "ws://a"):
+            self.assertEqual(rpc.get_block(1), "ws://b")
+        # The call is charged to the node it has been sent to
+        self.assertEqual(
+            scheduler.acquire.call_args_list[-1],
+            mock.call("ws://b", "interactive"))
+        self.assertNotIn(
+            "ws://a", [c[0][0] for c in scheduler.acquire.call_args_list])
+
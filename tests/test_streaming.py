@@ -0,0 +1,109 @@
+import json
+import sys
+import mock
+import threading
+import unittest
+from http.server import ThreadingHTTPServer
+from websocket import ABNF
+from grapheneapi.exceptions import RPCError
+from grapheneapi.graphenehttprpc import GrapheneHTTPRPC
+from grapheneapi.graphenewsrpc import GrapheneWebsocketRPC
+from .test_httprpc import Handler
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+BLOCK = {"witness": "1.6.1", "transactions": [{"n": n} for n in range(20)]}
+
+
+class FakeWebsocket(object):
+    """ Sends every reply in frames of 16 bytes
+    """
+    def __init__(self):
+        self.frames = []
+
+    def send(self, data):
+        payload = json.loads(data.decode("utf8"))
+        if payload["params"][1] == "fail":
+            reply = {"id": payload["id"], "error": {"message": "failed"}}
+        else:
+            reply = {"id": payload["id"], "result": BLOCK}
+        data = json.dumps(reply).encode("utf8")
+        chunks = [data[i:i + 16] for i in range(0, len(data), 16)]
+        for i, chunk in enumerate(chunks):
+            self.frames.append(ABNF(
+                fin=int(i == len(chunks) - 1),
+                opcode=ABNF.OPCODE_CONT if i else ABNF.OPCODE_TEXT,
+                data=chunk
+            ))
+
+    def recv_frame(self):
+        return self.frames.pop(0)
+
+
+class BlockHandler(Handler):
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.requests += 1
+        body = json.dumps({"id": 1, "result": BLOCK}).encode("utf8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@unittest.skipIf(ijson is None, "Requires ijson")
+class Testcases(unittest.TestCase):
+
+    def websocket(self):
+        def wsconnect(rpc):
+            rpc.url = "ws://localhost:8090"
+            rpc.ws = FakeWebsocket()
+        with mock.patch.object(GrapheneWebsocketRPC, "wsconnect", wsconnect):
+            return GrapheneWebsocketRPC("ws://localhost:8090")
+
+    def test_websocket(self):
+        rpc = self.websocket()
+        txs = rpc.stream("get_block", 1, prefix="result.transactions.item")
+        self.assertEqual(list(txs), BLOCK["transactions"])
+        self.assertEqual(rpc.ws.frames, [])
+
+    def test_websocket_abort(self):
+        rpc = self.websocket()
+        txs = rpc.stream("get_block", 1, prefix="result.transactions.item")
+        self.assertEqual(next(txs), {"n": 0})
+        txs.close()
+        # The rest of the reply has been discarded
+        self.assertEqual(rpc.ws.frames, [])
+        with self.assertRaises(RPCError):
+            list(rpc.stream("fail"))
+        self.assertEqual(rpc.ws.frames, [])
+
+    def test_missing_ijson(self):
+        rpc = self.websocket()
+        with mock.patch.dict(sys.modules, {"ijson": None}):
+            del sys.modules["grapheneapi.streaming"]
+            with self.assertRaisesRegex(ImportError, "streaming extra"):
+                rpc.stream("get_block", 1)
+        # Nothing has been sent
+        self.assertEqual(rpc.ws.frames, [])
+
+    def test_http(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), BlockHandler)
+        server.connections = 0
+        server.requests = 0
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        rpc = GrapheneHTTPRPC(
+            "http://127.0.0.1:%d" % server.server_port, probe_nodes=False)
+        for i in range(2):
+            self.assertEqual(
+                list(rpc.stream("get_block", 1, prefix="result.transactions.item")),
+                BLOCK["transactions"])
+        self.assertEqual(server.connections, 1)
+        rpc.close()
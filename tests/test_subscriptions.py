@@ -0,0 +1,45 @@
+import json
+import unittest
+import mock
+from vinchainioapi.subscriptions import SubscriptionIndex
+from vinchainioapi.websocket import VinChainWebsocket
+
+
+class Testcases(unittest.TestCase):
+
+    def test_index(self):
+        index = SubscriptionIndex(["2.1.0", "1.3.x"])
+        self.assertIn("2.1.0", index)
+        self.assertIn("1.3.121", index)
+        self.assertNotIn("2.1.1", index)
+        self.assertNotIn("1.2.3", index)
+        self.assertEqual(index.add(["1.2.3", "2.1.0", "1.4.x"]), ["1.2.3"])
+        self.assertIn("1.4.0", index)
+        index.remove(["1.3.x", "2.1.0"])
+        self.assertNotIn("1.3.121", index)
+        self.assertNotIn("2.1.0", index)
+        self.assertEqual(sorted(index), ["1.2.3", "1.4.x"])
+
+    def test_runtime_subscription(self):
+        ws = VinChainWebsocket("ws://127.0.0.1:1", workers=0)
+        seen = []
+        ws.on_object += seen.append
+        ws.connected = True
+
+        def notice(id):
+            ws.on_message(None, json.dumps({
+                "method": "notice", "params": [1, [[{"id": id}]]]}))
+
+        with mock.patch.object(VinChainWebsocket, "rpcexec") as rpcexec:
+            ids = ["1.2.%d" % i for i in range(2500)]
+            ws.subscribe_objects(ids + ["1.3.x"])
+        requested = [call[0][0]["params"] for call in rpcexec.call_args_list]
+        self.assertEqual([p[1] for p in requested], ["get_objects"] * 3)
+        self.assertEqual(sum(len(p[2][0]) for p in requested), 2500)
+
+        notice("1.2.2000")
+        notice("1.3.0")
+        notice("2.1.0")
+        ws.unsubscribe_objects(["1.2.2000"])
+        notice("1.2.2000")
+        self.assertEqual([n["id"] for n in seen], ["1.2.2000", "1.3.0"])
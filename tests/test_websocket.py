@@ -0,0 +1,116 @@
+import base64
+import hashlib
+import mock
+import socket
+import threading
+import time
+import unittest
+import websocket
+from grapheneapi.retry import RetryPolicy
+from .localnode import LocalNode, ChainState
+from vinchainioapi.exceptions import NumRetriesReached
+from vinchainioapi.websocket import VinChainWebsocket
+
+
+class SilentNode(object):
+    """ Completes the websocket handshake, then never answers, not even
+        pings
+    """
+    def __init__(self):
+        self.sock = socket.socket()
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen()
+        self.url = "ws://127.0.0.1:%d" % self.sock.getsockname()[1]
+        self.connections = []
+        threading.Thread(target=self.accept, daemon=True).start()
+
+    def accept(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            request = conn.recv(4096).decode()
+            key = [
+                line.split(":", 1)[1].strip() for line in request.split("\r\n")
+                if line.lower().startswith("sec-websocket-key")][0]
+            accept = base64.b64encode(hashlib.sha1(
+                (key + "258EAFA5-E914-47DA-95CA-C5AB0DC85B11").encode()
+            ).digest()).decode()
+            conn.sendall((
+                "HTTP/1.1 101 Switching Protocols\r\n"
+                "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                "Sec-WebSocket-Accept: %s\r\n\r\n" % accept).encode())
+            self.connections.append(conn)
+
+    def close(self):
+        self.sock.close()
+        for conn in self.connections:
+            conn.close()
+
+
+class Testcases(unittest.TestCase):
+
+    def run_websocket(self, ws):
+        thread = threading.Thread(target=ws.run_forever, daemon=True)
+        thread.start()
+        self.addCleanup(ws.close)
+        return thread
+
+    def wait(self, condition, timeout=5):
+        deadline = time.time() + timeout
+        while not condition() and time.time() < deadline:
+            time.sleep(0.02)
+        return condition()
+
+    def test_keepalive(self):
+        node = LocalNode(ChainState(), block_interval=0.1).start()
+        self.addCleanup(node.stop)
+        for compression in [False, True]:
+            threads = threading.active_count()
+            blocks = []
+            ws = VinChainWebsocket(
+                node.url, keep_alive=0.2, compression=compression,
+                on_block=blocks.append)
+            thread = self.run_websocket(ws)
+            self.assertTrue(self.wait(lambda: len(blocks) >= 5))
+            # No calls are made to keep the connection alive
+            self.assertNotIn("get_objects", node.stats)
+
+            ws.close()
+            thread.join(5)
+            self.assertFalse(thread.is_alive())
+            self.assertTrue(self.wait(
+                lambda: threading.active_count() <= threads))
+
+    def test_dead_peer(self):
+        node = SilentNode()
+        policy = mock.Mock()
+        policy.backoff.return_value = 0
+        ws = VinChainWebsocket(
+            node.url, keep_alive=0.2, ping_timeout=0.1, retry_policy=policy)
+        self.run_websocket(ws)
+        self.addCleanup(node.close)
+        # The unanswered ping makes the client reconnect after a backoff
+        self.assertTrue(self.wait(lambda: len(node.connections) >= 2))
+        policy.backoff.assert_called_with(1)
+
+        with self.assertRaises(ValueError):
+            VinChainWebsocket(node.url, keep_alive=5, ping_timeout=5)
+
+    def test_num_retries_per_call(self):
+        ws = VinChainWebsocket(
+            "ws://127.0.0.1:8090", num_retries=5,
+            retry_policy=RetryPolicy(base=0))
+        self.addCleanup(ws.close)
+        closed = websocket.WebSocketConnectionClosedException("closed")
+        ws.ws = mock.Mock()
+        ws.ws.send.side_effect = [closed, None]
+        ws.get_objects(["2.1.0"], num_retries=1)
+        self.assertEqual(ws.ws.send.call_count, 2)
+
+        ws.ws.send.side_effect = [closed, None]
+        with self.assertRaises(NumRetriesReached):
+            ws.get_objects(["2.1.0"], num_retries=0)
+        # The setting of a call does not stick to the instance
+        self.assertEqual(ws.num_retries, 5)
@@ -17,5 +17,7 @@ __all__ = [
     "committee",
     "vesting",
     "proposal",
-    "message"
+    "message",
+    "asyncvinchain",
+    "resolver"
 ]
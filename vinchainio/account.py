@@ -66,12 +66,14 @@ class Account(BlockchainObject):
         if self.full:
             account = self.vinchain.rpc.get_full_accounts(
                 [account["id"]], False)[0][1]
-            super(Account, self).__init__(account["account"])
+            super(Account, self).__init__(
+                account["account"], vinchain_instance=self.vinchain)
             for k, v in account.items():
                 if k != "account":
                     self[k] = v
         else:
-            super(Account, self).__init__(account)
+            super(Account, self).__init__(
+                account, vinchain_instance=self.vinchain)
 
     @property
     def name(self):
@@ -172,7 +174,8 @@ class Account(BlockchainObject):
             "1.11.{}".format(0),
             1,
             "1.11.{}".format(9999999999999),
-            api="history"
+            api="history",
+            priority="bulk"
         )
         if not mostrecent:
             return
@@ -188,7 +191,8 @@ class Account(BlockchainObject):
                 "1.11.{}".format(last),
                 _limit,
                 "1.11.{}".format(first - 1),
-                api="history"
+                api="history",
+                priority="bulk"
             )
             for i in txs:
                 if exclude_ops and getOperationNameForId(
@@ -236,9 +240,11 @@ class AccountUpdate(dict):
     def __init__(
         self,
         data,
+        account=None,
         vinchain_instance=None
     ):
         self.vinchain = vinchain_instance or shared_vinchain_instance()
+        self._account = account
 
         if isinstance(data, dict):
             super(AccountUpdate, self).__init__(data)
@@ -255,9 +261,18 @@ class AccountUpdate(dict):
             :class:`vinchainio.account.Account` from this class, you can
             use the ``account`` attribute.
         """
-        account = Account(self["owner"])
+        account = Account(self["owner"], vinchain_instance=self.vinchain)
         account.refresh()
         return account
 
+    @property
+    def shared_account(self):
+        """ The :class:`vinchainio.account.Account` of the owner that
+            :class:`vinchainio.notify.Notify` shares between all updates of
+            the account, as it has been loaded (it is not refreshed), or
+            ``None``
+        """
+        return self._account
+
     def __repr__(self):
         return "<AccountUpdate: {}>".format(self["owner"])
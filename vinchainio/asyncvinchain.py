@@ -0,0 +1,272 @@
+import asyncio
+import logging
+
+from vinchainioapi.asyncvinchainnoderpc import AsyncVinChainNodeRPC
+from vinchainiobase import operations, transactions
+from vinchainiobase.objects import Operation
+from vinchainiobase.signedtransactions import Signed_Transaction
+
+from .account import Account
+from .amount import Amount
+from .asset import Asset
+from .exceptions import (
+    AccountDoesNotExistsException,
+    AssetDoesNotExistsException,
+    MissingKeyError,
+)
+from .storage import configStorage as config
+from .wallet import Wallet
+
+log = logging.getLogger(__name__)
+
+
+class AsyncVinChain(object):
+    """ Connect to the VinChain network from an asyncio application.
+
+        :param str node: Node to connect to *(optional)*
+        :param str rpcuser: RPC user *(optional)*
+        :param str rpcpassword: RPC password *(optional)*
+        :param bool nobroadcast: Do **not** broadcast a transaction!
+            *(optional)*
+        :param array,dict,string keys: Predefine the wif keys to shortcut the
+            wallet database *(optional)*
+        :param int expiration: Delay in seconds until transactions are supposed
+            to expire *(optional)*
+        :param str blocking: Wait for broadcasted transactions to be included
+            in a block and return full transaction *(optional)*
+
+        This class offers coroutine versions of the hot paths of
+        :class:`vinchainio.vinchain.VinChain`. Reads that are required to
+        build a transaction (accounts, assets, fees, block parameters)
+        are issued concurrently on a single connection.
+
+        .. code-block:: python
+
+            from vinchainio.asyncvinchain import AsyncVinChain
+
+            async def main():
+                async with AsyncVinChain(node, keys=[wif]) as vinchain:
+                    await vinchain.transfer("init1", 1, "VIN", account="init0")
+    """
+
+    def __init__(self,
+                 node="",
+                 rpcuser="",
+                 rpcpassword="",
+                 **kwargs):
+        if not node:
+            if "node" in config:
+                node = config["node"]
+            else:
+                raise ValueError("A VinChain node needs to be provided!")
+
+        if not rpcuser and "rpcuser" in config:
+            rpcuser = config["rpcuser"]
+
+        if not rpcpassword and "rpcpassword" in config:
+            rpcpassword = config["rpcpassword"]
+
+        self.nobroadcast = bool(kwargs.get("nobroadcast", False))
+        self.expiration = int(kwargs.get("expiration", 30))
+        self.blocking = kwargs.get("blocking", False)
+        self.proposer = None
+        self.config = config
+
+        self.rpc = AsyncVinChainNodeRPC(node, rpcuser, rpcpassword, **kwargs)
+        self.wallet = None
+        self._wallet_kwargs = kwargs
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def connect(self):
+        """ Connect to the node and load the wallet
+        """
+        await self.rpc.connect()
+        if not self.wallet:
+            # The wallet's RPC connection is shared by all instances and
+            # needs to remain synchronous, hence we only provide the prefix
+            kwargs = dict(self._wallet_kwargs)
+            keys = kwargs.pop("keys", kwargs.pop("wif", None))
+            self.wallet = Wallet(**kwargs)
+            self.wallet.prefix = self.prefix
+            if keys:
+                self.wallet.setKeys(keys)
+
+    async def close(self):
+        await self.rpc.close()
+
+    @property
+    def prefix(self):
+        return self.rpc.chain_params["prefix"]
+
+    async def info(self):
+        """ Returns the global properties
+        """
+        return await self.rpc.get_dynamic_global_properties()
+
+    async def account(self, name):
+        """ Returns an instance of :class:`vinchainio.account.Account`
+            without blocking the event loop
+
+            :param str name: Account name or account id
+        """
+        account = await self.rpc.get_account(name)
+        if not account:
+            raise AccountDoesNotExistsException(name)
+        return Account(account, vinchain_instance=self)
+
+    async def asset(self, name):
+        """ Returns an instance of :class:`vinchainio.asset.Asset`
+            without blocking the event loop
+
+            :param str name: Symbol name or asset id
+        """
+        asset = await self.rpc.get_asset(name)
+        if not asset:
+            raise AssetDoesNotExistsException(name)
+        return Asset(asset, vinchain_instance=self)
+
+    async def transfer(self, to, amount, asset, memo="", account=None, **kwargs):
+        """ Transfer an asset to another account.
+
+            :param str to: Recipient
+            :param float amount: Amount to transfer
+            :param str asset: Asset to transfer
+            :param str memo: (optional) Memo, may begin with `#` for encrypted
+                messaging
+            :param str account: (optional) the source account for the transfer
+                if not ``default_account``
+        """
+        from .memo import Memo
+        if not account:
+            if "default_account" in config:
+                account = config["default_account"]
+        if not account:
+            raise ValueError("You need to provide an account")
+
+        account, to, asset = await asyncio.gather(
+            self.account(account),
+            self.account(to),
+            self.asset(asset),
+        )
+        amount = Amount(amount, asset, vinchain_instance=self)
+
+        memoObj = Memo(
+            from_account=account,
+            to_account=to,
+            vinchain_instance=self
+        )
+
+        op = operations.Transfer(**{
+            "fee": {"amount": 0, "asset_id": "1.3.0"},
+            "from": account["id"],
+            "to": to["id"],
+            "amount": {
+                "amount": int(amount),
+                "asset_id": amount.asset["id"]
+            },
+            "memo": memoObj.encrypt(memo),
+            "prefix": self.prefix
+        })
+        return await self.finalizeOp(op, account, "active", **kwargs)
+
+    async def finalizeOp(self, ops, account, permission, **kwargs):
+        """ Construct a transaction from ``ops``, sign it with the keys of
+            ``account`` and broadcast it
+
+            :param operation ops: The operation (or list of operaions) to
+                broadcast
+            :param operation account: The account that authorizes the
+                operation
+            :param string permission: The required permission for
+                signing (active, owner)
+        """
+        assert permission in ["active", "owner"], "Invalid permission"
+        if not isinstance(ops, list):
+            ops = [ops]
+        ops = [Operation(op) for op in ops]
+        if not isinstance(account, Account):
+            account = await self.account(account)
+
+        fees, props, wifs = await asyncio.gather(
+            self.rpc.get_required_fees([o.json() for o in ops], "1.3.0"),
+            self.rpc.get_dynamic_global_properties(),
+            self.signing_keys(account, permission),
+        )
+        ops = transactions.applyRequiredFees(ops, fees)
+        ref_block_num, ref_block_prefix = (
+            transactions.getBlockParamsFromProperties(props))
+        tx = Signed_Transaction(
+            ref_block_num=ref_block_num,
+            ref_block_prefix=ref_block_prefix,
+            expiration=transactions.formatTimeFromNow(self.expiration),
+            operations=ops
+        )
+
+        if not wifs:
+            raise MissingKeyError
+
+        # We need to set the default prefix, otherwise pubkeys are
+        # presented wrongly!
+        operations.default_prefix = self.prefix
+        tx.sign(wifs, chain=self.rpc.chain_params)
+        return await self.broadcast(tx.json())
+
+    async def signing_keys(self, account, permission):
+        """ Obtain the private keys from the wallet that are required to sign
+            with ``permission`` of ``account``. Account authorities are
+            resolved concurrently.
+        """
+        required_treshold = account[permission]["weight_threshold"]
+
+        async def fetchkeys(account, perm, level=0):
+            if level > 2:
+                return []
+            r = []
+            for authority in account[perm]["key_auths"]:
+                try:
+                    wif = self.wallet.getPrivateKeyForPublicKey(
+                        authority[0])
+                    r.append([wif, authority[1]])
+                except Exception:
+                    pass
+
+            if sum([x[1] for x in r]) < required_treshold:
+                # go one level deeper
+                accounts = await asyncio.gather(*[
+                    self.account(authority[0])
+                    for authority in account[perm]["account_auths"]
+                ])
+                for keys in await asyncio.gather(*[
+                    fetchkeys(auth_account, perm, level + 1)
+                    for auth_account in accounts
+                ]):
+                    r.extend(keys)
+            return r
+
+        keys = await fetchkeys(account, permission)
+        if permission != "owner":
+            keys.extend(await fetchkeys(account, "owner"))
+        return list(set(x[0] for x in keys if x[0]))
+
+    async def broadcast(self, tx):
+        """ Broadcast a transaction to the VinChain network
+
+            :param tx tx: Signed transaction to broadcast
+        """
+        if self.nobroadcast:
+            log.warning("Not broadcasting anything!")
+            return tx
+
+        if self.blocking:
+            ret = await self.rpc.broadcast_transaction_synchronous(
+                tx, api="network_broadcast")
+            ret.update(**ret["trx"])
+            return ret
+        await self.rpc.broadcast_transaction(tx, api="network_broadcast")
+        return tx
@@ -126,7 +126,8 @@ class Blockchain(object):
             # Blocks from start until head block
             for blocknum in range(start, head_block + 1):
                 # Get full block
-                block = self.vinchain.rpc.get_block(blocknum)
+                block = self.vinchain.rpc.get_block(
+                    blocknum, priority="bulk")
                 block.update({"block_num": blocknum})
                 yield block
             # Set new start
@@ -1,13 +1,23 @@
 import logging
+import threading
+from collections import OrderedDict
 from events import Events
 from vinchainioapi.websocket import VinChainWebsocket
+from vinchainioapi.hub import SubscriptionHub
 from vinchainio.instance import shared_vinchain_instance
 from vinchainio.market import Market
 from vinchainio.price import Order, FilledOrder, UpdateCallOrder
 from vinchainio.account import AccountUpdate
+from vinchainio.resolver import Resolver
 log = logging.getLogger(__name__)
 # logging.basicConfig(level=logging.DEBUG)
 
+#: Number of blocks requested per batch when a gap is filled
+BACKFILL_CHUNK_SIZE = 100
+
+#: Number of objects whose last notice is kept with ``dedupe_objects=True``
+DEDUPE_SIZE = 10000
+
 
 class Notify(Events):
     """ Notifications on Blockchain events.
@@ -19,8 +29,36 @@ class Notify(Events):
         :param fnt on_block: Callback that will be called for each block received
         :param fnt on_account: Callback that will be called for changes of the listed accounts
         :param fnt on_market: Callback that will be called for changes of the listed markets
+        :param int last_block: Number of the last block that has been
+            passed to ``on_block`` before, to resume after it
+        :param int dedupe_objects: Call ``on_object`` only if an object
+            differs from the last notice of the same object, e.g. not for
+            the notices the node sends again after a reconnect. Either
+            ``True`` to remember the last notice of up to
+            :attr:`DEDUPE_SIZE` objects, or the number of objects to
+            remember (the least recently notified ones are forgotten)
+        :param hub: Share the connection with the other instances that use
+            the same hub, either ``True`` for the hub of the process (see
+            :meth:`vinchainioapi.hub.SubscriptionHub.shared`) or an instance
+            of :class:`vinchainioapi.hub.SubscriptionHub` (defaults to an
+            own connection)
         :param vinchainio.vinchain.VinChain vinchain_instance: VinChain instance
 
+        The assets of the markets and the accounts are loaded once and kept
+        in :attr:`resolver`. Notices that refer to placed orders or to
+        unknown assets or accounts do not wait for the node: the resolver
+        fetches what all waiting notices need together and hands them back
+        to the workers of the websocket, in order, so building the orders
+        does not need a call per amount.
+
+        Blocks are passed to ``on_block`` in order and without gaps: if
+        blocks are missing, e.g. because the connection was lost for a
+        while, they are fetched with ``get_block`` and passed on first.
+        :attr:`last_block` is the number of the last block passed on.
+
+        All other arguments, such as ``workers`` and ``policy``, are passed
+        on to :class:`vinchainioapi.websocket.VinChainWebsocket`.
+
         **Example**
 
         .. code-block:: python
@@ -60,7 +98,11 @@ class Notify(Events):
         on_block=None,
         on_account=None,
         on_market=None,
+        last_block=None,
+        dedupe_objects=False,
+        hub=None,
         vinchain_instance=None,
+        **kwargs
     ):
         # Events
         super(Notify, self).__init__()
@@ -69,6 +111,17 @@ class Notify(Events):
         # VinChain instance
         self.vinchain = vinchain_instance or shared_vinchain_instance()
 
+        # Delivered blocks and objects
+        self.last_block = last_block
+        if dedupe_objects is True:
+            dedupe_objects = DEDUPE_SIZE
+        self.dedupe_objects = int(dedupe_objects or 0)
+        self.objects = OrderedDict()
+        self._objects_lock = threading.Lock()
+
+        # Assets and accounts the notices refer to
+        self.resolver = Resolver(vinchain_instance=self.vinchain)
+
         # Markets
         market_ids = []
         for market_name in markets:
@@ -80,6 +133,11 @@ class Notify(Events):
                 market["base"]["id"],
                 market["quote"]["id"],
             ])
+            self.resolver.add_assets([market["base"], market["quote"]])
+
+        # Accounts
+        if accounts:
+            accounts = self.resolver.load_accounts(accounts)
 
         # Callbacks
         if on_tx:
@@ -93,20 +151,44 @@ class Notify(Events):
         if on_market:
             self.on_market += on_market
 
-        # Open the websocket
-        self.websocket = VinChainWebsocket(
-            urls=self.vinchain.rpc.urls,
-            user=self.vinchain.rpc.user,
-            password=self.vinchain.rpc.password,
-            accounts=accounts,
-            markets=market_ids,
-            objects=objects,
-            on_tx=on_tx,
-            on_object=on_object,
-            on_block=on_block,
-            on_account=self.process_account,
-            on_market=self.process_market,
-        )
+        if hub:
+            if hub is True:
+                hub = SubscriptionHub.shared(
+                    self.vinchain.rpc.urls,
+                    user=self.vinchain.rpc.user,
+                    password=self.vinchain.rpc.password,
+                    **kwargs)
+            self.hub = hub
+            self.subscription = hub.subscribe(
+                accounts=accounts,
+                markets=market_ids,
+                objects=objects,
+                on_tx=on_tx,
+                on_object=self.process_object if on_object else None,
+                on_block=self.process_block if on_block else None,
+                on_account=self.process_account,
+                on_market=self.process_market,
+            )
+            self.websocket = hub.websocket
+        else:
+            # Open the websocket
+            self.hub = None
+            self.subscription = None
+            self.websocket = VinChainWebsocket(
+                urls=self.vinchain.rpc.urls,
+                user=self.vinchain.rpc.user,
+                password=self.vinchain.rpc.password,
+                accounts=accounts,
+                markets=market_ids,
+                objects=objects,
+                on_tx=on_tx,
+                on_object=self.process_object if on_object else None,
+                on_block=self.process_block if on_block else None,
+                on_account=self.process_account,
+                on_market=self.process_market,
+                **kwargs
+            )
+        self.resolver.dispatcher = self.websocket.dispatcher
 
     def process_market(self, data):
         """ This method is used for post processing of market
@@ -119,16 +201,32 @@ class Notify(Events):
             Also possible are limit order updates (margin calls)
 
         """
+        # Fetch the placed orders and unknown assets together with those of
+        # other notices, instead of once per order and amount
+        self.resolver.defer(
+            lambda orders: self.emit_market(data, orders),
+            key="on_market",
+            assets=self.resolver.asset_ids(data),
+            objects=[d for d in data if d and isinstance(d, str)])
+
+    def emit_market(self, data, orders):
+        """ Pass the orders of a market notice to ``on_market``
+
+            :param list data: Market notice
+            :param dict orders: Placed orders by id
+        """
         for d in data:
             if not d:
                 continue
             if isinstance(d, str):
                 # Single order has been placed
                 log.debug("Calling on_market with Order()")
-                self.on_market(Order(
-                    d,
-                    vinchain_instance=self.vinchain
-                ))
+                if d in orders:
+                    order = Order(
+                        d, order=orders[d], vinchain_instance=self.vinchain)
+                else:
+                    order = Order(d, vinchain_instance=self.vinchain)
+                self.on_market(order)
                 continue
             elif isinstance(d, dict):
                 d = [d]
@@ -160,17 +258,90 @@ class Notify(Events):
                                     "Unknown market update type: %s" % i
                                 )
 
+    def process_block(self, block_id):
+        """ This method is used for post processing of block
+            notifications. Blocks that have been missed since
+            :attr:`last_block` are passed to ``on_block`` first, blocks
+            that have been passed on already are skipped.
+        """
+        num = int(block_id[:8], 16)
+        if self.last_block is not None:
+            if num <= self.last_block:
+                log.debug("Skipping block %d, which has been delivered" % num)
+                return
+            if num > self.last_block + 1:
+                self.backfill(self.last_block + 1, num)
+        self.on_block(block_id)
+        self.last_block = num
+
+    def backfill(self, start, stop):
+        """ Pass the ids of the blocks ``start`` to ``stop - 1`` to
+            ``on_block``. The id of a block is taken from the following
+            block, so ``stop`` must exist.
+        """
+        log.info("Fetching missed blocks %d to %d" % (start, stop - 1))
+        for first in range(start, stop, BACKFILL_CHUNK_SIZE):
+            last = min(first + BACKFILL_CHUNK_SIZE, stop)
+            with self.vinchain.rpc.batch() as batch:
+                calls = [
+                    batch.get_block(num) for num in range(first + 1, last + 1)]
+            for num, call in zip(range(first, last), calls):
+                block = call.result()
+                if not block:
+                    raise ValueError("Block %d is not available" % (num + 1))
+                self.on_block(block["previous"])
+                self.last_block = num
+
+    def process_object(self, notice):
+        """ This method is used for post processing of object
+            notifications. If ``dedupe_objects`` is set, notices that do
+            not change the object are skipped.
+        """
+        if self.dedupe_objects:
+            id = notice["id"]
+            with self._objects_lock:
+                seen = self.objects.get(id) == notice
+                self.objects[id] = notice
+                self.objects.move_to_end(id)
+                while len(self.objects) > self.dedupe_objects:
+                    self.objects.popitem(last=False)
+            if seen:
+                return
+        self.on_object(notice)
+
     def process_account(self, message):
         """ This is used for processing of account Updates. It will
             return instances of :class:vinchainio.account.AccountUpdate`
+            whose ``shared_account`` is the account of the owner kept in
+            :attr:`resolver`
         """
-        self.on_account(AccountUpdate(
-            message,
-            vinchain_instance=self.vinchain
-        ))
+        notice = message if isinstance(message, dict) else {}
+        owner = notice.get("owner")
+        self.resolver.defer(
+            lambda objects: self.on_account(AccountUpdate(
+                message,
+                account=self.resolver.account(owner),
+                vinchain_instance=self.vinchain
+            )),
+            key=notice.get("id"),
+            accounts=[owner] if owner else [])
 
     def listen(self):
         """ This call initiates the listening/notification process. It
             behaves similar to ``run_forever()``.
         """
-        self.websocket.run_forever()
+        if self.hub:
+            self.hub.start()
+            self.hub.join()
+        else:
+            self.websocket.run_forever()
+
+    def close(self):
+        """ Stop the notifications. With a hub, only the interests of
+            this instance are removed.
+        """
+        if self.subscription:
+            self.subscription.close()
+        else:
+            self.websocket.close()
+        self.resolver.close()
@@ -403,6 +403,9 @@ class Order(Price):
         amounts of an actual order!
 
         :param vinchainio.vinchain.VinChain vinchain_instance: VinChain instance
+        :param dict order: If an order is given by id, the data of the order
+            if it has been fetched already, or ``None`` if it does not exist
+            anymore
 
         .. note::
 
@@ -418,9 +421,13 @@ class Order(Price):
             len(args) == 1 and
             isinstance(args[0], str)
         ):
-            order = self.vinchain.rpc.get_objects([args[0]])[0]
+            if "order" in kwargs:
+                order = kwargs.pop("order")
+            else:
+                order = self.vinchain.rpc.get_objects([args[0]])[0]
             if order:
-                super(Order, self).__init__(order["sell_price"])
+                super(Order, self).__init__(
+                    order["sell_price"], vinchain_instance=self.vinchain)
                 self["seller"] = order["seller"]
                 self["id"] = order.get("id")
                 self["deleted"] = False
@@ -435,7 +442,8 @@ class Order(Price):
             isinstance(args[0], dict) and
             "sell_price" in args[0]
         ):
-            super(Order, self).__init__(args[0]["sell_price"])
+            super(Order, self).__init__(
+                args[0]["sell_price"], vinchain_instance=self.vinchain)
             self["id"] = args[0].get("id")
         elif (
             isinstance(args[0], dict) and
@@ -445,10 +453,12 @@ class Order(Price):
             super(Order, self).__init__(
                 Amount(args[0]["min_to_receive"], vinchain_instance=self.vinchain),
                 Amount(args[0]["amount_to_sell"], vinchain_instance=self.vinchain),
+                vinchain_instance=self.vinchain
             )
             self["id"] = args[0].get("id")
         elif isinstance(args[0], Amount) and isinstance(args[1], Amount):
-            super(Order, self).__init__(*args, **kwargs)
+            super(Order, self).__init__(
+                *args, vinchain_instance=self.vinchain, **kwargs)
         else:
             raise ValueError("Unkown format to load Order")
 
@@ -491,6 +501,7 @@ class FilledOrder(Price):
                 order.get("price"),
                 base=kwargs.get("base"),
                 quote=kwargs.get("quote"),
+                vinchain_instance=self.vinchain
             )
             self["time"] = formatTimeString(order["date"])
             self["side1_account_id"] = order["side1_account_id"]
@@ -504,6 +515,7 @@ class FilledOrder(Price):
             super(FilledOrder, self).__init__(
                 order,
                 base_asset=base_asset,
+                vinchain_instance=self.vinchain
             )
             if "time" in order:
                 self["time"] = formatTimeString(order["time"])
@@ -544,6 +556,7 @@ class UpdateCallOrder(Price):
                 call.get("call_price"),
                 base=call["call_price"].get("base"),
                 quote=call["call_price"].get("quote"),
+                vinchain_instance=self.vinchain
             )
 
         else:
@@ -0,0 +1,319 @@
+import re
+import logging
+import threading
+from collections import deque
+from vinchainio.instance import shared_vinchain_instance
+from .account import Account
+from .asset import Asset
+log = logging.getLogger(__name__)
+
+#: Number of objects requested per ``get_objects`` call
+RESOLVE_CHUNK_SIZE = 100
+
+ACCOUNT_ID = re.compile(r"^1\.2\.[0-9]+$")
+
+
+class Resolver(object):
+    """ Long-lived cache of the assets and accounts that notifications
+        refer to. Ids that are not known yet are fetched together with a
+        single call instead of one call per object.
+
+        :param dispatcher: Instance of
+            :class:`vinchainioapi.dispatcher.NoticeDispatcher` whose workers
+            call the deferred callbacks (defaults to the thread of the
+            resolver)
+        :param vinchainio.vinchain.VinChain vinchain_instance: VinChain
+            instance
+
+        .. code-block:: python
+
+            resolver = Resolver()
+            resolver.resolve_assets(["1.3.0", "1.3.121"])
+            ids = resolver.account_ids(["init0", "1.2.100"])
+
+        Assets do not change the properties that amounts and prices need
+        (symbol and precision), so they are kept for the lifetime of the
+        resolver.
+
+        Notification handlers should not wait for the node, so they hand
+        their work to :func:`defer`: a thread of the resolver collects the
+        ids that all waiting notices need, fetches them together and then
+        hands the handlers back to the dispatcher.
+    """
+    def __init__(self, dispatcher=None, vinchain_instance=None):
+        self.vinchain = vinchain_instance or shared_vinchain_instance()
+        self.dispatcher = dispatcher
+        self.assets = {}
+        # Account ids by name
+        self.accounts = {}
+        # Accounts by id
+        self.account_objects = {}
+        self._lock = threading.Lock()
+
+        # Deferred callbacks that wait for the resolver
+        self._queue = deque()
+        # Number of deferred callbacks that have not been called, by key
+        self._waiting = {}
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    def add_assets(self, assets):
+        """ Keep assets that have been loaded already
+
+            :param list assets: Instances of :class:`vinchainio.asset.Asset`
+        """
+        with self._lock:
+            for asset in assets:
+                self.assets[asset["id"]] = asset
+
+    def add_accounts(self, accounts):
+        """ Keep accounts that have been loaded already
+
+            :param list accounts: Instances of
+                :class:`vinchainio.account.Account`
+        """
+        with self._lock:
+            for account in accounts:
+                self.account_objects[account["id"]] = account
+
+    def account(self, id):
+        """ Returns the account with the id ``id`` if it is known, otherwise
+            ``None``
+        """
+        with self._lock:
+            return self.account_objects.get(id)
+
+    def load_accounts(self, accounts):
+        """ Load accounts given by name or id, looking up the unknown ones
+            with one call each for names and objects, and return their ids
+
+            :param list accounts: Account names or ids
+        """
+        ids = self.account_ids(accounts)
+        with self._lock:
+            missing = [id for id in ids if id not in self.account_objects]
+        self.add_objects(self.fetch_objects(missing))
+        return ids
+
+    def add_objects(self, objects):
+        """ Keep the assets and accounts among fetched objects
+        """
+        for id, data in objects.items():
+            if not data:
+                continue
+            if id.startswith("1.3."):
+                self.add_assets([Asset(data, vinchain_instance=self.vinchain)])
+            elif ACCOUNT_ID.match(id):
+                self.add_accounts(
+                    [Account(data, vinchain_instance=self.vinchain)])
+
+    @staticmethod
+    def asset_ids(data):
+        """ Returns the set of the ``asset_id`` values found anywhere in
+            ``data``
+        """
+        ids = set()
+        stack = [data]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, dict):
+                if isinstance(item.get("asset_id"), str):
+                    ids.add(item["asset_id"])
+                stack.extend(item.values())
+            elif isinstance(item, (list, tuple)):
+                stack.extend(item)
+        return ids
+
+    def resolve_assets(self, ids):
+        """ Make sure the assets are known, fetching the unknown ones in
+            batches, and put them into the object cache, so that
+            :class:`vinchainio.amount.Amount` and
+            :class:`vinchainio.price.Price` find them without a call
+
+            :param list ids: Asset ids
+        """
+        with self._lock:
+            missing = sorted(set(id for id in ids if id not in self.assets))
+        for i in range(0, len(missing), RESOLVE_CHUNK_SIZE):
+            chunk = missing[i:i + RESOLVE_CHUNK_SIZE]
+            log.debug("Fetching assets %s" % chunk)
+            for data in self.vinchain.rpc.get_objects(chunk):
+                if data:
+                    self.add_assets(
+                        [Asset(data, vinchain_instance=self.vinchain)])
+        with self._lock:
+            assets = [self.assets[id] for id in ids if id in self.assets]
+        for asset in assets:
+            asset.cache()
+
+    def fetch_objects(self, ids):
+        """ Fetch objects in batches
+
+            :returns: dictionary of the objects by id, ``None`` for objects
+                that do not exist
+        """
+        ids = list(ids)
+        objects = {}
+        for i in range(0, len(ids), RESOLVE_CHUNK_SIZE):
+            chunk = ids[i:i + RESOLVE_CHUNK_SIZE]
+            objects.update(zip(chunk, self.vinchain.rpc.get_objects(chunk)))
+        return objects
+
+    def account_ids(self, accounts):
+        """ Returns the ids of accounts given by name or id. All names that
+            are not known yet are looked up with a single call.
+
+            :param list accounts: Account names or ids
+        """
+        with self._lock:
+            names = [
+                a for a in accounts
+                if not ACCOUNT_ID.match(a) and a not in self.accounts]
+        if names:
+            found = self.vinchain.rpc.lookup_account_names(names)
+            with self._lock:
+                for name, account in zip(names, found):
+                    if account:
+                        self.accounts[name] = account["id"]
+                    else:
+                        log.warning("Unknown account %s" % name)
+        ids = []
+        with self._lock:
+            for account in accounts:
+                if ACCOUNT_ID.match(account):
+                    ids.append(account)
+                elif account in self.accounts:
+                    ids.append(self.accounts[account])
+        return ids
+
+    def known(self, assets=(), accounts=()):
+        """ Returns ``True`` if all assets and accounts are known
+        """
+        with self._lock:
+            return (
+                all(id in self.assets for id in assets) and
+                all(id in self.account_objects for id in accounts))
+
+    def defer(self, callback, key=None, assets=(), accounts=(), objects=()):
+        """ Call ``callback`` once the assets and accounts are known and the
+            objects have been fetched, without waiting for the node.
+
+            :param fnt callback: Called with the dictionary of the fetched
+                ``objects`` by id
+            :param str key: Key of the notice in :attr:`dispatcher`
+            :param list assets: Asset ids, including the assets that the
+                fetched objects refer to
+            :param list accounts: Account ids
+            :param list objects: Ids of objects to fetch
+
+            If nothing needs to be fetched and no callback of the same
+            ``key`` is waiting, ``callback`` is called right away.
+            Otherwise the thread of the resolver fetches the ids of all
+            waiting callbacks together and hands the callbacks back to
+            :attr:`dispatcher` with their ``key``, so that they are called
+            by its workers, in order per key. Objects that could not be
+            fetched are missing from the dictionary. If the dispatcher drops
+            a callback, later callbacks of its key keep going through the
+            resolver, which keeps them in order as well.
+        """
+        assets, accounts, objects = set(assets), set(accounts), list(objects)
+        with self._cond:
+            inline = (
+                not self._waiting.get(key) and not objects and
+                self.known(assets, accounts))
+            if not inline:
+                self._waiting[key] = self._waiting.get(key, 0) + 1
+                self._queue.append((callback, key, assets, accounts, objects))
+                if not self._thread:
+                    self._thread = threading.Thread(
+                        target=self.run, name="Resolver", daemon=True)
+                    self._thread.start()
+                self._cond.notify_all()
+        if inline:
+            self.resolve_assets(assets)
+            callback({})
+
+    def run(self):
+        """ Fetch what the deferred callbacks need and hand them to the
+            dispatcher (internal)
+        """
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                requests = list(self._queue)
+                self._queue.clear()
+            try:
+                fetched = self.fetch_deferred(requests)
+            except Exception as e:
+                log.error("Unable to resolve notices: %s" % str(e))
+                fetched = {}
+            for callback, key, assets, accounts, objects in requests:
+                found = dict(
+                    (id, fetched[id]) for id in objects if id in fetched)
+                assets = assets | self.asset_ids(list(found.values()))
+                if self.dispatcher:
+                    self.dispatcher.dispatch(
+                        key, self.call, callback, key, assets, found)
+                    continue
+                try:
+                    self.call(callback, key, assets, found)
+                except Exception:
+                    log.exception("Error in deferred callback")
+
+    def call(self, callback, key, assets, objects):
+        """ Call a deferred callback (internal)
+        """
+        try:
+            # The object cache may have expired in the meantime
+            self.resolve_assets(assets)
+            callback(objects)
+        finally:
+            with self._cond:
+                waiting = self._waiting.get(key, 0) - 1
+                if waiting > 0:
+                    self._waiting[key] = waiting
+                else:
+                    self._waiting.pop(key, None)
+                self._cond.notify_all()
+
+    def fetch_deferred(self, requests):
+        """ Fetch the unknown assets and accounts and the objects of all
+            ``requests`` together (internal)
+        """
+        assets, accounts, objects = set(), set(), set()
+        for callback, key, a, b, c in requests:
+            assets.update(a)
+            accounts.update(b)
+            objects.update(c)
+        with self._lock:
+            missing = objects | set(
+                id for id in assets if id not in self.assets) | set(
+                id for id in accounts if id not in self.account_objects)
+        fetched = self.fetch_objects(sorted(missing))
+        self.add_objects(fetched)
+        # The fetched objects may refer to other assets
+        self.resolve_assets(assets | self.asset_ids(
+            [fetched[id] for id in objects if fetched.get(id)]))
+        return fetched
+
+    def join(self, timeout=None):
+        """ Wait until all deferred callbacks have been called
+
+            :returns: ``False`` if ``timeout`` seconds passed before
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._waiting, timeout)
+
+    def close(self):
+        """ Stop the thread of the resolver, callbacks that wait for it are
+            not called anymore
+        """
+        with self._cond:
+            self._stopped = True
+            self._queue.clear()
+            self._waiting.clear()
+            self._cond.notify_all()
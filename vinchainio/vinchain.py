@@ -2,6 +2,7 @@ import logging
 from datetime import datetime, timedelta
 
 from vinchainioapi.vinchainnoderpc import VinChainNodeRPC
+from vinchainioapi.pool import VinChainNodeRPCPool
 from vinchainiobase import operations
 from vinchainiobase.account import PublicKey
 from vinchainiobase.chains import known_chains as vinchain_known_chains
@@ -54,6 +55,9 @@ class VinChain(object):
             "irrversible")
         :param bool bundle: Do not broadcast transactions right away, but allow
             to bundle operations *(optional)*
+        :param int pool_size: Open up to this many connections to the nodes
+            and use them from several threads at the same time (see
+            :class:`vinchainioapi.pool.VinChainNodeRPCPool`) *(optional)*
 
         Three wallet operation modes are possible:
 
@@ -181,7 +185,11 @@ class VinChain(object):
         if not rpcpassword and "rpcpassword" in config:
             rpcpassword = config["rpcpassword"]
 
-        self.rpc = VinChainNodeRPC(node, rpcuser, rpcpassword, **kwargs)
+        if kwargs.get("pool_size"):
+            self.rpc = VinChainNodeRPCPool(
+                node, rpcuser, rpcpassword, size=kwargs["pool_size"], **kwargs)
+        else:
+            self.rpc = VinChainNodeRPC(node, rpcuser, rpcpassword, **kwargs)
 
     @property
     def prefix(self):
@@ -2,4 +2,10 @@ __all__ = [
     "vinchainnoderpc.py",
     "exceptions",
     "websocket",
+    "asyncvinchainnoderpc",
+    "cache",
+    "pool",
+    "dispatcher",
+    "subscriptions",
+    "hub",
 ]
@@ -0,0 +1,72 @@
+import asyncio
+import logging
+from grapheneapi.grapheneasyncwsrpc import AsyncGrapheneWebsocketRPC
+from vinchainiobase.chains import known_chains
+from .vinchainnoderpc import VinChainNodeRPC
+log = logging.getLogger(__name__)
+
+
+class AsyncVinChainNodeRPC(AsyncGrapheneWebsocketRPC):
+    """ asyncio counterpart of
+        :class:`vinchainioapi.vinchainnoderpc.VinChainNodeRPC`
+
+        .. code-block:: python
+
+            async with AsyncVinChainNodeRPC("wss://node.vinchain.io") as rpc:
+                accounts = await asyncio.gather(*[
+                    rpc.get_account(name) for name in ["init0", "init1"]
+                ])
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(AsyncVinChainNodeRPC, self).__init__(*args, **kwargs)
+        self.chain_params = None
+
+    async def register_apis(self):
+        # This runs inside the connecting task, hence calls are awaited
+        # one after another rather than gathered in separate tasks
+        self.api_id["database"] = await self.database(api_id=1)
+        self.api_id["history"] = await self.history(api_id=1)
+        self.api_id["network_broadcast"] = await self.network_broadcast(api_id=1)
+        if not self.chain_params:
+            self.chain_params = await self.get_network()
+
+    decode_error = VinChainNodeRPC.decode_error
+
+    async def get_account(self, name, **kwargs):
+        """ Get full account details from account name or id
+
+            :param str name: Account name or account id
+        """
+        if len(name.split(".")) == 3:
+            return (await self.get_objects([name]))[0]
+        else:
+            return await self.get_account_by_name(name, **kwargs)
+
+    async def get_asset(self, name, **kwargs):
+        """ Get full asset from name of id
+
+            :param str name: Symbol name or asset id (e.g. 1.3.0)
+        """
+        if len(name.split(".")) == 3:
+            return (await self.get_objects([name], **kwargs))[0]
+        else:
+            return (await self.lookup_asset_symbols([name], **kwargs))[0]
+
+    async def get_object(self, o, **kwargs):
+        """ Get object with id ``o``
+
+            :param str o: Full object id
+        """
+        return (await self.get_objects([o], **kwargs))[0]
+
+    async def get_network(self):
+        """ Identify the connected network. This call returns a
+            dictionary with keys chain_id, core_symbol and prefix
+        """
+        props = await self.get_chain_properties()
+        chain_id = props["chain_id"]
+        for k, v in known_chains.items():
+            if v["chain_id"] == chain_id:
+                return v
+        raise Exception("Connecting to unknown network!")
@@ -0,0 +1,229 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from appdirs import user_cache_dir
+from grapheneapi import codec
+log = logging.getLogger(__name__)
+
+#: Seconds to keep replies of calls that rarely change
+DEFAULT_TTL = {
+    "get_chain_properties": 24 * 60 * 60,
+    "get_config": 24 * 60 * 60,
+    "lookup_asset_symbols": 60 * 60,
+}
+
+#: Calls that return blocks, cached forever once irreversible
+BLOCK_METHODS = frozenset(["get_block", "get_block_header"])
+
+
+class ResponseCache(object):
+    """ Bounded LRU cache for replies of API calls that knows which
+        calls can be cached and for how long:
+
+        * blocks and block headers at or below the last irreversible block
+          never change and are kept until evicted
+        * calls listed in ``ttl`` are kept for the given number of seconds
+        * all other calls are not cached
+
+        :param int max_size: Maximum number of replies kept in memory
+        :param dict ttl: Seconds to keep the replies of a method (defaults
+            to :attr:`DEFAULT_TTL`)
+        :param str path: Optional SQLite file that stores the cached
+            replies on disk, e.g. to share them between runs
+
+        The cache learns the last irreversible block from the dynamic
+        global properties passed to :func:`observe`.
+    """
+    def __init__(self, max_size=10000, ttl=None, path=None):
+        self.max_size = max_size
+        self.ttl = dict(DEFAULT_TTL if ttl is None else ttl)
+        self.last_irreversible_block_num = 0
+        self.stats = {
+            "hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+        }
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT, expires REAL)")
+            self._db.commit()
+
+    def __len__(self):
+        return len(self._data)
+
+    def key(self, name, args):
+        return json.dumps([name, args], sort_keys=True)
+
+    def cacheable(self, name):
+        """ Returns ``True`` if replies to ``name`` may be cached
+        """
+        return name in BLOCK_METHODS or name in self.ttl
+
+    def expiration(self, name, args, result):
+        """ Returns when a reply expires, ``float("inf")`` if it never
+            does, or ``None`` if it must not be cached
+        """
+        if result is None:
+            return None
+        if name in BLOCK_METHODS:
+            try:
+                num = int(args[0])
+            except (IndexError, TypeError, ValueError):
+                return None
+            if num <= self.last_irreversible_block_num:
+                return float("inf")
+            return None
+        if name in self.ttl:
+            if isinstance(result, list) and None in result:
+                return None
+            return time.time() + self.ttl[name]
+        return None
+
+    def needs_irreversible_block(self, name, args):
+        """ Returns ``True`` if the block requested by ``name`` may be
+            irreversible, but the cache does not know yet
+        """
+        if name not in BLOCK_METHODS:
+            return False
+        try:
+            return int(args[0]) > self.last_irreversible_block_num
+        except (IndexError, TypeError, ValueError):
+            return False
+
+    def observe(self, result):
+        """ Learn the last irreversible block from a reply
+        """
+        if isinstance(result, list):
+            for r in result:
+                self.observe(r)
+        elif isinstance(result, dict) and "last_irreversible_block_num" in result:
+            self.last_irreversible_block_num = max(
+                self.last_irreversible_block_num,
+                result["last_irreversible_block_num"])
+
+    def get(self, name, args):
+        """ Returns ``(True, result)`` if the reply is cached, otherwise
+            ``(False, None)``
+        """
+        key = self.key(name, args)
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry and entry[1] > now:
+                self._data.move_to_end(key)
+                self.stats["hits"] += 1
+                return True, codec.loads(entry[0])
+            if entry:
+                del self._data[key]
+            if self._db:
+                row = self._db.execute(
+                    "SELECT value, expires FROM cache WHERE key=?",
+                    (key,)).fetchone()
+                if row and row[1] > now:
+                    self.stats["disk_hits"] += 1
+                    self._store(key, row[0], row[1])
+                    return True, codec.loads(row[0])
+            self.stats["misses"] += 1
+            return False, None
+
+    def set(self, name, args, result):
+        """ Cache the reply if ``name`` is cacheable
+        """
+        expires = self.expiration(name, args, result)
+        if expires is None:
+            return
+        key = self.key(name, args)
+        value = codec.dumps(result)
+        with self._lock:
+            self.stats["stores"] += 1
+            self._store(key, value, expires)
+            if self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO cache VALUES (?, ?, ?)",
+                    (key, value, expires))
+                self._db.commit()
+
+    def _store(self, key, value, expires):
+        self._data[key] = (value, expires)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def clear(self):
+        """ Clears the whole cache
+        """
+        with self._lock:
+            self._data.clear()
+            if self._db:
+                self._db.execute("DELETE FROM cache")
+                self._db.commit()
+
+
+class ChainParamsCache(object):
+    """ Remembers the network parameters (``chain_params``) of every node
+        on disk, so that connecting to a known node does not need to look
+        them up again. The chain id of the node is compared with the cached
+        one when the parameters are first used, and a mismatch replaces the
+        entry.
+
+        :param str path: JSON file (defaults to ``nodes.json`` in the
+            user's cache directory)
+        :param float max_age: Seconds after which the parameters of a node
+            are asked for again (defaults to a week)
+        :param int max_nodes: Number of nodes to remember
+    """
+    def __init__(self, path=None, max_age=7 * 24 * 60 * 60, max_nodes=100):
+        if path is None:
+            path = os.path.join(
+                user_cache_dir("vinchainio", "Vinchain.io"), "nodes.json")
+        self.path = path
+        self.max_age = max_age
+        self.max_nodes = max_nodes
+        self._lock = threading.Lock()
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, url):
+        """ Returns the cached parameters of the node ``url`` or ``None``
+        """
+        with self._lock:
+            entry = self.load().get(url)
+        if entry and time.time() - entry["time"] < self.max_age:
+            return entry["chain_params"]
+
+    def set(self, url, chain_params):
+        """ Store the parameters of the node ``url``
+        """
+        with self._lock:
+            nodes = self.load()
+            nodes[url] = {"chain_params": chain_params, "time": time.time()}
+            if len(nodes) > self.max_nodes:
+                nodes = dict(sorted(
+                    nodes.items(), key=lambda n: n[1]["time"]
+                )[-self.max_nodes:])
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                # Replace the file at once, other processes may read it
+                tmp = "%s.%d" % (self.path, os.getpid())
+                with open(tmp, "w") as f:
+                    json.dump(nodes, f)
+                os.replace(tmp, self.path)
+            except OSError as e:
+                log.warning("Unable to cache chain parameters: %s" % str(e))
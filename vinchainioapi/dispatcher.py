@@ -0,0 +1,295 @@
+import time
+import logging
+import threading
+import traceback
+from collections import deque
+log = logging.getLogger(__name__)
+
+#: What to do with a new notice if the queue of its worker is full
+POLICIES = [
+    # Wait for room, which stops reading from the socket
+    "block",
+    # Drop the oldest queued notice
+    "drop_oldest",
+    # Replace a queued notice with the same key, otherwise block
+    "coalesce",
+]
+
+
+class Shard(object):
+    """ Queue of the notices that are handled by one worker
+    """
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.queue = deque()
+        # Queued notices that can be coalesced, by key
+        self.pending = {}
+        self.cond = threading.Condition()
+        self.thread = None
+        self.busy = False
+
+
+class NoticeDispatcher(object):
+    """ Hands notices from the websocket thread to a pool of workers that
+        call the slots, so that slow slots do not stall the socket.
+
+        :param int workers: Number of worker threads. With ``0``, the
+            slots are called right away on the calling thread
+            (defaults to 1)
+        :param int maxsize: Maximum number of queued notices, split evenly
+            between the workers (defaults to 1000)
+        :param str policy: What to do if the queue is full, one of
+            :attr:`POLICIES` (defaults to ``block``)
+
+        Notices are assigned to workers by their key (the object id, or
+        the name of the event), so that notices with the same key are
+        handled in the order they were received.
+
+        The counters in :attr:`stats` tell how many notices have been
+        ``dispatched``, ``processed``, ``dropped`` and ``coalesced``, how
+        many slots raised ``errors``, the largest queue depth
+        (``max_depth``) and the time in seconds between receiving a notice
+        and calling its slot (``lag`` of the last notice and ``max_lag``).
+        :attr:`depth` is the number of notices queued right now.
+
+        .. code-block:: python
+
+            dispatcher = NoticeDispatcher(workers=4, policy="coalesce")
+            dispatcher.dispatch("1.2.100", print, {"id": "1.2.100"})
+    """
+    def __init__(self, workers=1, maxsize=1000, policy="block"):
+        if policy not in POLICIES:
+            raise ValueError("Unknown policy %s" % policy)
+        self.workers = int(workers)
+        self.maxsize = int(maxsize)
+        self.policy = policy
+        self.stats = {
+            "dispatched": 0, "processed": 0, "dropped": 0, "coalesced": 0,
+            "errors": 0, "max_depth": 0, "lag": 0.0, "max_lag": 0.0,
+        }
+        self.running = True
+        self._lock = threading.Lock()
+        shard_size = max(1, -(-self.maxsize // max(1, self.workers)))
+        self._shards = [Shard(shard_size) for i in range(self.workers)]
+
+    @property
+    def depth(self):
+        """ Number of queued notices
+        """
+        return sum(len(shard.queue) for shard in self._shards)
+
+    def dispatch(self, key, slot, *args, coalesce=False):
+        """ Queue a call of ``slot(*args)``
+
+            :param str key: Notices with the same key are handled in order
+            :param fnt slot: Function to call
+            :param bool coalesce: Whether the notice may replace a queued
+                notice with the same key if the policy is ``coalesce``
+            :returns: ``False`` if the notice has been dropped
+        """
+        received = time.time()
+        with self._lock:
+            self.stats["dispatched"] += 1
+        if not self._shards:
+            self.call(slot, args, received)
+            return True
+
+        shard = self._shards[hash(key) % len(self._shards)]
+        with shard.cond:
+            if shard.thread is None:
+                shard.thread = threading.Thread(
+                    target=self.work, args=(shard,), daemon=True,
+                    name="notice-dispatcher-%d" % self._shards.index(shard))
+                shard.thread.start()
+            coalesce = coalesce and self.policy == "coalesce"
+            if coalesce and key in shard.pending:
+                # The slot gets the newest notice, in the place of the
+                # queued one
+                shard.pending[key][2] = args
+                with self._lock:
+                    self.stats["coalesced"] += 1
+                return True
+            while len(shard.queue) >= shard.maxsize and self.running:
+                if self.policy == "drop_oldest":
+                    dropped = shard.queue.popleft()
+                    if shard.pending.get(dropped[0]) is dropped:
+                        del shard.pending[dropped[0]]
+                    with self._lock:
+                        self.stats["dropped"] += 1
+                else:
+                    shard.cond.wait()
+            if not self.running:
+                with self._lock:
+                    self.stats["dropped"] += 1
+                return False
+            entry = [key, slot, args, received]
+            shard.queue.append(entry)
+            if coalesce:
+                shard.pending[key] = entry
+            shard.cond.notify_all()
+        depth = self.depth
+        with self._lock:
+            self.stats["max_depth"] = max(self.stats["max_depth"], depth)
+        return True
+
+    def work(self, shard):
+        """ Worker loop of a shard (internal use only)
+        """
+        while True:
+            with shard.cond:
+                while not shard.queue and self.running:
+                    shard.cond.wait()
+                if not shard.queue:
+                    return
+                entry = shard.queue.popleft()
+                if shard.pending.get(entry[0]) is entry:
+                    del shard.pending[entry[0]]
+                shard.busy = True
+                shard.cond.notify_all()
+            key, slot, args, received = entry
+            self.call(slot, args, received)
+            with shard.cond:
+                shard.busy = False
+                shard.cond.notify_all()
+
+    def call(self, slot, args, received):
+        """ Call a slot and update the counters (internal use only)
+        """
+        lag = time.time() - received
+        try:
+            slot(*args)
+        except Exception as e:
+            with self._lock:
+                self.stats["errors"] += 1
+            log.critical("Error in {}: {}\n\n{}".format(
+                getattr(slot, "__name__", slot), str(e),
+                traceback.format_exc()))
+        with self._lock:
+            self.stats["processed"] += 1
+            self.stats["lag"] = lag
+            self.stats["max_lag"] = max(self.stats["max_lag"], lag)
+
+    def join(self, timeout=None):
+        """ Wait until all queued notices have been handled
+
+            :returns: ``False`` if notices are left after ``timeout``
+                seconds
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        for shard in self._shards:
+            with shard.cond:
+                while (shard.queue or shard.busy) and self.running:
+                    remaining = None
+                    if deadline is not None:
+                        remaining = deadline - time.time()
+                        if remaining <= 0:
+                            return False
+                    shard.cond.wait(remaining)
+        return True
+
+    def stop(self, timeout=None):
+        """ Stop the workers. Notices that are still queued are dropped.
+        """
+        self.running = False
+        for shard in self._shards:
+            with shard.cond:
+                with self._lock:
+                    self.stats["dropped"] += len(shard.queue)
+                shard.queue.clear()
+                shard.pending.clear()
+                shard.cond.notify_all()
+        for shard in self._shards:
+            if shard.thread and shard.thread is not threading.current_thread():
+                shard.thread.join(timeout)
+
+
+class Coalescer(object):
+    """ Keeps only the newest notice per key until it is handed to the
+        slot, so that a slot that runs behind skips the states that are
+        already stale.
+
+        :param NoticeDispatcher dispatcher: Dispatcher that calls the slot
+        :param fnt slot: Function to call with the newest notice
+        :param float interval: Hand the notices to the slot every x
+            seconds. With ``0``, a notice is handed over as soon as the
+            worker is ready, i.e. notices are only coalesced while the
+            slot is busy (defaults to 0)
+
+        The counters in :attr:`stats` tell how many notices have been
+        ``received``, ``coalesced`` with a newer one and ``flushed`` to
+        the slot.
+
+        .. code-block:: python
+
+            coalescer = Coalescer(NoticeDispatcher(), print, interval=1)
+            coalescer.put("2.1.0", {"id": "2.1.0", "head_block_number": 1})
+            coalescer.put("2.1.0", {"id": "2.1.0", "head_block_number": 2})
+            # prints only the second notice
+    """
+    def __init__(self, dispatcher, slot, interval=0):
+        self.dispatcher = dispatcher
+        self.slot = slot
+        self.interval = interval
+        self.stats = {"received": 0, "coalesced": 0, "flushed": 0}
+        # Newest notice per key
+        self.latest = {}
+        # Keys that have a flush queued in the dispatcher
+        self.scheduled = set()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def put(self, key, notice):
+        """ Store ``notice`` as the newest notice of ``key``
+        """
+        with self._lock:
+            self.stats["received"] += 1
+            if key in self.latest:
+                self.stats["coalesced"] += 1
+            self.latest[key] = notice
+            if self.interval:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self.run, daemon=True, name="coalescer")
+                    self._thread.start()
+                return
+            if key in self.scheduled:
+                return
+            self.scheduled.add(key)
+        self.dispatcher.dispatch(key, self.flush_key, key)
+
+    def run(self):
+        """ Flush loop of the ``interval`` (internal use only)
+        """
+        while not self._stopped.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        """ Queue the newest notice of every key for the slot
+        """
+        with self._lock:
+            keys = [key for key in self.latest if key not in self.scheduled]
+            self.scheduled.update(keys)
+        for key in keys:
+            self.dispatcher.dispatch(key, self.flush_key, key)
+
+    def flush_key(self, key):
+        """ Hand the newest notice of ``key`` to the slot (internal use
+            only)
+        """
+        with self._lock:
+            self.scheduled.discard(key)
+            notice = self.latest.pop(key, None)
+            if notice is None:
+                return
+            self.stats["flushed"] += 1
+        self.slot(notice)
+
+    def stop(self):
+        """ Stop flushing. Notices that have not been flushed are dropped.
+        """
+        self._stopped.set()
+        with self._lock:
+            self.latest.clear()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
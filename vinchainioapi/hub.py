@@ -0,0 +1,354 @@
+import logging
+import threading
+import traceback
+from collections import Counter
+from grapheneapi.nodes import NodeManager
+from .subscriptions import SubscriptionIndex
+from .websocket import VinChainWebsocket
+log = logging.getLogger(__name__)
+
+
+class Subscription(object):
+    """ Interest of one consumer of a :class:`SubscriptionHub`. Instances
+        are returned by :meth:`SubscriptionHub.subscribe`.
+
+        The accounts, markets and objects can be changed at any time
+        without reconnecting.
+    """
+    def __init__(
+        self,
+        hub,
+        on_tx=None,
+        on_object=None,
+        on_block=None,
+        on_account=None,
+        on_market=None
+    ):
+        self.hub = hub
+        self.on_tx = on_tx
+        self.on_object = on_object
+        self.on_block = on_block
+        self.on_account = on_account
+        self.on_market = on_market
+        self.objects = SubscriptionIndex()
+        self.accounts = set()
+        self.markets = set()
+
+    def add_objects(self, objects):
+        """ :param list objects: Object ids and wildcards like ``1.3.x``
+        """
+        self.hub.update(self, "objects", add=objects)
+
+    def remove_objects(self, objects):
+        self.hub.update(self, "objects", remove=objects)
+
+    def add_accounts(self, accounts):
+        """ :param list accounts: Account ids
+        """
+        self.hub.update(self, "accounts", add=accounts)
+
+    def remove_accounts(self, accounts):
+        self.hub.update(self, "accounts", remove=accounts)
+
+    def add_markets(self, markets):
+        """ :param list markets: list of asset_ids, e.g.
+                ``[['1.3.0', '1.3.121']]``
+        """
+        self.hub.update(self, "markets", add=markets)
+
+    def remove_markets(self, markets):
+        self.hub.update(self, "markets", remove=markets)
+
+    def close(self):
+        """ Remove all interests of this consumer from the hub
+        """
+        self.hub.unsubscribe(self)
+
+    def call(self, slot, notice):
+        """ Call a slot of the consumer (internal use only)
+        """
+        try:
+            slot(notice)
+        except Exception as e:
+            log.critical("Error in {}: {}\n\n{}".format(
+                getattr(slot, "__name__", slot), str(e),
+                traceback.format_exc()))
+
+
+class SubscriptionHub(object):
+    """ Shares one :class:`vinchainioapi.websocket.VinChainWebsocket`
+        between many consumers. The hub subscribes to the union of the
+        accounts, markets and objects of its consumers, counting how many
+        consumers are interested in each, and passes every notice on to
+        the consumers that are interested in it.
+
+        :param str urls: Either a single Websocket URL, a list of URLs, or
+            an instance of :class:`grapheneapi.nodes.NodeManager`
+        :param str user: Username for Authentication
+        :param str password: Password for Authentication
+
+        All other arguments are passed on to the websocket. Use
+        :meth:`shared` to get the hub of the process for a set of nodes:
+
+        .. code-block:: python
+
+            hub = SubscriptionHub.shared("wss://node.vinchain.io")
+            sub = hub.subscribe(objects=["2.1.0"], on_object=print)
+            sub.add_accounts(["1.2.100"])
+            sub.close()
+
+        Account notices are passed on to the consumers that subscribed to
+        the ``owner`` of the notice, so accounts are given by id. Market
+        notices are passed on to the consumers that subscribed to the
+        market of the orders and fills in the notice (see
+        :meth:`market_pairs`). Notices that only tell the ids of orders do
+        not tell their market and are passed on to all consumers with
+        markets.
+
+        The slots of all consumers are called by the workers of the
+        websocket (see the ``workers`` argument).
+    """
+    _hubs = {}
+    _hubs_lock = threading.Lock()
+
+    def __init__(self, urls, user="", password="", **kwargs):
+        self.websocket = VinChainWebsocket(
+            urls, user, password,
+            on_object=self.fan_object,
+            on_account=self.fan_account,
+            on_market=self.fan_market,
+            **kwargs)
+        self.consumers = []
+        # Number of consumers interested in each object, account and market
+        self.counts = {
+            "objects": Counter(),
+            "accounts": Counter(),
+            "markets": Counter(),
+        }
+        self.events = set()
+        self.key = None
+        self.closed = False
+        self._lock = threading.RLock()
+        self._thread = None
+
+    @classmethod
+    def shared(cls, urls, user="", password="", **kwargs):
+        """ Returns the hub of this process for ``urls`` and ``user`` and
+            creates it on first use. ``kwargs`` only take effect when the
+            hub is created.
+        """
+        if isinstance(urls, NodeManager):
+            key = urls.urls
+        elif isinstance(urls, str):
+            key = [urls]
+        else:
+            key = urls
+        key = (tuple(sorted(key)), user)
+        with cls._hubs_lock:
+            hub = cls._hubs.get(key)
+            if hub is None:
+                hub = cls._hubs[key] = cls(urls, user, password, **kwargs)
+                hub.key = key
+            return hub
+
+    def subscribe(
+        self,
+        accounts=[],
+        markets=[],
+        objects=[],
+        on_tx=None,
+        on_object=None,
+        on_block=None,
+        on_account=None,
+        on_market=None
+    ):
+        """ Register a consumer and start the connection if needed
+
+            :param list accounts: Account ids
+            :param list markets: list of asset_ids, e.g.
+                ``[['1.3.0', '1.3.121']]``
+            :param list objects: Object ids and wildcards like ``1.3.x``
+            :returns: :class:`Subscription`
+        """
+        subscription = Subscription(
+            self, on_tx, on_object, on_block, on_account, on_market)
+        with self._lock:
+            if self.closed:
+                raise ValueError("The hub has been closed")
+            self.consumers = self.consumers + [subscription]
+            for event, slot in [("on_tx", on_tx), ("on_block", on_block)]:
+                if slot:
+                    self.watch(event)
+            self.update(subscription, "objects", add=objects)
+            self.update(subscription, "accounts", add=accounts)
+            self.update(subscription, "markets", add=markets)
+        self.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """ Remove a consumer. The connection is closed when the last
+            consumer leaves.
+        """
+        with self._lock:
+            if subscription not in self.consumers:
+                return
+            self.update(
+                subscription, "objects", remove=list(subscription.objects))
+            self.update(
+                subscription, "accounts", remove=list(subscription.accounts))
+            self.update(
+                subscription, "markets", remove=list(subscription.markets))
+            self.consumers = [
+                c for c in self.consumers if c is not subscription]
+            if not self.consumers:
+                self.close()
+
+    def update(self, subscription, kind, add=[], remove=[]):
+        """ Change the interests of a consumer and subscribe to what no
+            other consumer has been interested in, or unsubscribe from what
+            no consumer is interested in anymore (internal use only)
+
+            :param str kind: ``objects``, ``accounts`` or ``markets``
+        """
+        if kind == "markets":
+            add = [tuple(market) for market in add]
+            remove = [tuple(market) for market in remove]
+        with self._lock:
+            interests = getattr(subscription, kind)
+            current = set(interests)
+            counts = self.counts[kind]
+            first, last = [], []
+            for item in add:
+                if item in current:
+                    continue
+                current.add(item)
+                counts[item] += 1
+                if counts[item] == 1:
+                    first.append(item)
+            for item in remove:
+                if item not in current:
+                    continue
+                current.discard(item)
+                counts[item] -= 1
+                if counts[item] <= 0:
+                    del counts[item]
+                    last.append(item)
+
+            if kind == "objects":
+                interests.add(add)
+                interests.remove(remove)
+                if first:
+                    self.websocket.subscribe_objects(first)
+                if last:
+                    self.websocket.unsubscribe_objects(last)
+            elif kind == "accounts":
+                interests.update(add)
+                interests.difference_update(remove)
+                if first:
+                    self.websocket.subscribe_accounts(first)
+                if last:
+                    self.websocket.unsubscribe_accounts(last)
+            else:
+                interests.update(add)
+                interests.difference_update(remove)
+                if first:
+                    self.websocket.subscribe_markets(first)
+                if last:
+                    self.websocket.unsubscribe_markets(last)
+
+    def watch(self, event):
+        """ Pass the notices of ``on_tx`` or ``on_block`` on to the
+            consumers (internal use only)
+        """
+        with self._lock:
+            if event in self.events:
+                return
+            self.events.add(event)
+            slot = getattr(self.websocket, event)
+            slot += getattr(self, "fan_" + event[3:])
+            self.websocket.request_notices(event)
+
+    def fan_object(self, notice):
+        id = notice["id"]
+        for consumer in self.consumers:
+            if consumer.on_object and id in consumer.objects:
+                consumer.call(consumer.on_object, notice)
+
+    def fan_account(self, notice):
+        owner = notice.get("owner")
+        for consumer in self.consumers:
+            if consumer.on_account and owner in consumer.accounts:
+                consumer.call(consumer.on_account, notice)
+
+    @staticmethod
+    def market_pairs(notice):
+        """ Returns the set of the markets of the orders and fills found
+            anywhere in a market notice, each as a ``frozenset`` of the two
+            asset ids
+        """
+        pairs = set()
+        stack = [notice]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, dict):
+                amounts = []
+                if "pays" in item and "receives" in item:
+                    amounts = [item["pays"], item["receives"]]
+                for key in ["sell_price", "call_price"]:
+                    if isinstance(item.get(key), dict):
+                        amounts = [
+                            item[key].get("base"), item[key].get("quote")]
+                ids = [
+                    a.get("asset_id") for a in amounts if isinstance(a, dict)]
+                if len(ids) == 2 and all(ids):
+                    pairs.add(frozenset(ids))
+                stack.extend(item.values())
+            elif isinstance(item, (list, tuple)):
+                stack.extend(item)
+        return pairs
+
+    def fan_market(self, notice):
+        pairs = self.market_pairs(notice)
+        for consumer in self.consumers:
+            if not consumer.on_market or not consumer.markets:
+                continue
+            if pairs and not pairs & set(
+                    frozenset(market) for market in consumer.markets):
+                continue
+            consumer.call(consumer.on_market, notice)
+
+    def fan_tx(self, notice):
+        for consumer in self.consumers:
+            if consumer.on_tx:
+                consumer.call(consumer.on_tx, notice)
+
+    def fan_block(self, notice):
+        for consumer in self.consumers:
+            if consumer.on_block:
+                consumer.call(consumer.on_block, notice)
+
+    def start(self):
+        """ Run the websocket in a background thread, if it does not run
+            yet
+        """
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self.websocket.run_forever, daemon=True,
+                    name="SubscriptionHub")
+                self._thread.start()
+
+    def join(self, timeout=None):
+        """ Wait until the hub has been closed
+        """
+        if self._thread:
+            self._thread.join(timeout)
+
+    def close(self):
+        """ Close the connection and forget the hub
+        """
+        self.closed = True
+        with self.__class__._hubs_lock:
+            if self.__class__._hubs.get(self.key) is self:
+                del self.__class__._hubs[self.key]
+        self.websocket.close()
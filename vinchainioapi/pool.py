@@ -0,0 +1,310 @@
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from collections import deque
+from websocket import WebSocketException
+from grapheneapi.batch import RPCBatch
+from grapheneapi.nodes import NodeManager
+from grapheneapi.exceptions import NumRetriesReached
+from grapheneapi.scheduler import Scheduler
+from grapheneapi.metrics import Metrics
+from .vinchainnoderpc import VinChainNodeRPC
+from .exceptions import PoolTimeout
+log = logging.getLogger(__name__)
+
+#: Errors after which a connection is not used again
+CONNECTION_ERRORS = (
+    NumRetriesReached,
+    WebSocketException,
+    OSError,
+)
+
+
+class VinChainNodeRPCPool(object):
+    """ Thread-safe pool of :class:`vinchainioapi.vinchainnoderpc.VinChainNodeRPC`
+        connections. Every call checks out a connection that is logged in
+        and registered to the APIs, so that many threads can talk to the
+        nodes at the same time.
+
+        :param str urls: Either a single Websocket URL, or a list of URLs
+        :param str user: Username for Authentication
+        :param str password: Password for Authentication
+        :param int size: Maximum number of connections (defaults to 4)
+        :param int min_size: Number of connections that are kept open even
+            if idle (defaults to 1)
+        :param float idle_timeout: Close connections that have not been used
+            for x seconds (defaults to 300)
+        :param float health_check_interval: Check that a connection still
+            works before handing it out if it has been idle for x seconds
+            (defaults to 30)
+        :param float checkout_timeout: Seconds to wait for a free connection
+            before raising :class:`vinchainioapi.exceptions.PoolTimeout`
+            (defaults to waiting indefinitely)
+
+        All other arguments are passed on to the connections. The pool
+        offers the same methods as a single connection:
+
+        .. code-block:: python
+
+            rpc = VinChainNodeRPCPool("wss://node.vinchain.io", size=8)
+            rpc.get_objects(["2.1.0"])
+
+            with rpc.connection() as conn:
+                # Several calls on the same connection
+                conn.get_block(1)
+                conn.get_block(2)
+    """
+    def __init__(
+        self,
+        urls,
+        user=None,
+        password=None,
+        size=4,
+        min_size=1,
+        idle_timeout=300,
+        health_check_interval=30,
+        checkout_timeout=None,
+        **kwargs
+    ):
+        self.urls = NodeManager(urls)
+        self.user = user
+        self.password = password
+        self.max_size = max(1, size)
+        self.min_size = min(min_size, self.max_size)
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.checkout_timeout = checkout_timeout
+        self.kwargs = kwargs
+        self.kwargs.pop("pool_size", None)
+        # All connections share the rate limit
+        self.scheduler = self.kwargs.setdefault("scheduler", Scheduler(
+            kwargs.get("rate_limit"), kwargs.get("burst")))
+        # ... and the metrics
+        if self.kwargs.get("metrics") is True:
+            self.kwargs["metrics"] = Metrics()
+        self.metrics = self.kwargs.get("metrics")
+        self.stats = {"created": 0, "closed": 0, "checkouts": 0, "waits": 0}
+
+        self._idle = deque()
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        # The first connection identifies the network for all others
+        connection = self.create()
+        self.chain_params = connection.chain_params
+        self.kwargs["chain_params"] = self.chain_params
+        self.kwargs["probe_nodes"] = False
+        self.kwargs["race"] = False
+        with self._cond:
+            self._size += 1
+        self.checkin(connection)
+
+    @property
+    def size(self):
+        """ Number of open connections
+        """
+        return self._size
+
+    def create(self):
+        """ Open a new connection (internal use only)
+        """
+        connection = VinChainNodeRPC(
+            self.urls, self.user, self.password, **self.kwargs)
+        self.stats["created"] += 1
+        return connection
+
+    def discard(self, connection):
+        """ Close a connection and free its slot (internal use only)
+        """
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self.stats["closed"] += 1
+            self._cond.notify()
+
+    def healthy(self, connection):
+        """ Returns ``True`` if the connection answers a call
+        """
+        try:
+            connection.get_dynamic_global_properties(
+                num_retries=0, timeout=self.kwargs.get("timeout") or 5)
+            return True
+        except Exception as e:
+            log.warning("Connection to %s is broken: %s" % (
+                connection.url, str(e)))
+            return False
+
+    def evict(self):
+        """ Close connections that have been idle for too long (internal
+            use only, requires the lock)
+        """
+        evicted = []
+        now = time.time()
+        while (self._idle and self._size > self.min_size and
+               now - self._idle[0][1] > self.idle_timeout):
+            evicted.append(self._idle.popleft()[0])
+            self._size -= 1
+            self.stats["closed"] += 1
+        return evicted
+
+    def checkout(self, timeout=None):
+        """ Obtain a connection. It needs to be returned with
+            :func:`checkin`.
+
+            :param float timeout: Seconds to wait for a free connection
+            :raises PoolTimeout: if no connection became available in time
+        """
+        if timeout is None:
+            timeout = self.checkout_timeout
+        end = time.time() + timeout if timeout is not None else None
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise PoolTimeout("The pool has been closed")
+                evicted = self.evict()
+                if self._idle:
+                    # The most recently used connection, so that the
+                    # others can become idle and be evicted
+                    connection, last_used = self._idle.pop()
+                    create = False
+                elif self._size < self.max_size:
+                    self._size += 1
+                    connection, last_used, create = None, None, True
+                else:
+                    self.stats["waits"] += 1
+                    remaining = end - time.time() if end is not None else None
+                    if remaining is not None and remaining <= 0:
+                        raise PoolTimeout(
+                            "No connection available within %.1fs" % timeout)
+                    self._cond.wait(remaining)
+                    continue
+            for c in evicted:
+                c.close()
+            self.stats["checkouts"] += 1
+
+            if create:
+                try:
+                    return self.create()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+
+            if (time.time() - last_used > self.health_check_interval and
+                    not self.healthy(connection)):
+                self.discard(connection)
+                continue
+            return connection
+
+    def checkin(self, connection, broken=False):
+        """ Return a connection to the pool
+
+            :param bool broken: Close the connection instead
+        """
+        if broken or self._closed:
+            self.discard(connection)
+            return
+        with self._cond:
+            self._idle.append((connection, time.time()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """ Context manager that checks out a connection for several calls
+        """
+        connection = self.checkout(timeout)
+        try:
+            yield connection
+        except CONNECTION_ERRORS:
+            self.checkin(connection, broken=True)
+            raise
+        except BaseException:
+            self.checkin(connection)
+            raise
+        else:
+            self.checkin(connection)
+
+    def close(self):
+        """ Close all connections
+        """
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, deque()
+        for connection, last_used in idle:
+            self.discard(connection)
+
+    def batch(self, chunk_size=None, timeout=None):
+        """ Returns a :class:`PoolBatch` whose calls are built and sent on a
+            single connection
+
+            :param int chunk_size: Send at most ``chunk_size`` calls per
+                frame
+            :param float timeout: Seconds to wait for a free connection
+        """
+        return PoolBatch(self, chunk_size=chunk_size, timeout=timeout)
+
+    def __getattr__(self, name):
+        """ Map all methods to calls on a checked out connection
+        """
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def method(*args, **kwargs):
+            with self.connection() as connection:
+                return getattr(connection, name)(*args, **kwargs)
+        return method
+
+
+class PoolBatch(RPCBatch):
+    """ :class:`grapheneapi.batch.RPCBatch` of a
+        :class:`VinChainNodeRPCPool`. The first queued call checks out a
+        connection, which is kept until the batch has been executed.
+        Request ids and api ids are assigned per connection, hence all
+        calls of the batch are built and sent on that connection.
+
+        .. code-block:: python
+
+            with pool.batch() as b:
+                blocks = [b.get_block(n) for n in range(1, 101)]
+    """
+    def __init__(self, pool, chunk_size=None, timeout=None):
+        super(PoolBatch, self).__init__(None, chunk_size=chunk_size)
+        self.pool = pool
+        self.timeout = timeout
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.execute()
+        else:
+            self.queries, self.calls = [], []
+            self.release()
+
+    def release(self, broken=False):
+        """ Return the connection to the pool (internal use only)
+        """
+        connection, self.rpc = self.rpc, None
+        if connection is not None:
+            self.pool.checkin(connection, broken=broken)
+
+    def execute(self):
+        try:
+            return super(PoolBatch, self).execute()
+        except CONNECTION_ERRORS:
+            self.release(broken=True)
+            raise
+        finally:
+            self.release()
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if self.rpc is None:
+            self.rpc = self.pool.checkout(self.timeout)
+        return super(PoolBatch, self).__getattr__(name)
+
@@ -0,0 +1,71 @@
+class SubscriptionIndex(object):
+    """ Set of subscribed object ids that can also contain wildcards for
+        all objects of a space and type, such as ``1.3.x``. Looking up an
+        id takes the same time no matter how many ids are subscribed.
+
+        :param list objects: Object ids and wildcards
+
+        .. code-block:: python
+
+            index = SubscriptionIndex(["2.1.0", "1.3.x"])
+            "1.3.121" in index  # True
+            index.add(["1.2.100", "1.2.101"])
+            index.remove(["2.1.0"])
+    """
+    def __init__(self, objects=[]):
+        # Subscribed ids
+        self.ids = set()
+        # Subscribed space and type, such as "1.3"
+        self.types = set()
+        self.add(objects)
+
+    @staticmethod
+    def is_wildcard(id):
+        return id.endswith(".x")
+
+    def add(self, objects):
+        """ Subscribe to object ids and wildcards
+
+            :returns: list of the ids (not wildcards) that were not
+                subscribed before
+        """
+        if isinstance(objects, str):
+            objects = [objects]
+        new = []
+        for id in objects:
+            if self.is_wildcard(id):
+                self.types.add(id[:-2])
+            elif id not in self.ids:
+                self.ids.add(id)
+                new.append(id)
+        return new
+
+    def remove(self, objects):
+        """ Unsubscribe from object ids and wildcards
+        """
+        if isinstance(objects, str):
+            objects = [objects]
+        for id in objects:
+            if self.is_wildcard(id):
+                self.types.discard(id[:-2])
+            else:
+                self.ids.discard(id)
+
+    def __contains__(self, id):
+        if id in self.ids:
+            return True
+        if self.types:
+            return id[:id.rfind(".")] in self.types
+        return False
+
+    def __iter__(self):
+        for id in self.ids:
+            yield id
+        for type in self.types:
+            yield type + ".x"
+
+    def __len__(self):
+        return len(self.ids) + len(self.types)
+
+    def __bool__(self):
+        return bool(self.ids or self.types)
@@ -5,10 +5,23 @@ import websocket
 import ssl
 import json
 import time
+import copy
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    TimeoutError as FutureTimeoutError,
+    wait
+)
 from itertools import cycle
 from grapheneapi.graphenewsrpc import GrapheneWebsocketRPC
+from grapheneapi.exceptions import DeadlineExceeded
+from grapheneapi.methods import METHODS
+from grapheneapi.retry import Deadline
+from grapheneapi.scheduler import Scheduler
 from vinchainiobase.chains import known_chains
 from . import exceptions
+from .cache import ResponseCache, ChainParamsCache
 import logging
 log = logging.getLogger(__name__)
 
@@ -17,41 +30,426 @@ class NumRetriesReached(Exception):
     pass
 
 
+#: Idempotent read calls that may be hedged and coalesced
+READ_METHODS = frozenset([
+    "get_objects",
+    "get_block",
+    "get_block_header",
+    "get_transaction",
+    "get_transaction_hex",
+    "get_chain_properties",
+    "get_global_properties",
+    "get_dynamic_global_properties",
+    "get_config",
+    "get_required_fees",
+    "get_required_signatures",
+    "get_potential_signatures",
+    "get_account_by_name",
+    "get_accounts",
+    "get_full_accounts",
+    "get_account_count",
+    "get_account_history",
+    "get_key_references",
+    "lookup_accounts",
+    "lookup_asset_symbols",
+    "get_assets",
+    "get_vindb_blocks",
+    "get_latest_vindb_block",
+    "get_invoice_by_report_uuid",
+])
+
+
+#: API methods that only VinChain nodes offer
+VINCHAIN_METHODS = {
+    "get_vindb_blocks": ("database", 2),
+    "get_latest_vindb_block": ("database", 0),
+    "get_invoice_by_report_uuid": ("database", 1),
+}
+
+
 class VinChainNodeRPC(GrapheneWebsocketRPC):
+    """ RPC connection to a VinChain node (see
+        :class:`grapheneapi.graphenewsrpc.GrapheneWebsocketRPC`)
+
+        :param bool hedge: If the node does not reply to an idempotent read
+            in time, send the same call to the next best node and take the
+            first reply (defaults to ``False``). Requires several URLs and
+            implies ``pipelined=True``.
+        :param float hedge_delay: Seconds to wait for the first node before
+            hedging. By default, the ``hedge_percentile`` of the recently
+            observed latencies is used.
+        :param float hedge_percentile: Percentile of the latencies to use as
+            delay (defaults to 0.95)
+        :param set hedge_methods: Names of the API methods that may be hedged
+            (defaults to :attr:`READ_METHODS`). Broadcasts are never hedged.
+        :param bool coalesce: If an identical read is already in flight,
+            wait for its reply instead of sending the call again (defaults
+            to ``True``)
+        :param set coalesce_methods: Names of the API methods that may be
+            coalesced (defaults to :attr:`READ_METHODS`)
+        :param cache: Cache replies of immutable and rarely changing calls.
+            Either ``True`` or an instance of
+            :class:`vinchainioapi.cache.ResponseCache` (defaults to
+            ``None``)
+        :param dict chain_params: Parameters of the network, skips
+            identifying the network if given
+        :param node_cache: Cache the parameters of the network per node
+            on disk, so that connecting to a known node does not need to
+            identify the network. Either ``True`` for the default file, the
+            path of the cache file or an instance of
+            :class:`vinchainioapi.cache.ChainParamsCache` (defaults to
+            ``None``). The chain id of cached parameters is checked against
+            the node the first time :attr:`chain_params` is used.
+        :param float rate_limit: Calls per second to a node. If calls have
+            to wait, broadcasts are sent first, then interactive reads and
+            then bulk reads. A call's class can be given with
+            ``priority="bulk"``.
+        :param int burst: Calls that may be made at once despite the rate
+            limit (defaults to ``rate_limit``)
+        :param scheduler: Instance of
+            :class:`grapheneapi.scheduler.Scheduler` to share the rate limit
+            with other connections
+        :param float lib_refresh_interval: If a block above the last known
+            irreversible block is requested, refresh the dynamic global
+            properties at most every x seconds to learn whether it can be
+            cached (defaults to 3)
+    """
+
+    methods = dict(METHODS, **VINCHAIN_METHODS)
 
     def __init__(self, *args, **kwargs):
+        self.hedge = bool(kwargs.get("hedge", False))
+        self.hedge_delay = kwargs.get("hedge_delay")
+        self.hedge_percentile = kwargs.get("hedge_percentile", 0.95)
+        self.hedge_methods = set(
+            kwargs.get("hedge_methods", READ_METHODS))
+        self.hedge_rpc = None
+        self.hedge_stats = {"calls": 0, "hedged": 0, "won": 0}
+        self._latencies = deque(maxlen=100)
+        self.coalesce = bool(kwargs.get("coalesce", True))
+        self.coalesce_methods = set(
+            kwargs.get("coalesce_methods", READ_METHODS))
+        self.coalesce_stats = {"calls": 0, "hits": 0, "deduplicated": 0}
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self.cache = kwargs.get("cache")
+        if self.cache is True:
+            self.cache = ResponseCache()
+        elif self.cache is False:
+            self.cache = None
+        self.lib_refresh_interval = kwargs.get("lib_refresh_interval", 3)
+        self._lib_refreshed = 0
+        self.scheduler = kwargs.get("scheduler") or Scheduler(
+            kwargs.get("rate_limit"), kwargs.get("burst"))
+        self.node_cache = kwargs.get("node_cache")
+        if self.node_cache is True:
+            self.node_cache = ChainParamsCache()
+        elif isinstance(self.node_cache, str):
+            self.node_cache = ChainParamsCache(self.node_cache)
+        self.chain_params = kwargs.get("chain_params")
+        if self.hedge:
+            kwargs["pipelined"] = True
         super(VinChainNodeRPC, self).__init__(*args, **kwargs)
-        self.chain_params = self.get_network()
+        if not self._chain_params:
+            self.chain_params = self.get_network()
+
+        if self.hedge and len(self.urls) > 1:
+            threading.Thread(
+                target=self.connect_hedge_node,
+                name="VinChainNodeRPC hedge",
+                daemon=True
+            ).start()
+        elif self.hedge:
+            log.warning("Hedging requires more than one node")
+
+    @property
+    def chain_params(self):
+        """ Parameters of the network. Parameters that have been taken from
+            :attr:`node_cache` are checked against the chain id of the node
+            on first use.
+        """
+        if self._unchecked_chain_params:
+            self.check_chain_params()
+        return self._chain_params
+
+    @chain_params.setter
+    def chain_params(self, chain_params):
+        self._chain_params = chain_params
+        self._unchecked_chain_params = False
+
+    def check_chain_params(self):
+        """ Compare the cached network parameters with the chain id of the
+            node and identify the network again if they differ
+        """
+        props = self.get_chain_properties()
+        cached = self._chain_params
+        if cached["chain_id"] != props["chain_id"]:
+            log.warning(
+                "Node %s is on chain %s, not on the cached chain %s" % (
+                    self.url, props["chain_id"], cached["chain_id"]))
+            self._chain_params = self.get_network(props)
+            self.node_cache.set(self.url, self._chain_params)
+        self._unchecked_chain_params = False
 
     def register_apis(self):
-        self.api_id["database"] = self.database(api_id=1)
-        self.api_id["history"] = self.history(api_id=1)
-        self.api_id["network_broadcast"] = self.network_broadcast(api_id=1)
+        """ Register to the APIs and, unless the network is known already,
+            identify the network in the same batched exchange. Network
+            parameters found in :attr:`node_cache` are used without asking
+            the node, and checked when they are first used.
+        """
+        apis = ["database", "history", "network_broadcast"]
+        payloads = [self.get_query(api, [], {"api_id": 1}) for api in apis]
+        if not self._chain_params and self.node_cache:
+            cached = self.node_cache.get(self.url)
+            if cached:
+                self._chain_params = cached
+                self._unchecked_chain_params = True
+        if not self._chain_params:
+            payloads.append(self.get_query("get_chain_properties", [], {}))
 
-    def rpcexec(self, payload):
-        """ Execute a call by sending the payload.
-            It makes use of the GrapheneRPC library.
-            In here, we mostly deal with VinChain specific error handling
+        replies = self.rpcexec_batch(payloads)
+        results = []
+        for payload in payloads:
+            result = replies.get(payload["id"])
+            if isinstance(result, Exception):
+                raise result
+            results.append(result)
+        for api, api_id in zip(apis, results):
+            self.api_id[api] = api_id
+        if not self._chain_params:
+            self.chain_params = self.get_network(results[-1])
+            if self.node_cache:
+                self.node_cache.set(self.url, self.chain_params)
 
-            :param json payload: Payload data
-            :raises ValueError: if the server does not respond in proper JSON format
-            :raises RPCError: if the server returns an error
+    def connect_hedge_node(self):
+        """ Connect to the best node other than the current one. Hedged
+            requests are sent there (internal use only).
         """
+        url = self.urls.best(exclude=self.url).url
         try:
-            # Forward call to GrapheneWebsocketRPC and catch+evaluate errors
-            return super(VinChainNodeRPC, self).rpcexec(payload)
-        except exceptions.RPCError as e:
-            msg = exceptions.decodeRPCErrorMsg(e).strip()
-            if msg == "missing required active authority":
-                raise exceptions.MissingRequiredActiveAuthority
-            elif re.match("^no method with name.*", msg):
-                raise exceptions.NoMethodWithName(msg)
-            elif msg:
-                raise exceptions.UnhandledRPCError(msg)
+            self.hedge_rpc = VinChainNodeRPC(
+                url, self.user, self.password,
+                pipelined=True,
+                probe_nodes=False,
+                num_retries=0,
+                compression=self.compression,
+                recorder=self.recorder,
+                chain_params=self._chain_params,
+                node_cache=self.node_cache,
+                metrics=self.metrics
+            )
+        except Exception as e:
+            log.warning("Unable to connect to hedge node %s: %s" % (url, e))
+            self.urls.failure(url)
+
+    def get_hedge_delay(self):
+        """ Seconds to wait for the first node before hedging a request
+        """
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+        if len(self._latencies) < 10:
+            return 0.5
+        latencies = sorted(self._latencies)
+        return latencies[int(self.hedge_percentile * (len(latencies) - 1))]
+
+    def can_hedge(self, payload):
+        if not self.hedge or not isinstance(payload, dict):
+            return False
+        name = payload["params"][1]
+        return (
+            name in self.hedge_methods and
+            not name.startswith("broadcast_transaction") and
+            self.is_pipelined()
+        )
+
+    def rpcexec(self, payload, **kwargs):
+        if self.cache is not None and isinstance(payload, dict):
+            return self.rpcexec_cached(payload, **kwargs)
+        return self.rpcexec_uncached(payload, **kwargs)
+
+    def rpcexec_cached(self, payload, **kwargs):
+        """ Serve the call from :attr:`cache` if possible
+        """
+        name, args = payload["params"][1:]
+        if not self.cache.cacheable(name):
+            result = self.rpcexec_uncached(payload, **kwargs)
+            self.cache.observe(result)
+            return result
+
+        found, result = self.cache.get(name, args)
+        if found:
+            return result
+
+        if (self.cache.needs_irreversible_block(name, args) and
+                time.time() - self._lib_refreshed > self.lib_refresh_interval):
+            self._lib_refreshed = time.time()
+            self.get_dynamic_global_properties()
+
+        result = self.rpcexec_uncached(payload, **kwargs)
+        self.cache.observe(result)
+        self.cache.set(name, args, result)
+        return result
+
+    def rpcexec_uncached(self, payload, **kwargs):
+        if self.can_coalesce(payload):
+            return self.rpcexec_coalesced(payload, **kwargs)
+        return self.rpcexec_node(payload, **kwargs)
+
+    def call_options(self, kwargs):
+        options = super(VinChainNodeRPC, self).call_options(kwargs)
+        options["priority"] = kwargs.get("priority")
+        return options
+
+    def get_priority(self, payload, priority=None):
+        """ Priority class of a call, see
+            :attr:`grapheneapi.scheduler.PRIORITIES`
+        """
+        if priority:
+            return priority
+        if (isinstance(payload, dict) and
+                payload["params"][1].startswith("broadcast_transaction")):
+            return "broadcast"
+        return "interactive"
+
+    def rpcexec_node(self, payload, priority=None, **kwargs):
+        """ Send the payload to the node once the scheduler permits
+        """
+        priority = self.get_priority(payload, priority)
+        if self.can_hedge(payload):
+            return self.rpcexec_hedged(payload, priority=priority, **kwargs)
+        return super(VinChainNodeRPC, self).rpcexec(
+            payload, priority=priority, **kwargs)
+
+    def throttle(self, payload, priority=None):
+        """ Wait until the scheduler permits a call to the node the payload
+            is sent to
+        """
+        self.scheduler.acquire(self.url, self.get_priority(payload, priority))
+
+    def can_coalesce(self, payload):
+        if not self.coalesce or not isinstance(payload, dict):
+            return False
+        name = payload["params"][1]
+        return (
+            name in self.coalesce_methods and
+            not name.startswith("broadcast_transaction")
+        )
+
+    def rpcexec_coalesced(self, payload, **kwargs):
+        """ Execute the payload unless an identical call (same api, method
+            and parameters) is already in flight. In that case, wait for
+            the reply of that call. Every caller obtains its own copy of
+            the result.
+        """
+        key = json.dumps(payload["params"], sort_keys=True)
+        with self._inflight_lock:
+            self.coalesce_stats["calls"] += 1
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                inflight = self._inflight[key] = [Future(), 0]
+                leader = True
             else:
-                raise e
+                self.coalesce_stats["hits"] += 1
+                if not inflight[1]:
+                    self.coalesce_stats["deduplicated"] += 1
+                inflight[1] += 1
+                leader = False
+        future = inflight[0]
+
+        if not leader:
+            deadline = kwargs.get("deadline") or Deadline()
+            try:
+                result = future.result(timeout=deadline.limit(self.timeout))
+            except FutureTimeoutError:
+                raise DeadlineExceeded(
+                    "Node %s did not reply in time" % self.url)
+            return copy.deepcopy(result)
+
+        try:
+            result = self.rpcexec_node(payload, **kwargs)
         except Exception as e:
-            raise e
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+        with self._inflight_lock:
+            self._inflight.pop(key, None)
+            followers = inflight[1]
+        future.set_result(result)
+        return copy.deepcopy(result) if followers else result
+
+    def rpcexec_hedged(
+        self, payload, deadline=None, priority="interactive", **kwargs
+    ):
+        """ Send the payload to the current node and, if it does not reply
+            within :func:`get_hedge_delay`, to a second node as well. The
+            first reply wins and the other request is cancelled.
+        """
+        deadline = deadline or Deadline()
+        with self._lock:
+            self.hedge_stats["calls"] += 1
+        start = time.time()
+        self.scheduler.acquire(self.url, priority)
+        primary = self.send_async(payload, decode=True)
+        primary.add_done_callback(
+            lambda f: f.cancelled() or
+            self._latencies.append(time.time() - start))
+        try:
+            return primary.result(
+                timeout=deadline.limit(self.get_hedge_delay()))
+        except FutureTimeoutError:
+            pass
+
+        hedge_rpc = self.hedge_rpc
+        if (hedge_rpc is None or not hedge_rpc.is_pipelined() or
+                deadline.expired()):
+            return self.wait_for(primary, deadline)
+
+        # Api ids are assigned per connection
+        api_id, name, args = payload["params"]
+        for api, i in self.api_id.items():
+            if i and i == api_id:
+                api_id = hedge_rpc.api_id.get(api, api_id)
+        query = hedge_rpc.get_query(name, args, {"api_id": api_id})
+        self.scheduler.acquire(hedge_rpc.url, priority)
+        secondary = hedge_rpc.send_async(query, decode=True)
+        with self._lock:
+            self.hedge_stats["hedged"] += 1
+        log.debug("Hedged %s to %s" % (name, hedge_rpc.url))
+
+        done, not_done = wait(
+            [primary, secondary],
+            timeout=deadline.limit(self.timeout),
+            return_when=FIRST_COMPLETED
+        )
+        for future in not_done:
+            future.cancel()
+        if not done:
+            raise DeadlineExceeded("Nodes did not reply in time")
+        if primary in done:
+            return primary.result()
+        with self._lock:
+            self.hedge_stats["won"] += 1
+        return secondary.result()
+
+    def close(self):
+        if self.hedge_rpc:
+            self.hedge_rpc.close()
+        super(VinChainNodeRPC, self).close()
+
+    def decode_error(self, e):
+        """ Turn a generic :class:`RPCError` into the matching VinChain
+            specific exception
+        """
+        msg = exceptions.decodeRPCErrorMsg(e).strip()
+        if msg == "missing required active authority":
+            return exceptions.MissingRequiredActiveAuthority()
+        elif re.match("^no method with name.*", msg):
+            return exceptions.NoMethodWithName(msg)
+        elif msg:
+            return exceptions.UnhandledRPCError(msg)
+        else:
+            return e
 
     def get_account(self, name, **kwargs):
         """ Get full account details from account name or id
@@ -80,13 +478,16 @@ class VinChainNodeRPC(GrapheneWebsocketRPC):
         """
         return self.get_objects([o], **kwargs)[0]
 
-    def get_network(self):
+    def get_network(self, props=None):
         """ Identify the connected network. This call returns a
             dictionary with keys chain_id, core_symbol and prefix
+
+            :param dict props: Chain properties of the node, if known
         """
-        props = self.get_chain_properties()
+        if props is None:
+            props = self.get_chain_properties()
         chain_id = props["chain_id"]
         for k, v in known_chains.items():
             if v["chain_id"] == chain_id:
                 return v
-        raise("Connecting to unknown network!")
+        raise Exception("Connecting to unknown network!")
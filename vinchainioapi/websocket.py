@@ -1,29 +1,63 @@
 import traceback
-import threading
 import ssl
-import time
-import json
 import logging
 import websocket
 from itertools import cycle
-from threading import Thread
+from threading import Thread, Event, current_thread
+from grapheneapi import codec
+from grapheneapi.nodes import NodeManager
+from grapheneapi.retry import RetryPolicy
+from .dispatcher import NoticeDispatcher, Coalescer
+from .subscriptions import SubscriptionIndex
 from .exceptions import NumRetriesReached
 from events import Events
 
 log = logging.getLogger(__name__)
 # logging.basicConfig(level=logging.DEBUG)
 
+#: Number of objects requested at once when subscribing
+SUBSCRIBE_CHUNK_SIZE = 1000
+
 
 class VinChainWebsocket(Events):
     """ Create a websocket connection and request push notifications
 
-        :param str urls: Either a single Websocket URL, or a list of URLs
+        :param str urls: Either a single Websocket URL, a list of URLs, or an
+            instance of :class:`grapheneapi.nodes.NodeManager`
         :param str user: Username for Authentication
         :param str password: Password for Authentication
         :param list accounts: list of account names or ids to get push notifications for
         :param list markets: list of asset_ids, e.g. ``[['1.3.0', '1.3.121']]``
-        :param list objects: list of objects id's you'd like to be notified when changing
-        :param int keep_alive: seconds between a ping to the backend (defaults to 25seconds)
+        :param list objects: list of objects id's you'd like to be notified when changing,
+            or wildcards like ``1.3.x`` for all objects of a type (see
+            :meth:`subscribe_objects`)
+        :param int keep_alive: seconds between ping frames to the backend, ``0`` to
+            not send pings (defaults to 25 seconds)
+        :param float ping_timeout: Reconnect if a ping is not answered
+            within x seconds (defaults to 10 seconds, at most half of
+            ``keep_alive``)
+        :param compression: Negotiate permessage-deflate with the node, either
+            a bool for all nodes or a dictionary that maps URLs to bools
+            (defaults to ``False``)
+        :param int workers: Number of threads that call the slots, ``0``
+            to call them on the websocket thread (defaults to 1)
+        :param int max_queue: Maximum number of notices that wait for the
+            slots (defaults to 1000)
+        :param str policy: What to do if ``max_queue`` notices are waiting,
+            see :attr:`vinchainioapi.dispatcher.POLICIES` (defaults to
+            ``block``)
+        :param dispatcher: Instance of
+            :class:`vinchainioapi.dispatcher.NoticeDispatcher` to use
+            instead of ``workers``, ``max_queue`` and ``policy``
+        :param bool coalesce_objects: Pass only the newest notice of an
+            object to ``on_object`` and ``on_account`` and skip the ones
+            that were replaced while the slots were busy (defaults to
+            ``False``)
+        :param float flush_interval: With ``coalesce_objects``, pass the
+            newest notices on every x seconds instead of as soon as the
+            slots are ready (defaults to 0)
+        :param RetryPolicy retry_policy: Backoff between reconnects (see
+            :class:`grapheneapi.retry.RetryPolicy`)
 
         After instanciating this class, you can add event slots for:
 
@@ -34,7 +68,11 @@ class VinChainWebsocket(Events):
         * ``on_market``
 
         which will be called accordingly with the notification
-        message received from the VinChain node:
+        message received from the VinChain node. The slots are called by
+        the workers of :attr:`dispatcher`, so that a slow slot does not
+        stall the connection. Notices of the same object (or, for blocks,
+        transactions and markets, of the same event) are passed to the
+        slots in the order they were received:
 
         .. code-block:: python
 
@@ -112,32 +150,60 @@ class VinChainWebsocket(Events):
         on_account=None,
         on_market=None,
         keep_alive=25,
+        ping_timeout=None,
         num_retries=-1,
+        compression=False,
+        workers=1,
+        max_queue=1000,
+        policy="block",
+        dispatcher=None,
+        coalesce_objects=False,
+        flush_interval=0,
+        retry_policy=None,
         **kwargs
     ):
 
         self.num_retries = num_retries
-        self.keepalive = None
+        self.retry_policy = retry_policy or RetryPolicy()
+        # Failed connection attempts since the last successful one
+        self._retries = 0
+        self._stopped = Event()
         self._request_id = 0
         self.ws = None
+        self.url = None
+        # Thread that runs run_forever() and reconnects
+        self._runner = None
+        self.running = True
         self.user = user
         self.password = password
         self.keep_alive = keep_alive
-        if isinstance(urls, cycle):
+        if ping_timeout is None and keep_alive:
+            ping_timeout = min(10, keep_alive / 2.0)
+        if keep_alive and ping_timeout >= keep_alive:
+            raise ValueError("ping_timeout must be shorter than keep_alive")
+        self.ping_timeout = ping_timeout
+        self._own_dispatcher = dispatcher is None
+        self.compression = compression
+        self.dispatcher = dispatcher or NoticeDispatcher(
+            workers=workers, maxsize=max_queue, policy=policy)
+        self.coalescer = None
+        if coalesce_objects:
+            self.coalescer = Coalescer(
+                self.dispatcher, self.process_notice, flush_interval)
+        if isinstance(urls, (cycle, NodeManager)):
             self.urls = urls
-        elif isinstance(urls, list):
-            self.urls = cycle(urls)
         else:
-            self.urls = cycle([urls])
+            self.urls = NodeManager(urls)
 
         # Instanciate Events
         Events.__init__(self)
         self.events = Events()
 
         # Store the objects we are interested in
-        self.subscription_accounts = accounts
-        self.subscription_markets = markets
-        self.subscription_objects = objects
+        self.subscription_accounts = list(accounts)
+        self.subscription_markets = [list(market) for market in markets]
+        self.subscriptions = SubscriptionIndex(objects)
+        self.connected = False
 
         if on_tx:
             self.on_tx += on_tx
@@ -150,6 +216,104 @@ class VinChainWebsocket(Events):
         if on_market:
             self.on_market += on_market
 
+    @property
+    def subscription_objects(self):
+        """ List of the subscribed object ids and wildcards
+        """
+        return list(self.subscriptions)
+
+    def subscribe_objects(self, objects):
+        """ Subscribe to more objects without reconnecting
+
+            :param list objects: Object ids and wildcards like ``1.3.x``
+        """
+        new = self.subscriptions.add(objects)
+        if self.connected:
+            self.fetch_objects(new)
+
+    def unsubscribe_objects(self, objects):
+        """ Stop calling ``on_object`` for objects. The node keeps sending
+            their notices until the next reconnect, but they are ignored.
+
+            :param list objects: Object ids and wildcards like ``1.3.x``
+        """
+        self.subscriptions.remove(objects)
+
+    def subscribe_accounts(self, accounts):
+        """ Subscribe to more accounts without reconnecting
+
+            :param list accounts: Account names or ids
+        """
+        new = [a for a in accounts if a not in self.subscription_accounts]
+        self.subscription_accounts.extend(new)
+        if new and self.connected and len(self.on_account):
+            self.get_full_accounts(new, True)
+
+    def unsubscribe_accounts(self, accounts):
+        """ Remove accounts from the subscriptions. The node keeps sending
+            their notices until the next reconnect.
+
+            :param list accounts: Account names or ids
+        """
+        self.subscription_accounts = [
+            a for a in self.subscription_accounts if a not in accounts]
+
+    def subscribe_markets(self, markets):
+        """ Subscribe to more markets without reconnecting
+
+            :param list markets: list of asset_ids, e.g.
+                ``[['1.3.0', '1.3.121']]``
+        """
+        new = [
+            list(market) for market in markets
+            if list(market) not in self.subscription_markets]
+        self.subscription_markets.extend(new)
+        if self.connected and len(self.on_market):
+            for market in new:
+                self.subscribe_to_market(
+                    self.__events__.index('on_market'),
+                    market[0], market[1])
+
+    def unsubscribe_markets(self, markets):
+        """ Unsubscribe from markets without reconnecting
+
+            :param list markets: list of asset_ids, e.g.
+                ``[['1.3.0', '1.3.121']]``
+        """
+        for market in markets:
+            market = list(market)
+            if market not in self.subscription_markets:
+                continue
+            self.subscription_markets.remove(market)
+            if self.connected:
+                self.unsubscribe_from_market(market[0], market[1])
+
+    def request_notices(self, event):
+        """ Ask the node for the notices of ``on_tx`` or ``on_block`` after
+            a slot has been added while connected. On (re)connect, this is
+            done for all events with slots.
+
+            :param str event: ``on_tx`` or ``on_block``
+        """
+        if not self.connected:
+            return
+        if event == "on_tx":
+            self.set_pending_transaction_callback(
+                self.__events__.index('on_tx'))
+        elif event == "on_block":
+            self.set_block_applied_callback(
+                self.__events__.index('on_block'))
+        else:
+            raise ValueError("Unknown event %s" % event)
+
+    def fetch_objects(self, ids):
+        """ Request objects, which makes the node send notices when they
+            change
+        """
+        ids = list(ids)
+        for i in range(0, len(ids), SUBSCRIBE_CHUNK_SIZE):
+            self.get_objects(ids[i:i + SUBSCRIBE_CHUNK_SIZE])
+
     def cancel_subscriptions(self):
         self.cancel_all_subscriptions()
 
@@ -162,6 +326,7 @@ class VinChainWebsocket(Events):
             * subscribe to the objects defined if there is a
               callback/slot available for callbacks
         """
+        self._retries = 0
         self.login(self.user, self.password, api_id=1)
         self.database(api_id=1)
         self.cancel_all_subscriptions()
@@ -172,6 +337,9 @@ class VinChainWebsocket(Events):
             self.set_subscribe_callback(
                 self.__events__.index('on_object'),
                 False)
+        self.connected = True
+        if len(self.on_object):
+            self.fetch_objects(self.subscriptions.ids)
 
         if len(self.on_tx):
             self.set_pending_transaction_callback(
@@ -196,31 +364,13 @@ class VinChainWebsocket(Events):
                     self.__events__.index('on_market'),
                     market[0], market[1])
 
-        # We keep the connetion alive by requesting a short object
-        def ping(self):
-            while 1:
-                log.debug('Sending ping')
-                self.get_objects(["2.8.0"])
-                time.sleep(self.keep_alive)
-
-        self.keepalive = threading.Thread(
-            target=ping,
-            args=(self,)
-        )
-        self.keepalive.start()
-
     def process_notice(self, notice):
         """ This method is called on notices that need processing. Here,
             we call ``on_object`` and ``on_account`` slots.
         """
         id = notice["id"]
 
-        _a, _b, _ = id.split(".")
-
-        if id in self.subscription_objects:
-            self.on_object(notice)
-
-        elif ".".join([_a, _b, "x"]) in self.subscription_objects:
+        if id in self.subscriptions:
             self.on_object(notice)
 
         elif id[:4] == "2.6.":
@@ -233,10 +383,11 @@ class VinChainWebsocket(Events):
             hand over post-processing and signalling of events to
             ``process_notice``.
         """
-        log.debug("Received message: %s" % str(reply))
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Received message: %s" % str(reply))
         data = {}
         try:
-            data = json.loads(reply, strict=False)
+            data = codec.loads(reply)
         except ValueError:
             raise ValueError("API node returned invalid format. Expected JSON!")
 
@@ -256,68 +407,110 @@ class VinChainWebsocket(Events):
                 for notice in data["params"][1]:
                     try:
                         if "id" in notice:
-                            self.process_notice(notice)
+                            self.dispatch_notice(notice)
                         else:
                             for obj in notice:
                                 if "id" in obj:
-                                    self.process_notice(obj)
+                                    self.dispatch_notice(obj)
                     except Exception as e:
-                        log.critical("Error in process_notice: {}\n\n{}".format(str(e), traceback.format_exc))
+                        log.critical("Error in process_notice: {}\n\n{}".format(str(e), traceback.format_exc()))
             else:
-                try:
-                    callbackname = self.__events__[id]
-                    log.debug("Patching through to call %s" % callbackname)
-                    [getattr(self.events, callbackname)(x) for x in data["params"][1]]
-                except Exception as e:
-                    log.critical("Error in {}: {}\n\n{}".format(
-                        callbackname, str(e), traceback.format_exc()))
+                callbackname = self.__events__[id]
+                log.debug("Patching through to call %s" % callbackname)
+                slot = getattr(self.events, callbackname)
+                for x in data["params"][1]:
+                    self.dispatcher.dispatch(callbackname, slot, x)
+
+    def dispatch_notice(self, notice):
+        """ Hand an object notice over to ``process_notice`` on the
+            worker of the object. With ``coalesce_objects``, or under the
+            ``coalesce`` policy, a notice that is still waiting is
+            replaced by a newer one of the same object.
+        """
+        if self.coalescer:
+            self.coalescer.put(notice["id"], notice)
+            return
+        self.dispatcher.dispatch(
+            notice["id"], self.process_notice, notice, coalesce=True)
 
     def on_error(self, ws, error):
         """ Called on websocket errors
         """
         log.exception(error)
 
-    def on_close(self, ws):
+    def on_close(self, ws, *args):
         """ Called when websocket connection is closed
         """
         log.debug('Closing WebSocket connection with {}'.format(self.url))
-        if self.keepalive and self.keepalive.is_alive():
-            self.keepalive.do_run = False
-            self.keepalive.join()
+        self.connected = False
+
+    def use_compression(self, url):
+        """ Returns ``True`` if the connection to ``url`` is to be
+            compressed
+        """
+        if isinstance(self.compression, dict):
+            return bool(self.compression.get(url, False))
+        return bool(self.compression)
+
+    def close(self):
+        """ Close the connection and make :meth:`run_forever` return.
+            Notices that have not been passed to the slots yet are
+            dropped.
+        """
+        self.running = False
+        self._stopped.set()
+        if self.ws:
+            self.ws.close()
+        if self.coalescer:
+            self.coalescer.stop()
+        if self._own_dispatcher:
+            self.dispatcher.stop()
 
     def run_forever(self):
         """ This method is used to run the websocket app continuously.
             It will execute callbacks as defined and try to stay
-            connected with the provided APIs
+            connected with the provided APIs until :meth:`close` is
+            called.
+
+            The connection is kept alive with ping frames every
+            ``keep_alive`` seconds. If the node does not answer a ping
+            within ``ping_timeout`` seconds, the connection is considered
+            dead and the next node is tried.
+
+            Reconnects wait for the backoff of :attr:`retry_policy`, so
+            that many clients do not reconnect in lockstep after a node
+            restarts.
         """
-        cnt = 0
-        while True:
-            cnt += 1
+        self._retries = 0
+        self._runner = current_thread()
+        while self.running:
+            self._retries += 1
             self.url = next(self.urls)
             log.debug("Trying to connect to node %s" % self.url)
             try:
                 # websocket.enableTrace(True)
-                self.ws = websocket.WebSocketApp(
+                if self.use_compression(self.url):
+                    from grapheneapi.compression import DeflateWebsocketApp
+                    WebSocketApp = DeflateWebsocketApp
+                else:
+                    WebSocketApp = websocket.WebSocketApp
+                self.ws = WebSocketApp(
                     self.url,
                     on_message=self.on_message,
                     on_error=self.on_error,
                     on_close=self.on_close,
                     on_open=self.on_open
                 )
-                self.ws.run_forever()
+                self.ws.run_forever(
+                    ping_interval=self.keep_alive or 0,
+                    ping_timeout=self.ping_timeout if self.keep_alive else None)
             except websocket.WebSocketException as exc:
-                if (self.num_retries >= 0 and cnt > self.num_retries):
+                if isinstance(self.urls, NodeManager):
+                    self.urls.failure(self.url)
+                if (self.num_retries >= 0 and
+                        self._retries > self.num_retries):
                     raise NumRetriesReached()
 
-                sleeptime = (cnt - 1) * 2 if cnt < 10 else 10
-                if sleeptime:
-                    log.warning(
-                        "Lost connection to node during wsconnect(): %s (%d/%d) "
-                        % (self.url, cnt, self.num_retries) +
-                        "Retrying in %d seconds" % sleeptime
-                    )
-                    time.sleep(sleeptime)
-
             except KeyboardInterrupt:
                 self.ws.keep_running = False
                 raise
@@ -325,21 +518,62 @@ class VinChainWebsocket(Events):
             except Exception as e:
                 log.critical("{}\n\n{}".format(str(e), traceback.format_exc()))
 
+            if not self.running:
+                break
+            # After a lost connection, _retries starts over at 1
+            sleeptime = self.retry_policy.backoff(max(1, self._retries))
+            log.warning(
+                "Lost connection to node during wsconnect(): %s (%d/%d) "
+                % (self.url, self._retries, self.num_retries) +
+                "Retrying in %.1f seconds" % sleeptime
+            )
+            self._stopped.wait(sleeptime)
+
     def get_request_id(self):
         self._request_id += 1
         return self._request_id
 
     """ RPC Calls
     """
-    def rpcexec(self, payload):
+    def rpcexec(self, payload, num_retries=None):
         """ Execute a call by sending the payload
 
             :param json payload: Payload data
+            :param int num_retries: Retries for this call while the
+                connection is down (defaults to ``num_retries`` of the
+                instance)
             :raises ValueError: if the server does not respond in proper JSON format
             :raises RPCError: if the server returns an error
         """
-        log.debug(json.dumps(payload))
-        self.ws.send(json.dumps(payload, ensure_ascii=False).encode('utf8'))
+        if num_retries is None:
+            num_retries = self.num_retries
+        data = codec.dumps(payload)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(data)
+        cnt = 0
+        while True:
+            cnt += 1
+            try:
+                if self.ws is None:
+                    raise websocket.WebSocketConnectionClosedException(
+                        "Not connected")
+                self.ws.send(data)
+                return
+            except websocket.WebSocketException as e:
+                # Calls from the callbacks cannot wait for the reconnect,
+                # which happens on the same thread
+                if current_thread() is self._runner:
+                    raise
+                if not self.running or (
+                        num_retries > -1 and cnt > num_retries):
+                    raise NumRetriesReached()
+                sleeptime = self.retry_policy.backoff(cnt)
+                log.warning(
+                    "Unable to send to node %s: %s (%d/%d) " % (
+                        self.url, str(e), cnt, num_retries) +
+                    "Retrying in %.1f seconds" % sleeptime
+                )
+                self._stopped.wait(sleeptime)
 
     def __getattr__(self, name):
         """ Map all methods to RPC calls and pass through the arguments
@@ -366,13 +600,11 @@ class VinChainWebsocket(Events):
             else:
                 api_id = kwargs["api_id"]
 
-            # let's be able to define the num_retries per query
-            self.num_retries = kwargs.get("num_retries", self.num_retries)
-
             query = {"method": "call",
                      "params": [api_id, name, list(args)],
                      "jsonrpc": "2.0",
                      "id": self.get_request_id()}
-            r = self.rpcexec(query)
+            # let's be able to define the num_retries per query
+            r = self.rpcexec(query, num_retries=kwargs.get("num_retries"))
             return r
         return method
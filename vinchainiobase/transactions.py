@@ -16,7 +16,12 @@ from .operations import (
     Account_create,
 )
 from .objects import Asset
-from graphenebase.transactions import getBlockParams, formatTimeFromNow, timeformat
+from graphenebase.transactions import (
+    getBlockParams,
+    getBlockParamsFromProperties,
+    formatTimeFromNow,
+    timeformat
+)
 
 
 def addRequiredFees(ws, ops, asset_id="1.3.0"):
@@ -24,6 +29,13 @@ def addRequiredFees(ws, ops, asset_id="1.3.0"):
         operations. Requires a websocket connection to a witness node!
     """
     fees = ws.get_required_fees([i.json() for i in ops], asset_id)
+    return applyRequiredFees(ops, fees)
+
+
+def applyRequiredFees(ops, fees):
+    """ Auxiliary method to set the fees obtained from
+        ``get_required_fees`` on a set of operations.
+    """
     for i, d in enumerate(ops):
         if isinstance(fees[i], list):
             # Operation is a proposal